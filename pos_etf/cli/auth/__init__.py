@@ -6,7 +6,7 @@ import requests
 from urllib.parse import urlencode
 import re
 
-from pos_etf.cli.utils import clean_acct_names
+from pos_etf.cli.utils.credentials import credentials_store
 from pos_etf.cli.error import AccountNameError, AddressError
 
 class Auth(object):
@@ -71,9 +71,7 @@ class Auth(object):
                         f"Address {self.linked_wallet_address} is invalid.")
             else:
 
-                list_of_formatted_acct_names = clean_acct_names(self.user_dotfile)
-
-                if self.account_name in list_of_formatted_acct_names:
+                if self.account_name in credentials_store(self.user_dotfile):
                     os.environ['ALGOETF_PROFILE'] = self.account_name
                     return True
                 else:
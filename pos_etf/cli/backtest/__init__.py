@@ -0,0 +1,186 @@
+from __future__ import annotations
+from typing import Dict, List, Optional
+import numpy as np
+
+from pos_etf.cli.snapshots import SnapshotStore
+from pos_etf.cli.weights.base import BaseEtf
+from pos_etf.cli.weights.equal_proportions import EqualProportions
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+
+SECONDS_IN_ONE_DAY = 86400
+
+class BacktestReport(object):
+    """
+    The per-period results of a replay. Every array has one entry per period.
+
+    Attributes:
+        period_start: start timestamp of each period.
+        prices: for each strategy, the ETF price at the last snapshot of each period.
+        values: for each strategy, the value of the ETF tokens outstanding at the end of each period.
+        net_flows: for each strategy, the USD paid in by buys minus the USD paid out by sells.
+        turnover: for each strategy, the USD notional traded in each period.
+        turnover_ratio: for each strategy, `turnover` divided by `values`.
+        returns: for each strategy, the price return over each period.
+        tracking_difference: for each strategy, its period return minus the benchmark's.
+    """
+
+    def __init__(self: BacktestReport, period_start: np.ndarray, benchmark: str) -> None:
+        """
+        initialize the BacktestReport object.
+
+        :param period_start -> ``np.ndarray``: start timestamp of each period.
+        :param benchmark -> ``str``: the name of the strategy tracking differences are measured against.
+        :return -> ``None``:
+        """
+        self.period_start = period_start
+        self.benchmark = benchmark
+        self.prices: Dict[str, np.ndarray] = dict()
+        self.values: Dict[str, np.ndarray] = dict()
+        self.net_flows: Dict[str, np.ndarray] = dict()
+        self.turnover: Dict[str, np.ndarray] = dict()
+        self.turnover_ratio: Dict[str, np.ndarray] = dict()
+        self.returns: Dict[str, np.ndarray] = dict()
+        self.tracking_difference: Dict[str, np.ndarray] = dict()
+
+    def summary(self: BacktestReport) -> Dict[str, Dict[str, float]]:
+        """
+        summarize each strategy over the whole replay.
+
+        :return -> ``Dict[str, Dict[str, float]]``: end value, total turnover, net flows and mean/stdev of the tracking difference.
+        """
+        return {
+            name: {
+                "end_value": float(self.values[name][-1]) if len(self.values[name]) else 0.0,
+                "turnover": float(np.nansum(self.turnover[name])),
+                "net_flows": float(np.nansum(self.net_flows[name])),
+                "mean_tracking_difference": float(np.nanmean(self.tracking_difference[name])) if len(self.period_start) else 0.0,
+                "tracking_error": float(np.nanstd(self.tracking_difference[name])) if len(self.period_start) else 0.0
+            }
+            for name in self.prices
+        }
+
+
+class Backtest(object):
+    """
+    Replays recorded coin snapshots through the ETF-weighting strategies, independently of
+    any live data source, and simulates trades at the prices each strategy would have quoted.
+
+    Every strategy is evaluated over the whole time range in one vectorized call, and trades
+    are matched to the latest snapshot at or before them with a binary search, so years of
+    minute-level snapshots replay in well under a second.
+
+    Attributes:
+        store: the snapshot store to replay.
+        strategies: the strategies to compare, by name.
+        benchmark: the strategy that tracking differences are measured against.
+    """
+
+    default_strategies = {
+        "net_asset_value": NetAssetValue,
+        "equal_proportions": EqualProportions
+    }
+
+    def __init__(self: Backtest, store: SnapshotStore, strategies: Optional[Dict[str, BaseEtf]] = None, benchmark: str = "net_asset_value") -> None:
+        """
+        initialize the Backtest object.
+
+        :param store -> ``SnapshotStore``: the snapshot store to replay.
+        :param strategies -> ``Dict[str, BaseEtf]``: strategy classes by name, defaults to NAV and equal proportions.
+        :param benchmark -> ``str``: the name of the strategy tracking differences are measured against.
+        :return -> ``None``:
+        """
+        self.store = store
+        self.strategies = strategies or self.default_strategies
+        self.benchmark = benchmark
+
+        if benchmark not in self.strategies:
+            raise ValueError(f"Benchmark {benchmark} is not one of the replayed strategies.")
+
+    def prices(self: Backtest, start: float = -np.inf, end: float = np.inf) -> Dict[str, np.ndarray]:
+        """
+        evaluate every strategy on every snapshot between `start` and `end`.
+
+        :param start -> ``float``: inclusive lower bound (seconds since the epoch).
+        :param end -> ``float``: exclusive upper bound (seconds since the epoch).
+        :return -> ``Dict[str, np.ndarray]``: the timestamps under `timestamps`, and the ETF price per snapshot for each strategy.
+        """
+        timestamps, columns = self.store.between(start, end)
+
+        evaluated_prices = {"timestamps": timestamps}
+        for name, strategy in self.strategies.items():
+            evaluated_prices[name] = strategy.evaluate(columns)
+
+        return evaluated_prices
+
+    def replay(self: Backtest, trade_timestamps: np.ndarray, trade_amounts: np.ndarray, start: float = -np.inf, end: float = np.inf, period: float = SECONDS_IN_ONE_DAY) -> BacktestReport:
+        """
+        simulate trades against the recorded snapshots and report per-period results.
+
+        :param trade_timestamps -> ``np.ndarray``: when each trade happened (seconds since the epoch).
+        :param trade_amounts -> ``np.ndarray``: ETF tokens bought (positive) or sold (negative) in each trade.
+        :param start -> ``float``: inclusive lower bound of the replay (seconds since the epoch).
+        :param end -> ``float``: exclusive upper bound of the replay (seconds since the epoch).
+        :param period -> ``float``: length of a reporting period in seconds.
+        :return -> ``BacktestReport``: the per-period value, turnover and tracking difference of each strategy.
+        """
+        evaluated_prices = self.prices(start, end)
+        timestamps = evaluated_prices.pop("timestamps")
+
+        if not len(timestamps):
+            return BacktestReport(np.empty(0), self.benchmark)
+
+        first_timestamp = timestamps[0]
+        snapshot_periods = ((timestamps - first_timestamp) // period).astype(np.int64)
+        n_periods = int(snapshot_periods[-1]) + 1
+        period_indices = np.arange(n_periods)
+
+        # the last snapshot at or before the end of each period (empty periods carry the previous one forward).
+        period_closes = np.searchsorted(snapshot_periods, period_indices, side="right") - 1
+
+        trade_timestamps = np.asarray(trade_timestamps, dtype=np.float64)
+        trade_amounts = np.asarray(trade_amounts, dtype=np.float64)
+        in_range = (trade_timestamps >= first_timestamp) & (trade_timestamps < end)
+        trade_timestamps, trade_amounts = trade_timestamps[in_range], trade_amounts[in_range]
+
+        trade_snapshots = np.searchsorted(timestamps, trade_timestamps, side="right") - 1
+        trade_periods = np.minimum(((trade_timestamps - first_timestamp) // period).astype(np.int64), n_periods - 1)
+        outstanding = np.cumsum(np.bincount(trade_periods, weights=trade_amounts, minlength=n_periods))
+
+        report = BacktestReport(first_timestamp + period_indices * period, self.benchmark)
+
+        for name, strategy_prices in evaluated_prices.items():
+            period_prices = strategy_prices[period_closes]
+            trade_prices = strategy_prices[trade_snapshots]
+            previous_prices = np.concatenate(([strategy_prices[0]], period_prices[:-1]))
+
+            report.prices[name] = period_prices
+            report.values[name] = outstanding * period_prices
+            report.net_flows[name] = np.bincount(trade_periods, weights=trade_amounts * trade_prices, minlength=n_periods)
+            report.turnover[name] = np.bincount(trade_periods, weights=np.abs(trade_amounts) * trade_prices, minlength=n_periods)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                report.turnover_ratio[name] = np.where(report.values[name] != 0, report.turnover[name] / report.values[name], np.nan)
+            report.returns[name] = period_prices / previous_prices - 1
+
+        for name in evaluated_prices:
+            report.tracking_difference[name] = report.returns[name] - report.returns[self.benchmark]
+
+        return report
+
+    def format(self: Backtest, report: BacktestReport) -> List[str]:
+        """
+        render `report` as printable lines, one per strategy.
+
+        :param report -> ``BacktestReport``: the report returned by `replay`.
+        :return -> ``List[str]``: the formatted summary lines.
+        """
+        return [
+            "{}: end value ${:,.2f}, turnover ${:,.2f}, net flows ${:,.2f}, tracking difference {:+.4%} (error {:.4%})".format(
+                name,
+                summary["end_value"],
+                summary["turnover"],
+                summary["net_flows"],
+                summary["mean_tracking_difference"],
+                summary["tracking_error"]
+            )
+            for name, summary in report.summary().items()
+        ]
@@ -29,5 +29,22 @@ class InvalidAuthArgError(Exception):
         super().__init__(msg)
 
 class InvalidAccountNameError(Exception):
+    def __init__(self, msg: str):
+        super().__init__(msg)
+
+class SnapshotStoreError(Exception):
+    def __init__(self, msg: str):
+        super().__init__(msg)
+
+class InvalidOrderError(Exception):
+    def __init__(self, msg: str):
+        super().__init__(msg)
+
+class CircuitOpenError(Exception):
+    def __init__(self, msg: str):
+        super().__init__(msg)
+
+
+class StaleBasketError(Exception):
     def __init__(self, msg: str):
         super().__init__(msg)
\ No newline at end of file
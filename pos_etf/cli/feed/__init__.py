@@ -0,0 +1,167 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import os
+import socket
+import time
+
+from pos_etf.cli.snapshots import default_snapshot_store
+from pos_etf.cli.utils import constants
+from pos_etf.cli.utils.cache import PriceCache
+from pos_etf.cli.utils.session import session_pool
+from pos_etf.cli.weights.incremental import IncrementalNav
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+from pos_etf.cli.weights.registry import strategy_registry
+
+class PriceFeed(object):
+    """
+    A long-running daemon that keeps the basket statistics and the Algo price hot, recomputes
+    the NAV on a schedule and serves the latest quote over a local Unix domain socket.
+
+    Clients send one line (`quote`) and receive the latest quote as one line of JSON with
+    the keys `nav`, `algorand_price`, `timestamp` (when the basket statistics were retrieved),
+    `snapshot_id`, `strategies` (the ETF price of every registered strategy, computed from the
+    same snapshot) and `freshness`.
+
+    Attributes:
+        strategy: the NAV strategy whose basket is kept hot.
+        socket_path: the Unix domain socket quotes are served on.
+        refresh_interval: number of seconds between two basket refreshes.
+        quote: the latest quote, or ``None`` until the first refresh completes.
+    """
+
+    def __init__(self: PriceFeed, base_url: str, socket_path: str = constants.feed_socket_path, refresh_interval: float = constants.feed_refresh_interval) -> None:
+        """
+        initialize the PriceFeed object.
+
+        :param base_url -> ``str``: the base request URL for coin statistics.
+        :param socket_path -> ``str``: the Unix domain socket to serve quotes on.
+        :param refresh_interval -> ``float``: number of seconds between two basket refreshes.
+        :return -> ``None``:
+        """
+        # the daemon is the source of freshness, so it keeps its statistics in memory only, and
+        # its loop outlives every fetch: each refresh publishes the statistics of the previous
+        # one at once and revalidates them in the background, fetching before it publishes only
+        # once they are older than the price cache TTL (e.g. because revalidating them failed).
+        self.strategy = NetAssetValue(base_url, price_cache=PriceCache(path=None, ttl=0, max_staleness=constants.price_cache_ttl, background_refresh=True))
+        self.strategy.snapshot_store = default_snapshot_store(self.strategy.distinct_coins)
+        self.socket_path = socket_path
+        self.refresh_interval = refresh_interval
+        self.incremental_nav = IncrementalNav()
+        self.quote: Optional[Dict[str, Any]] = None
+
+    async def refresh(self: PriceFeed) -> Dict[str, Any]:
+        """
+        fetch the basket once and publish a new quote. The basket is fetched for the statistics
+        of every registered strategy, so the NAV and every other weighting variant are priced
+        from the same snapshot, and the Algo price is read from its algorand entry.
+
+        :return -> ``Dict[str, Any]``: the new quote.
+        """
+        snapshot = await strategy_registry.fetch(self.strategy, extra=('price',))
+        columns = snapshot.columns
+
+        for coin, market_cap, circulating_supply in zip(snapshot.coins, columns["marketCap"].tolist(), columns["circulatingSupply"].tolist()):
+            self.incremental_nav.update(coin, market_cap, circulating_supply)
+
+        self.quote = {
+            "nav": self.incremental_nav.nav,
+            "algorand_price": float(columns["price"][snapshot.coins.index("algorand")]),
+            "timestamp": snapshot.timestamp,
+            "snapshot_id": snapshot.snapshot_id,
+            "strategies": {name: round(price, 2) for name, price in strategy_registry.evaluate(snapshot).items()},
+            "freshness": snapshot.freshness
+        }
+        return self.quote
+
+    async def _refresh_forever(self: PriceFeed) -> None:
+        """refresh the quote every `refresh_interval` seconds, keeping the last quote on failures."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Price feed refresh failed, keeping the quote from {self.quote['timestamp']}: {e}")
+
+    async def _handle(self: PriceFeed, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """answer every request line on a client connection with the latest quote."""
+        try:
+            while await reader.readline():
+                writer.write(json.dumps(self.quote).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _claim_socket_path(self: PriceFeed) -> None:
+        """remove a socket file left behind by a daemon that is no longer running."""
+        if not os.path.exists(self.socket_path):
+            os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+            return
+
+        if request_quote(self.socket_path) is not None:
+            raise RuntimeError(f"A price feed is already serving on {self.socket_path}.")
+
+        os.remove(self.socket_path)
+
+    async def run(self: PriceFeed) -> None:
+        """fetch the first quote, then serve quotes and refresh them until cancelled."""
+        self._claim_socket_path()
+
+        async with session_pool.session():
+            await self.refresh()
+
+            # create the socket owner-only from the start rather than restricting it after binding.
+            previous_umask = os.umask(0o177)
+            try:
+                server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+            finally:
+                os.umask(previous_umask)
+
+            print(f"Serving NAV {self.quote['nav']} on {self.socket_path}, refreshing every {self.refresh_interval}s.")
+            try:
+                async with server:
+                    await self._refresh_forever()
+            finally:
+                if os.path.exists(self.socket_path):
+                    os.remove(self.socket_path)
+
+
+def request_quote(socket_path: str = constants.feed_socket_path, max_age: float = constants.feed_max_quote_age, timeout: float = 0.5) -> Optional[Dict[str, Any]]:
+    """
+    ask a running price feed for its latest quote.
+
+    :param socket_path -> ``str``: the Unix domain socket the feed serves on.
+    :param max_age -> ``float``: number of seconds after which a quote is considered too old to use.
+    :param timeout -> ``float``: number of seconds to wait for the feed to answer.
+    :return -> ``Dict[str, Any]``: the quote, or ``None`` if no feed is running or its quote is too old.
+    """
+    if not os.path.exists(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            client.sendall(b"quote\n")
+
+            response = b""
+            while not response.endswith(b"\n"):
+                chunk = client.recv(4096)
+                if not chunk:
+                    return None
+                response += chunk
+    except OSError:
+        return None
+
+    try:
+        quote = json.loads(response)
+    except ValueError:
+        return None
+
+    if not isinstance(quote, dict) or time.time() - quote.get("timestamp", 0) > max_age:
+        return None
+
+    return quote
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+import numpy as np
+from algosdk import account, mnemonic
+
+from pos_etf.cli.loadtest.simulator import Simulator
+
+def _free_port() -> int:
+    """reserve and release a local port for the simulator to bind to."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _start_simulator(simulator: Simulator, port: int) -> str:
+    """run `simulator` on its own event loop in a background thread and return its base URL."""
+    started = threading.Event()
+    base_url = dict()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        base_url["url"] = loop.run_until_complete(simulator.start(port=port))
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    started.wait()
+    return base_url["url"]
+
+
+def _start_loop() -> asyncio.AbstractEventLoop:
+    """run a new event loop forever in a background thread and return it."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def summarize(latencies: List[float], errors: List[str], elapsed: float) -> Dict[str, float]:
+    """
+    summarize the latency of a run.
+
+    :param latencies -> ``List[float]``: latency of every successful trade, in seconds.
+    :param errors -> ``List[str]``: the error of every trade that raised.
+    :param elapsed -> ``float``: wall-clock duration of the run, in seconds.
+    :return -> ``Dict[str, float]``: trade counts, p50/p95/p99 latency and trades per second.
+    """
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (np.nan, np.nan, np.nan)
+
+    return {
+        "trades": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "trades_per_second": len(latencies) / elapsed if elapsed else 0.0
+    }
+
+
+def run(trades: int, concurrency: int, block_time: float, latency: float, jitter: float, coin_error_rate: float = 0.0, coin_slow_rate: float = 0.0, coin_slow_delay: float = 2.0) -> Dict[str, float]:
+    """
+    start a simulator, point the CLI at it and execute `trades` buys and sells through
+    `Transaction.do` with `concurrency` trades in flight.
+
+    :param trades -> ``int``: number of trades to execute (alternating buys and sells).
+    :param concurrency -> ``int``: number of trades in flight at once.
+    :param block_time -> ``float``: simulated seconds between two blocks.
+    :param latency -> ``float``: simulated network latency per request, in seconds.
+    :param jitter -> ``float``: maximum random latency added per request, in seconds.
+    :param coin_error_rate -> ``float``: fraction of coinmarketcap requests that fail with a 503.
+    :param coin_slow_rate -> ``float``: fraction of coinmarketcap requests delayed by `coin_slow_delay`.
+    :param coin_slow_delay -> ``float``: extra delay of slow coinmarketcap requests, in seconds.
+    :return -> ``Dict[str, float]``: the summary of the run, with the counters of the price cache under `price_cache`.
+    """
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    scratch_dir = tempfile.mkdtemp(prefix="algoetf-loadtest-")
+
+    creator_key, _ = account.generate_account()
+    os.environ.update(Simulator.urls(base_url))
+    os.environ.setdefault("CREATOR_PASSPHRASE", mnemonic.from_private_key(creator_key))
+    os.environ["ALGOETF_PRICE_CACHE_PATH"] = os.path.join(scratch_dir, "price_cache.json")
+    os.environ["ALGOETF_SNAPSHOT_PATH"] = os.path.join(scratch_dir, "snapshots.bin")
+    os.environ["ALGOETF_ASSET_CACHE_PATH"] = os.path.join(scratch_dir, "asset_cache.json")
+    os.environ["ALGOETF_FEED_SOCKET"] = os.path.join(scratch_dir, "feed.sock")
+
+    # the CLI reads its configuration at import time, so import it only once the environment points at the simulator.
+    from algosdk.v2client import algod
+    from pos_etf.cli.snapshots import default_snapshot_store
+    from pos_etf.cli.transaction import Transaction
+    from pos_etf.cli.utils.cache import PriceCache
+    from pos_etf.cli.utils.constants import algoetf_addr, asset_id, coinmarketcap_url, creator_passphrase, price_cache_ttl
+    from pos_etf.cli.weights.net_asset_value import NetAssetValue
+
+    _start_simulator(Simulator(asset_id, block_time, latency, jitter, coin_error_rate, coin_slow_rate, coin_slow_delay), port)
+
+    # the trades run on worker threads, but every quote is fetched on this one loop, so the
+    # price cache, request coalescing and circuit breakers behind `strategy` are never shared
+    # between threads. The loop outlives every fetch, so statistics in the second half of their
+    # TTL are served while they are refreshed in the background.
+    quote_loop = _start_loop()
+    strategy = NetAssetValue(coinmarketcap_url, price_cache=PriceCache(ttl=price_cache_ttl / 2, max_staleness=price_cache_ttl, background_refresh=True))
+    strategy.snapshot_store = default_snapshot_store(strategy.distinct_coins)
+
+    customers = list()
+    for _ in range(concurrency):
+        private_key, address = account.generate_account()
+        customers.append((address, mnemonic.from_private_key(private_key)))
+
+    def trade(i: int) -> float:
+        address, passphrase = customers[i % len(customers)]
+        client = algod.AlgodClient("", base_url, headers={'User-Agent': 'DanM'})
+
+        if i % 2 == 0:
+            txn = Transaction(client, algoetf_addr, address, buy_or_sell_passphrase=creator_passphrase, algo_exchange_passphrase=passphrase, amount=1)
+            side = "buy"
+        else:
+            txn = Transaction(client, sender=address, receiver_address=algoetf_addr, buy_or_sell_passphrase=passphrase, algo_exchange_passphrase=creator_passphrase, amount=1)
+            side = "sell"
+
+        start = time.perf_counter()
+        txn.do(side, "exchange", quote=Transaction.quote(strategy, quote_loop))
+        return time.perf_counter() - start
+
+    latencies, errors = list(), list()
+    started_at = time.perf_counter()
+
+    # `Transaction.send_txns` prints its confirmations; keep them out of the report.
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(trade, i) for i in range(trades)]:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    summary = summarize(latencies, errors, time.perf_counter() - started_at)
+
+    asyncio.run_coroutine_threadsafe(strategy.price_cache.drain(), quote_loop).result()
+    quote_loop.call_soon_threadsafe(quote_loop.stop)
+    strategy.price_cache.persist()
+
+    summary["price_cache"] = strategy.price_cache.stats()
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure algoetf buy/sell throughput against local stand-ins for coinmarketcap, algod and the indexer.")
+    parser.add_argument("--trades", type=int, default=100, help="number of trades to execute (alternating buys and sells)")
+    parser.add_argument("--concurrency", type=int, default=10, help="number of trades in flight at once")
+    parser.add_argument("--block-time", type=float, default=4.5, help="simulated seconds between two blocks")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated network latency per request, in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="maximum random latency added per request, in seconds")
+    parser.add_argument("--coin-error-rate", type=float, default=0.0, help="fraction of coinmarketcap requests that fail with a 503")
+    parser.add_argument("--coin-slow-rate", type=float, default=0.0, help="fraction of coinmarketcap requests delayed by --coin-slow-delay")
+    parser.add_argument("--coin-slow-delay", type=float, default=2.0, help="extra delay of slow coinmarketcap requests, in seconds")
+    args = parser.parse_args()
+
+    summary = run(args.trades, args.concurrency, args.block_time, args.latency, args.jitter, args.coin_error_rate, args.coin_slow_rate, args.coin_slow_delay)
+
+    print(f"trades: {summary['trades']} ({summary['errors']} errors)")
+    if summary["first_error"]:
+        print(f"first error: {summary['first_error']}")
+    print(f"latency p50: {summary['p50']:.3f}s  p95: {summary['p95']:.3f}s  p99: {summary['p99']:.3f}s")
+    print(f"throughput: {summary['trades_per_second']:.2f} trades/sec")
+    cache_stats = summary["price_cache"]
+    print(f"price cache: {cache_stats['hits']} hits, {cache_stats['stale_hits']} stale hits, {cache_stats['misses']} misses, {cache_stats['refreshes']} background refreshes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+from typing import Dict, List, Set, Tuple
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# commands whose start-up cost is guarded, as the statement that reproduces what they import.
+SCENARIOS = {
+    "--help": "import sys; sys.argv = ['algoetf', '--help']\nfrom pos_etf.main import main\ntry:\n    main()\nexcept SystemExit:\n    pass",
+    "--view": "import pos_etf.main, json, urllib.request", # `--view` additionally uses `fetch_json`
+}
+
+# modules that must not be loaded before a command actually needs them.
+DEFERRED_MODULES = ("PyInquirer", "prompt_toolkit", "algosdk", "aiohttp", "requests", "numpy", "asyncio")
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    parse the output of `python -X importtime`.
+
+    :param stderr -> ``str``: the standard error of the interpreter.
+    :return -> ``List[Tuple[str, int, int]]``: the name, self time and cumulative time (in microseconds) of every import, with the name indented by nesting depth.
+    """
+    imports = list()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        imports.append((name[1:].rstrip(), int(self_us), int(cumulative_us))) # drop the separator's space, keep the nesting
+    return imports
+
+
+def run_once(statement: str) -> Tuple[List[Tuple[str, int, int]], float]:
+    """
+    run `statement` in a fresh interpreter with `-X importtime`.
+
+    :param statement -> ``str``: the code to run.
+    :return -> ``Tuple[List[Tuple[str, int, int]], float]``: the parsed imports and the wall-clock duration in milliseconds.
+    """
+    # the passphrase is deliberately absent: importing the CLI must not need it.
+    env = {key: value for key, value in os.environ.items() if key != "CREATOR_PASSPHRASE"}
+
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{completed.stderr}")
+    return parse_importtime(completed.stderr), elapsed
+
+
+def top_level(imports: List[Tuple[str, int, int]], baseline: Set[str]) -> List[Tuple[str, int, int]]:
+    """the imports made directly by the statement, excluding those the bare interpreter already makes."""
+    return [(name, self_us, cumulative_us) for name, self_us, cumulative_us in imports if not name.startswith(" ") and name not in baseline]
+
+
+def measure(statement: str, runs: int = 5) -> Dict[str, object]:
+    """
+    measure the import cost of `statement` over `runs` fresh interpreters.
+
+    :param statement -> ``str``: the code to run.
+    :param runs -> ``int``: number of interpreters to start.
+    :return -> ``Dict[str, object]``: the median import and wall-clock times in milliseconds, the most expensive top-level imports and the deferred modules that were loaded.
+    """
+    baseline_imports, _ = run_once("pass")
+    baseline = {name.strip() for name, _, _ in baseline_imports}
+
+    import_times, wall_times, imports = list(), list(), list()
+    for _ in range(runs):
+        imports, elapsed = run_once(statement)
+        import_times.append(sum(cumulative_us for _, _, cumulative_us in top_level(imports, baseline)) / 1000)
+        wall_times.append(elapsed)
+
+    loaded = {name.strip() for name, _, _ in imports}
+    return {
+        "import_ms": statistics.median(import_times),
+        "wall_ms": statistics.median(wall_times),
+        "heaviest": sorted(top_level(imports, baseline), key=lambda entry: -entry[2])[:5],
+        "deferred_loaded": sorted(module for module in DEFERRED_MODULES if module in loaded)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure how long the algoetf CLI spends importing modules before it can run a command.")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters per command")
+    parser.add_argument("--budget", type=float, default=100, help="maximum median import time per command, in milliseconds")
+    args = parser.parse_args()
+
+    failed = False
+    for command, statement in SCENARIOS.items():
+        result = measure(statement, args.runs)
+        over_budget = result["import_ms"] > args.budget
+
+        print(f"algoetf {command}: imports {result['import_ms']:.1f} ms (budget {args.budget:.0f} ms), wall clock {result['wall_ms']:.1f} ms")
+        for name, _, cumulative_us in result["heaviest"]:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+        if result["deferred_loaded"]:
+            print(f"    loaded modules that should be deferred: {', '.join(result['deferred_loaded'])}")
+
+        failed = failed or over_budget or bool(result["deferred_loaded"])
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import base64
+import random
+import msgpack
+from aiohttp import web
+from algosdk import encoding
+
+SIMULATED_COINS = {
+    # slug: (price, circulating supply)
+    'algorand': (1.0, 3.0e9),
+    'cardano': (1.3, 3.2e10),
+    'tezos': (3.0, 8.5e8),
+    'dash': (140.0, 1.0e7),
+    'polkadot': (15.0, 1.0e9),
+    'cosmos': (12.0, 2.2e8),
+    'the-graph': (0.7, 1.3e9),
+    'stellar': (0.3, 2.3e10),
+    'solana': (35.0, 2.8e8),
+    'near-protocol': (3.0, 4.0e8)
+}
+
+class Simulator(object):
+    """
+    A local stand-in for the services the CLI talks to, served by one aiohttp application:
+
+        - coinmarketcap: `GET /data-api/v3/cryptocurrency/detail?slug=` (random-walk prices)
+        - algod v2: transaction params, status, wait-for-block-after, raw transaction
+          submission (single or grouped), pending transaction info and account info
+        - algod v1: asset info (used by `balance_formatter`)
+        - indexer: `GET /idx2/v2/transactions` (used by `Auth.verify` and the holdings cache)
+
+    Blocks are produced every `block_time` seconds, and every transaction submitted before
+    a block is confirmed in it. Every request is delayed by `latency` seconds plus up to
+    `jitter` seconds of random noise. To exercise the price-source fault handling, a
+    `coin_slow_rate` fraction of coinmarketcap requests take `coin_slow_delay` seconds longer
+    and a `coin_error_rate` fraction of them fail with a 503.
+
+    Attributes:
+        asset_id: the ID of the ETF asset reported in account holdings and asset info.
+        block_time: number of seconds between two blocks.
+        latency: fixed delay added to every request, in seconds.
+        jitter: maximum random delay added on top of `latency`, in seconds.
+        coin_error_rate: fraction of coinmarketcap requests answered with a 503.
+        coin_slow_rate: fraction of coinmarketcap requests delayed by `coin_slow_delay`.
+        coin_slow_delay: extra delay of slow coinmarketcap requests, in seconds.
+        round: the last produced round.
+    """
+
+    def __init__(self: Simulator, asset_id: int, block_time: float = 4.5, latency: float = 0.05, jitter: float = 0.02, coin_error_rate: float = 0.0, coin_slow_rate: float = 0.0, coin_slow_delay: float = 2.0) -> None:
+        """
+        initialize the Simulator object.
+
+        :param asset_id -> ``int``: the ID of the ETF asset.
+        :param block_time -> ``float``: number of seconds between two blocks.
+        :param latency -> ``float``: fixed delay added to every request, in seconds.
+        :param jitter -> ``float``: maximum random delay added on top of `latency`, in seconds.
+        :param coin_error_rate -> ``float``: fraction of coinmarketcap requests answered with a 503.
+        :param coin_slow_rate -> ``float``: fraction of coinmarketcap requests delayed by `coin_slow_delay`.
+        :param coin_slow_delay -> ``float``: extra delay of slow coinmarketcap requests, in seconds.
+        :return -> ``None``:
+        """
+        self.asset_id = asset_id
+        self.block_time = block_time
+        self.latency = latency
+        self.jitter = jitter
+        self.coin_error_rate = coin_error_rate
+        self.coin_slow_rate = coin_slow_rate
+        self.coin_slow_delay = coin_slow_delay
+        self.round = 1000
+        self.genesis_hash = base64.b64encode(bytes(32)).decode()
+        self.prices = {slug: price for slug, (price, _) in SIMULATED_COINS.items()}
+        self._pending: List[Tuple[str, List[str]]] = list()
+        self._confirmed: Dict[str, int] = dict()
+        self._last_activity: Dict[str, int] = dict()
+        self._new_block: Optional[asyncio.Condition] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._block_producer: Optional[asyncio.Task] = None
+
+    async def _delay(self: Simulator) -> None:
+        """sleep for the configured network latency."""
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+
+    async def _produce_blocks(self: Simulator) -> None:
+        """advance the round every `block_time` seconds, confirming every pending transaction."""
+        while True:
+            await asyncio.sleep(self.block_time)
+            async with self._new_block:
+                self.round += 1
+                for transaction_id, addresses in self._pending:
+                    self._confirmed[transaction_id] = self.round
+                    for address in addresses:
+                        self._last_activity[address] = self.round
+                self._pending.clear()
+                self._new_block.notify_all()
+
+    def _status(self: Simulator) -> Dict[str, int]:
+        """the body of the algod status endpoints."""
+        return {"last-round": self.round, "time-since-last-round": 0, "catchup-time": 0}
+
+    async def coin_detail(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        if random.random() < self.coin_slow_rate:
+            await asyncio.sleep(self.coin_slow_delay)
+        if random.random() < self.coin_error_rate:
+            raise web.HTTPServiceUnavailable()
+
+        slug = request.query.get("slug")
+        if slug not in SIMULATED_COINS:
+            raise web.HTTPNotFound()
+
+        self.prices[slug] *= 1 + random.gauss(0, 0.001)
+        circulating_supply = SIMULATED_COINS[slug][1]
+
+        return web.json_response({"data": {"statistics": {
+            "price": self.prices[slug],
+            "marketCap": self.prices[slug] * circulating_supply,
+            "circulatingSupply": circulating_supply
+        }}})
+
+    async def transaction_params(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({
+            "fee": 0,
+            "min-fee": 1000,
+            "last-round": self.round,
+            "genesis-hash": self.genesis_hash,
+            "genesis-id": "simnet-v1",
+            "consensus-version": "simulated"
+        })
+
+    async def status(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response(self._status())
+
+    async def status_after_block(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        target_round = int(request.match_info["round"])
+        async with self._new_block:
+            await self._new_block.wait_for(lambda: self.round > target_round)
+        return web.json_response(self._status())
+
+    async def send_transactions(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(await request.read())
+
+        transactions = list()
+        for signed_transaction in unpacker:
+            transaction = signed_transaction["txn"]
+            transaction_bytes = msgpack.packb(transaction, use_bin_type=True)
+            transaction_id = encoding._undo_padding(base64.b32encode(encoding.checksum(b"TX" + transaction_bytes)).decode())
+            addresses = [encoding.encode_address(transaction[field]) for field in ("snd", "rcv", "arcv") if field in transaction]
+            transactions.append((transaction_id, addresses))
+
+        if not transactions:
+            raise web.HTTPBadRequest(text="no transactions in request body")
+
+        self._pending.extend(transactions)
+        return web.json_response({"txId": transactions[0][0]})
+
+    async def pending_transaction(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        transaction_id = request.match_info["txid"]
+        if transaction_id in self._confirmed:
+            return web.json_response({"confirmed-round": self._confirmed[transaction_id], "pool-error": ""})
+        if any(transaction_id == pending_id for pending_id, _ in self._pending):
+            return web.json_response({"confirmed-round": 0, "pool-error": ""})
+        raise web.HTTPNotFound()
+
+    async def account(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({
+            "address": request.match_info["address"],
+            "amount": 10 ** 12,
+            "round": self.round,
+            "assets": [{"asset-id": self.asset_id, "amount": 1000, "is-frozen": False}]
+        })
+
+    async def asset_info(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({"decimals": 0, "unitname": "Pos", "assetname": "PosETF"})
+
+    async def indexer_transactions(self: Simulator, request: web.Request) -> web.Response:
+        await self._delay()
+        address, min_round = request.query.get("address"), int(request.query.get("min-round", 0))
+
+        # only the most recent round with activity is kept per address, which is enough to answer limit=1 queries.
+        last_activity = self._last_activity.get(address)
+        transactions = [{"confirmed-round": last_activity}] if last_activity is not None and last_activity >= min_round else []
+        return web.json_response({"current-round": self.round, "transactions": transactions})
+
+    def application(self: Simulator) -> web.Application:
+        """
+        build the aiohttp application serving every simulated endpoint.
+
+        :return -> ``web.Application``: the application.
+        """
+        app = web.Application()
+        app.router.add_get("/data-api/v3/cryptocurrency/detail", self.coin_detail)
+        app.router.add_get("/v2/transactions/params", self.transaction_params)
+        app.router.add_get("/v2/status", self.status)
+        app.router.add_get("/v2/status/wait-for-block-after/{round}", self.status_after_block)
+        app.router.add_post("/v2/transactions", self.send_transactions)
+        app.router.add_get("/v2/transactions/pending/{txid}", self.pending_transaction)
+        app.router.add_get("/v2/accounts/{address}", self.account)
+        app.router.add_get("/v1/asset/{index}", self.asset_info)
+        app.router.add_get("/idx2/v2/transactions", self.indexer_transactions)
+        return app
+
+    async def start(self: Simulator, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        start serving on `host`:`port` and producing blocks.
+
+        :param host -> ``str``: the interface to bind to.
+        :param port -> ``int``: the port to bind to (0 picks a free port).
+        :return -> ``str``: the base URL of the simulator.
+        """
+        self._new_block = asyncio.Condition()
+        self._runner = web.AppRunner(self.application())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self._block_producer = asyncio.ensure_future(self._produce_blocks())
+
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}"
+
+    async def stop(self: Simulator) -> None:
+        """stop producing blocks and serving requests."""
+        self._block_producer.cancel()
+        await self._runner.cleanup()
+
+    @classmethod
+    def urls(cls: Simulator, base_url: str) -> Dict[str, str]:
+        """
+        the environment variables that point the CLI at a simulator served at `base_url`.
+
+        :param base_url -> ``str``: the URL returned by `start`.
+        :return -> ``Dict[str, str]``: environment variable names and values.
+        """
+        return {
+            "ALGOETF_ALGOD_URL": base_url,
+            "ALGOETF_INDEXER_URL": base_url,
+            "ALGOETF_COINMARKETCAP_URL": f"{base_url}/data-api/v3/cryptocurrency/detail?slug="
+        }
+
+
+def main() -> None:
+    """serve the simulator in the foreground, e.g. for manual runs of the CLI against it."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-ins for coinmarketcap, algod and the indexer.")
+    parser.add_argument("--port", type=int, default=8980)
+    parser.add_argument("--asset-id", type=int, default=14875048)
+    parser.add_argument("--block-time", type=float, default=4.5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--coin-error-rate", type=float, default=0.0)
+    parser.add_argument("--coin-slow-rate", type=float, default=0.0)
+    parser.add_argument("--coin-slow-delay", type=float, default=2.0)
+    args = parser.parse_args()
+
+    async def serve():
+        simulator = Simulator(args.asset_id, args.block_time, args.latency, args.jitter, args.coin_error_rate, args.coin_slow_rate, args.coin_slow_delay)
+        base_url = await simulator.start(port=args.port)
+        for name, value in simulator.urls(base_url).items():
+            print(f"export {name}='{value}'")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
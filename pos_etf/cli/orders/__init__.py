@@ -0,0 +1,219 @@
+from __future__ import annotations
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, TextIO, Tuple
+import asyncio
+import base64
+import csv
+import json
+import os
+
+import aiohttp
+from algosdk import constants as algosdk_constants
+from algosdk import encoding
+from algosdk.transaction import assign_group_id
+from algosdk.v2client import algod
+
+from pos_etf.cli.error import InvalidOrderError
+from pos_etf.cli.transaction import Transaction
+from pos_etf.cli.utils import sign
+from pos_etf.cli.utils.confirmations import ConfirmationTracker
+from pos_etf.cli.utils.constants import algoetf_addr, orders_window
+from pos_etf.cli.utils.params import params_cache
+from pos_etf.cli.utils.session import SessionPool, session_pool
+from pos_etf.cli.utils.tracing import tracer
+
+ORDER_FIELDS = ("id", "side", "account", "amount")
+
+def read_orders(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    stream the orders of a JSON lines or CSV file (chosen by the `.csv` extension), one order
+    at a time. Every order has a `side` (`buy` or `sell`), the `account` name of the customer in
+    the credentials file and the `amount` of ETF tokens; `id` defaults to the line number.
+
+    :param path -> ``str``: path to the order file.
+    :return -> ``Iterator[Dict[str, Any]]``: the orders, in file order.
+    """
+    with open(path, newline="") as order_file:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(order_file)
+        else:
+            rows = (json.loads(line) for line in order_file if line.strip())
+
+        for line_number, row in enumerate(rows, start=1):
+            order = {field: row.get(field) for field in ORDER_FIELDS}
+            if order["id"] in (None, ""):
+                order["id"] = line_number
+            yield order
+
+
+class BulkOrders(object):
+    """
+    Executes a stream of customer orders against a single NAV quote. Orders are built, signed
+    and submitted as they are read; each order's exchange and asset-transfer legs form one
+    atomic group, and every group is awaited through one shared confirmation tracker, so a
+    round confirms every order submitted before it.
+
+    At most `window` orders are in flight at once and results are written in file order as
+    they complete, so memory use does not grow with the size of the order file.
+
+    Attributes:
+        client: the algod client transactions are built against.
+        credentials: maps an account name to its address and passphrase.
+        pool_passphrase: the passphrase of the algoetf pool address (the counterparty of every order).
+        window: maximum number of orders in flight at once.
+        session_pool: the pool providing the shared HTTP session.
+    """
+
+    def __init__(self: BulkOrders, client: algod.AlgodClient, credentials: Dict[str, Tuple[str, str]], pool_passphrase: str, window: int = orders_window, session_pool: SessionPool = session_pool) -> None:
+        """
+        initialize the BulkOrders object.
+
+        :param client -> ``algod.AlgodClient``: the algod client transactions are built against.
+        :param credentials -> ``Dict[str, Tuple[str, str]]``: maps an account name to its address and passphrase.
+        :param pool_passphrase -> ``str``: the passphrase of the algoetf pool address.
+        :param window -> ``int``: maximum number of orders in flight at once.
+        :param session_pool -> ``SessionPool``: the pool providing the shared HTTP session.
+        :return -> ``None``:
+        """
+        self.client = client
+        self.credentials = credentials
+        self.pool_passphrase = pool_passphrase
+        self.window = window
+        self.session_pool = session_pool
+
+        self._headers = dict(client.headers or dict())
+        self._headers[algosdk_constants.algod_auth_header] = client.algod_token
+        self._headers["Content-Type"] = "application/x-binary"
+
+    def validate(self: BulkOrders, order: Dict[str, Any]) -> int:
+        """
+        check the side, account and amount of `order`.
+
+        :param order -> ``Dict[str, Any]``: the order, as returned by `read_orders`.
+        :return -> ``int``: the amount of ETF tokens of the order.
+        """
+        if order["side"] not in ("buy", "sell"):
+            raise InvalidOrderError(f"Invalid side {order['side']!r}: must be 'buy' or 'sell'.")
+        if order["account"] not in self.credentials:
+            raise InvalidOrderError(f"The account name, {order['account']}, does not exist.")
+
+        try:
+            amount = int(order["amount"])
+        except (TypeError, ValueError):
+            raise InvalidOrderError(f"Invalid amount {order['amount']!r}: must be a whole number of tokens.")
+        if amount <= 0:
+            raise InvalidOrderError(f"Invalid amount {amount}: must be positive.")
+
+        return amount
+
+    def transaction_for(self: BulkOrders, order: Dict[str, Any]) -> Transaction:
+        """
+        build the `Transaction` that executes `order`, like `algoetf --buy`/`--sell` would.
+
+        :param order -> ``Dict[str, Any]``: the order, as returned by `read_orders`.
+        :return -> ``Transaction``: the transaction between the customer and the algoetf pool.
+        """
+        amount = self.validate(order)
+
+        pub_key, passphrase = self.credentials[order["account"]]
+        if order["side"] == "buy":
+            return Transaction(self.client, algoetf_addr, pub_key, buy_or_sell_passphrase=self.pool_passphrase, algo_exchange_passphrase=passphrase, amount=amount)
+        return Transaction(self.client, sender=pub_key, receiver_address=algoetf_addr, buy_or_sell_passphrase=passphrase, algo_exchange_passphrase=self.pool_passphrase, amount=amount)
+
+    async def _send_group(self: BulkOrders, session: aiohttp.ClientSession, signed_transactions: List[Any]) -> None:
+        """submit one signed transaction group over the pooled session."""
+        body = b"".join(base64.b64decode(encoding.msgpack_encode(signed_transaction)) for signed_transaction in signed_transactions)
+
+        async with session.post(f"{self.client.algod_address}/v2/transactions", data=body, headers=self._headers) as response:
+            if response.status >= 400:
+                raise Exception(f"algod rejected the transaction group ({response.status}): {await response.text()}")
+
+    async def settle(self: BulkOrders, session: aiohttp.ClientSession, tracker: ConfirmationTracker, transaction: Transaction, side: str, quote: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """
+        build, sign and submit the asset transfer of `transaction` and its exchange leg as one
+        atomic group, and wait for its confirmation. The ids of both legs are recorded in `result`
+        as soon as they are known and the confirmed round once the group is confirmed.
+
+        Both legs carry a note with the order id (if any) and a random nonce: transactions are
+        built from round-cached params, so two identical orders would otherwise get the same
+        ids and algod would reject the second as already submitted.
+
+        :param session -> ``aiohttp.ClientSession``: the pooled session to submit through.
+        :param tracker -> ``ConfirmationTracker``: the tracker shared by every order of the run.
+        :param transaction -> ``Transaction``: the transfer between the two parties.
+        :param side -> ``str``: the side of the transfer (`buy` or `sell`).
+        :param quote -> ``Dict[str, Any]``: the quote the exchange leg is priced at, as returned by `Transaction.quote`.
+        :param result -> ``Dict[str, Any]``: updated with the `txid` and `exchange_txid` of the group, whether algod accepted it (`submitted`) and its confirmed `round`.
+        """
+        if transaction.note is None:
+            transaction.note = f"algoetf:{result.get('id', '')}:{os.urandom(8).hex()}".encode()
+
+        # request the params off the loop first, so building the legs reads them from the cache.
+        await params_cache.prefetch(self.client)
+        txns = assign_group_id(transaction.build_txns(quote, side, "exchange"))
+        signed_transactions, (transfer_txid, exchange_txid) = sign([(txn, transaction.passphrase_for(txn)) for txn in txns])
+        result.update(txid=transfer_txid, exchange_txid=exchange_txid)
+
+        await self._send_group(session, signed_transactions)
+        result["submitted"] = True
+        # the group is confirmed atomically, so the transfer leg's round is the round of the order.
+        transaction_info = await tracker.track(transfer_txid)
+        result["round"] = transaction_info.get("confirmed-round") if transaction_info else None
+
+    async def execute(self: BulkOrders, session: aiohttp.ClientSession, tracker: ConfirmationTracker, order: Dict[str, Any], quote: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        build, sign and submit the atomic group of `order`, and wait for its confirmation.
+
+        :param session -> ``aiohttp.ClientSession``: the pooled session to submit through.
+        :param tracker -> ``ConfirmationTracker``: the tracker shared by every order of the run.
+        :param order -> ``Dict[str, Any]``: the order, as returned by `read_orders`.
+        :param quote -> ``Dict[str, Any]``: the quote every order is priced at, as returned by `Transaction.quote`.
+        :return -> ``Dict[str, Any]``: the result of the order: the order itself, the ids and round of its transactions, the prices used and the error, if any.
+        """
+        result = dict(order, txid=None, exchange_txid=None, submitted=False, round=None, nav=quote["nav"], algorand_price=quote["algorand_price"], error=None)
+
+        try:
+            await self.settle(session, tracker, self.transaction_for(order), order["side"], quote, result)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+
+        return result
+
+    async def run(self: BulkOrders, orders: Iterator[Dict[str, Any]], quote: Dict[str, Any], output: TextIO) -> Dict[str, int]:
+        """
+        execute every order of `orders` at `quote`, writing one JSON line per order to `output` in order.
+
+        :param orders -> ``Iterator[Dict[str, Any]]``: the orders, as returned by `read_orders`.
+        :param quote -> ``Dict[str, Any]``: the quote every order is priced at, as returned by `Transaction.quote`.
+        :param output -> ``TextIO``: where the results are written.
+        :return -> ``Dict[str, int]``: the number of orders executed and failed.
+        """
+        counts = {"executed": 0, "failed": 0}
+        in_flight: Deque[asyncio.Future] = deque()
+
+        async def write_oldest():
+            result = await in_flight.popleft()
+            counts["failed" if result["error"] else "executed"] += 1
+            output.write(json.dumps(result, default=str) + "\n")
+
+        async with self.session_pool.session() as session:
+            tracker = ConfirmationTracker(self.client, self.session_pool)
+
+            with tracer.span("BulkOrders.run"):
+                for order in orders:
+                    in_flight.append(asyncio.ensure_future(self.execute(session, tracker, order, quote)))
+                    if len(in_flight) >= self.window:
+                        await write_oldest()
+                    else:
+                        await asyncio.sleep(0) # let submitted orders make progress while the window fills
+
+                while in_flight:
+                    await write_oldest()
+
+        return counts
+
+
+def default_output_path(orders_path: str) -> str:
+    """the results file written next to `orders_path` when no output path is given."""
+    root, _ = os.path.splitext(orders_path)
+    return f"{root}.results.jsonl"
@@ -0,0 +1,264 @@
+from __future__ import annotations
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+import asyncio
+import json
+import threading
+
+import aiohttp
+from algosdk.v2client import algod
+
+from pos_etf.cli.orders import BulkOrders
+from pos_etf.cli.transaction import Transaction
+from pos_etf.cli.utils.confirmations import ConfirmationTracker
+from pos_etf.cli.utils.constants import algoetf_addr, netting_interval, netting_max_batch, orders_window
+from pos_etf.cli.utils.session import SessionPool, session_pool
+from pos_etf.cli.utils.tracing import tracer
+
+async def batches(orders: Iterator[Dict[str, Any]], interval: float = netting_interval, max_orders: int = netting_max_batch) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    group a stream of orders into batch auctions. A batch is closed `interval` seconds after
+    its first order arrived, or as soon as it holds `max_orders` orders, whether or not
+    another order arrives, so a lone order on a quiet stream is not held back. `orders` is
+    read on a background thread, so a source that blocks between orders (a pipe, a socket)
+    does not block the event loop; a file is read as fast as batches are taken, so its
+    batches are cut by `max_orders`.
+
+    :param orders -> ``Iterator[Dict[str, Any]]``: the orders, as returned by `read_orders`.
+    :param interval -> ``float``: seconds orders are collected for before the batch is closed.
+    :param max_orders -> ``int``: maximum number of orders in one batch.
+    :return -> ``AsyncIterator[List[Dict[str, Any]]]``: the batches, in arrival order.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_orders)
+    end = object()
+
+    def read():
+        # every put waits for room in the queue, so at most `max_orders` orders are read ahead.
+        try:
+            for order in orders:
+                asyncio.run_coroutine_threadsafe(queue.put(order), loop).result()
+        except Exception as e:
+            asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+        else:
+            asyncio.run_coroutine_threadsafe(queue.put(end), loop).result()
+
+    threading.Thread(target=read, daemon=True).start()
+
+    async def next_order(timeout=None):
+        order = await asyncio.wait_for(queue.get(), timeout) if timeout is not None else await queue.get()
+        if isinstance(order, Exception):
+            raise order
+        return order
+
+    while True:
+        order = await next_order()
+        if order is end:
+            return
+
+        batch = [order]
+        closes_at = loop.time() + interval
+        while len(batch) < max_orders:
+            try:
+                order = await next_order(max(0.0, closes_at - loop.time()))
+            except asyncio.TimeoutError:
+                break
+            if order is end:
+                yield batch
+                return
+            batch.append(order)
+
+        yield batch
+
+
+def cross(positions: Dict[str, int]) -> List[Tuple[Optional[str], Optional[str], int]]:
+    """
+    match net sellers with net buyers and settle what is left against the pool. Buyers and
+    sellers are matched in order and every fill closes at least one position, so a batch needs
+    at most one fill per customer with a non-zero position.
+
+    :param positions -> ``Dict[str, int]``: the net number of ETF tokens every customer buys (positive) or sells (negative).
+    :return -> ``List[Tuple[Optional[str], Optional[str], int]]``: the fills as (seller, buyer, amount), where ``None`` stands for the algoetf pool.
+    """
+    buyers = [[account, position] for account, position in positions.items() if position > 0]
+    sellers = [[account, -position] for account, position in positions.items() if position < 0]
+    fills: List[Tuple[Optional[str], Optional[str], int]] = list()
+
+    buyer_index = seller_index = 0
+    while buyer_index < len(buyers) and seller_index < len(sellers):
+        buyer, seller = buyers[buyer_index], sellers[seller_index]
+        amount = min(buyer[1], seller[1])
+        fills.append((seller[0], buyer[0], amount))
+
+        buyer[1] -= amount
+        seller[1] -= amount
+        buyer_index += buyer[1] == 0
+        seller_index += seller[1] == 0
+
+    fills.extend((None, account, remaining) for account, remaining in buyers[buyer_index:])
+    fills.extend((account, None, remaining) for account, remaining in sellers[seller_index:])
+    return fills
+
+
+def allocate(orders: List[Tuple[str, int]], settled: int) -> List[int]:
+    """
+    split what was settled of a customer's net position over the customer's orders. Orders on
+    the side opposite to the net position are netted against the customer's own orders and are
+    settled in full; orders on the side of the net position are filled in order, first by those
+    opposite orders and then by the `settled` tokens.
+
+    :param orders -> ``List[Tuple[str, int]]``: the side and amount of every order of the customer, in batch order.
+    :param settled -> ``int``: the number of tokens of the net position that were settled by fills.
+    :return -> ``List[int]``: the number of tokens of every order that were settled.
+    """
+    buys = sum(amount for side, amount in orders if side == "buy")
+    sells = sum(amount for side, amount in orders if side == "sell")
+    net_side = "buy" if buys > sells else "sell"
+    available = min(buys, sells) + settled
+
+    allocated = list()
+    for side, amount in orders:
+        filled = amount if side != net_side else min(amount, available)
+        available -= filled if side == net_side else 0
+        allocated.append(filled)
+    return allocated
+
+
+class NettedOrders(BulkOrders):
+    """
+    Executes a stream of customer orders as a sequence of batch auctions. The orders of one
+    batch are priced at a single NAV, every customer's buys and sells are netted into one
+    position, opposing positions are crossed customer to customer and only the remainder is
+    settled against the pool (see `cross`). Each fill is one atomic group of an ETF transfer
+    and its Algo payment, so a batch of N orders costs at most two transactions per customer
+    with a non-zero position instead of two per order.
+
+    Attributes:
+        interval: seconds orders are collected for before a batch is settled.
+        max_orders: maximum number of orders in one batch.
+    """
+
+    def __init__(self: NettedOrders, client: algod.AlgodClient, credentials: Dict[str, Tuple[str, str]], pool_passphrase: str, interval: float = netting_interval, max_orders: int = netting_max_batch, window: int = orders_window, session_pool: SessionPool = session_pool) -> None:
+        """
+        initialize the NettedOrders object.
+
+        :param client -> ``algod.AlgodClient``: the algod client transactions are built against.
+        :param credentials -> ``Dict[str, Tuple[str, str]]``: maps an account name to its address and passphrase.
+        :param pool_passphrase -> ``str``: the passphrase of the algoetf pool address.
+        :param interval -> ``float``: seconds orders are collected for before a batch is settled.
+        :param max_orders -> ``int``: maximum number of orders in one batch.
+        :param window -> ``int``: maximum number of fills in flight at once.
+        :param session_pool -> ``SessionPool``: the pool providing the shared HTTP session.
+        :return -> ``None``:
+        """
+        super().__init__(client, credentials, pool_passphrase, window, session_pool)
+        self.interval = interval
+        self.max_orders = max_orders
+
+    def party(self: NettedOrders, account: Optional[str]) -> Tuple[str, str]:
+        """the address and passphrase of `account`, or of the algoetf pool if `account` is ``None``."""
+        return (algoetf_addr, self.pool_passphrase) if account is None else self.credentials[account]
+
+    def transaction_between(self: NettedOrders, seller: Optional[str], buyer: Optional[str], amount: int) -> Transaction:
+        """
+        build the `Transaction` of a fill: `seller` transfers `amount` ETF tokens to `buyer` and is paid in Algos.
+
+        :param seller -> ``Optional[str]``: the account name of the seller, or ``None`` for the pool.
+        :param buyer -> ``Optional[str]``: the account name of the buyer, or ``None`` for the pool.
+        :param amount -> ``int``: the number of ETF tokens transferred.
+        :return -> ``Transaction``: the transaction between the two parties.
+        """
+        seller_address, seller_passphrase = self.party(seller)
+        buyer_address, buyer_passphrase = self.party(buyer)
+        return Transaction(self.client, sender=seller_address, receiver_address=buyer_address, buy_or_sell_passphrase=seller_passphrase, algo_exchange_passphrase=buyer_passphrase, amount=amount)
+
+    async def settle_batch(self: NettedOrders, session: aiohttp.ClientSession, tracker: ConfirmationTracker, batch: List[Dict[str, Any]], quote: Dict[str, Any], batch_number: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        net, cross and settle the orders of one batch at `quote`.
+
+        :param session -> ``aiohttp.ClientSession``: the pooled session to submit through.
+        :param tracker -> ``ConfirmationTracker``: the tracker shared by every batch of the run.
+        :param batch -> ``List[Dict[str, Any]]``: the orders of the batch, as returned by `read_orders`.
+        :param quote -> ``Dict[str, Any]``: the quote every order of the batch is priced at, as returned by `Transaction.quote`.
+        :param batch_number -> ``int``: the position of the batch in the run.
+        :return -> ``Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]``: the result of every order, in batch order, and the result of every fill.
+        """
+        results = [dict(order, batch=batch_number, net=None, settled=0, unsettled=0, settlements=list(), nav=quote["nav"], algorand_price=quote["algorand_price"], error=None) for order in batch]
+        positions: Dict[str, int] = dict()
+        orders_of: Dict[str, List[Tuple[Dict[str, Any], int]]] = dict()
+
+        for result in results:
+            try:
+                amount = self.validate(result)
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                continue
+            positions[result["account"]] = positions.get(result["account"], 0) + (amount if result["side"] == "buy" else -amount)
+            orders_of.setdefault(result["account"], list()).append((result, amount))
+
+        fills = [{"seller": seller, "buyer": buyer, "amount": amount, "txid": None, "exchange_txid": None, "submitted": False, "round": None, "error": None} for seller, buyer, amount in cross(positions)]
+        slots = asyncio.Semaphore(self.window)
+
+        async def settle_fill(fill):
+            async with slots:
+                try:
+                    transaction = self.transaction_between(fill["seller"], fill["buyer"], fill["amount"])
+                    await self.settle(session, tracker, transaction, "sell", quote, fill)
+                except Exception as e:
+                    fill["error"] = f"{type(e).__name__}: {e}"
+
+        with tracer.span("NettedOrders.settle_batch"):
+            await asyncio.gather(*(settle_fill(fill) for fill in fills))
+
+        fills_of: Dict[str, List[Dict[str, Any]]] = dict()
+        for fill in fills:
+            for account in (fill["seller"], fill["buyer"]):
+                if account is not None:
+                    fills_of.setdefault(account, list()).append(fill)
+
+        for account, orders in orders_of.items():
+            net = positions[account]
+            settlements = fills_of.get(account, list())
+            # a customer's position is settled by several fills, so some of it may have moved on chain even if another fill failed.
+            failed = [fill["error"] for fill in settlements if fill["error"]]
+            settled = sum(fill["amount"] for fill in settlements if not fill["error"])
+            net_side = "buy" if net > 0 else "sell"
+
+            for (result, amount), order_settled in zip(orders, allocate([(result["side"], amount) for result, amount in orders], settled)):
+                # only the orders on the side of the net position are settled by fills; the others are netted away.
+                result.update(net=net, settled=order_settled, unsettled=amount - order_settled, settlements=settlements if net and result["side"] == net_side else list())
+                if order_settled < amount:
+                    result["error"] = f"{'partially settled' if order_settled else 'settlement failed'} ({order_settled} of {amount} tokens): {failed[0]}"
+
+        return results, fills
+
+    async def run(self: NettedOrders, orders: Iterator[Dict[str, Any]], quote_for: Callable[[], Dict[str, Any]], output: TextIO) -> Dict[str, int]:
+        """
+        execute every order of `orders` in batch auctions, writing one JSON line per order to `output` in order.
+
+        :param orders -> ``Iterator[Dict[str, Any]]``: the orders, as returned by `read_orders`.
+        :param quote_for -> ``Callable[[], Dict[str, Any]]``: returns the quote a batch is priced at, like `Transaction.quote`; called once per batch.
+        :param output -> ``TextIO``: where the results are written.
+        :return -> ``Dict[str, int]``: the number of orders executed, partially settled and failed, and the number of fills and submitted transactions they were settled with.
+        """
+        counts = {"executed": 0, "partial": 0, "failed": 0, "fills": 0, "transactions": 0}
+        loop = asyncio.get_running_loop()
+
+        async with self.session_pool.session() as session:
+            tracker = ConfirmationTracker(self.client, self.session_pool)
+
+            with tracer.span("NettedOrders.run"):
+                batch_number = 0
+                async for batch in batches(orders, self.interval, self.max_orders):
+                    # `Transaction.quote` runs its own event loop, so it is called off this one.
+                    quote = await loop.run_in_executor(None, quote_for)
+                    results, fills = await self.settle_batch(session, tracker, batch, quote, batch_number)
+
+                    batch_number += 1
+
+                    counts["fills"] += len(fills)
+                    counts["transactions"] += 2 * sum(1 for fill in fills if fill["submitted"])
+                    for result in results:
+                        counts["partial" if result["error"] and result["settled"] else "failed" if result["error"] else "executed"] += 1
+                        output.write(json.dumps(result, default=str) + "\n")
+
+        return counts
@@ -0,0 +1,238 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Type
+import argparse
+import asyncio
+import json
+import sys
+import numpy as np
+
+from pos_etf.cli.utils.constants import coinmarketcap_url, rebalance_min_trade, rebalance_tolerance
+from pos_etf.cli.weights import engine
+from pos_etf.cli.weights.base import BaseEtf
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+from pos_etf.cli.weights.registry import strategy_registry
+
+class TradePlan(object):
+    """
+    The trades that rebalance a set of portfolios, one row per portfolio and one column per
+    coin. Every array has shape (portfolios, coins).
+
+    Attributes:
+        portfolios: the name of each portfolio.
+        coins: the slug of each coin.
+        prices: the price of each coin the plan was computed at.
+        holdings: units of each coin held before the trades.
+        target_weights: the weight of each coin the strategy aims for.
+        units: units of each coin to buy (positive) or sell (negative).
+        funding_coin: the coin every other coin is bought with and sold into (``None`` for no funding leg).
+    """
+
+    def __init__(self: TradePlan, portfolios: Sequence[str], coins: Sequence[str], prices: np.ndarray, holdings: np.ndarray, target_weights: np.ndarray, units: np.ndarray, funding_coin: Optional[str] = None) -> None:
+        """
+        initialize the TradePlan object.
+
+        :param portfolios -> ``Sequence[str]``: the name of each portfolio.
+        :param coins -> ``Sequence[str]``: the slug of each coin.
+        :param prices -> ``np.ndarray``: the price of each coin.
+        :param holdings -> ``np.ndarray``: units of each coin held before the trades.
+        :param target_weights -> ``np.ndarray``: the weight of each coin the strategy aims for.
+        :param units -> ``np.ndarray``: units of each coin to buy (positive) or sell (negative).
+        :param funding_coin -> ``str``: the coin every other coin is bought with and sold into.
+        :return -> ``None``:
+        """
+        self.portfolios = list(portfolios)
+        self.coins = list(coins)
+        self.prices = np.broadcast_to(prices, holdings.shape)
+        self.holdings = holdings
+        self.target_weights = np.broadcast_to(target_weights, holdings.shape)
+        self.units = units
+        self.funding_coin = funding_coin
+
+    @property
+    def values(self: TradePlan) -> np.ndarray:
+        """the value of every trade, positive for buys and negative for sells."""
+        return self.units * self.prices
+
+    def trades(self: TradePlan) -> Iterator[Dict[str, Any]]:
+        """
+        the trades of the plan in the order they can be executed: per portfolio, every sale into
+        the funding coin first, so its proceeds are available for the purchases that follow.
+
+        :return -> ``Iterator[Dict[str, Any]]``: the `portfolio`, `coin`, `side`, `units`, `price` and `value` of every trade.
+        """
+        funding_index = self.coins.index(self.funding_coin) if self.funding_coin in self.coins else None
+        values = self.values
+
+        traded = self.units != 0
+        if funding_index is not None:
+            traded[:, funding_index] = False
+        rows, columns = np.nonzero(traded)
+        order = np.lexsort((values[rows, columns], rows))
+        rows, columns = rows[order], columns[order]
+
+        for row, column, units, price, value in zip(rows.tolist(), columns.tolist(), self.units[rows, columns].tolist(), self.prices[rows, columns].tolist(), values[rows, columns].tolist()):
+            yield {
+                "portfolio": self.portfolios[row],
+                "coin": self.coins[column],
+                "side": "buy" if units > 0 else "sell",
+                "units": abs(units),
+                "price": price,
+                "value": abs(value),
+                "funded_with": self.funding_coin
+            }
+
+    def summary(self: TradePlan) -> Dict[str, Dict[str, float]]:
+        """
+        summarize the plan per portfolio.
+
+        :return -> ``Dict[str, Dict[str, float]]``: the value, number of trades, turnover and net funding-coin flow of each portfolio.
+        """
+        values = self.values
+        funding_index = self.coins.index(self.funding_coin) if self.funding_coin in self.coins else None
+        traded = values.copy()
+        if funding_index is not None:
+            traded[:, funding_index] = 0.0
+
+        return {
+            portfolio: {
+                "value": float((self.holdings[row] * self.prices[row]).sum()),
+                "trades": int(np.count_nonzero(traded[row])),
+                "turnover": float(np.abs(traded[row]).sum()),
+                "funding_flow": float(values[row, funding_index]) if funding_index is not None else 0.0
+            }
+            for row, portfolio in enumerate(self.portfolios)
+        }
+
+    def write(self: TradePlan, output: TextIO) -> int:
+        """
+        write the plan to `output` as JSON lines, one trade per line.
+
+        :param output -> ``TextIO``: where the trades are written.
+        :return -> ``int``: the number of trades written.
+        """
+        count = 0
+        for trade in self.trades():
+            output.write(json.dumps(trade) + "\n")
+            count += 1
+        return count
+
+
+class Rebalancer(object):
+    """
+    Converts the holdings of the pool, and of any number of sub-portfolios, into the basket of
+    a weighting strategy. Target weights, drift and trades are computed for every portfolio and
+    coin in a handful of array operations (see `engine.rebalance`), so baskets of hundreds of
+    coins over many portfolios are planned in milliseconds.
+
+    Coins are only traded once their weight drifts more than `tolerance` from the target and
+    the trade is worth at least `min_trade_value`; the funding coin (Algos, by default) is what
+    every trade is settled in, so it absorbs the difference and needs no trade of its own.
+
+    Attributes:
+        strategy: the strategy class whose `weights` the portfolios are rebalanced to.
+        tolerance: the absolute weight drift tolerated before a coin is traded.
+        min_trade_value: the smallest trade worth placing, in USD.
+        funding_coin: the coin every other coin is bought with and sold into.
+    """
+
+    strategies = strategy_registry
+
+    def __init__(self: Rebalancer, strategy: Type[BaseEtf] = NetAssetValue, tolerance: float = rebalance_tolerance, min_trade_value: float = rebalance_min_trade, funding_coin: Optional[str] = "algorand") -> None:
+        """
+        initialize the Rebalancer object.
+
+        :param strategy -> ``Type[BaseEtf]``: the strategy class whose `weights` the portfolios are rebalanced to.
+        :param tolerance -> ``float``: the absolute weight drift tolerated before a coin is traded.
+        :param min_trade_value -> ``float``: the smallest trade worth placing, in USD.
+        :param funding_coin -> ``str``: the coin every other coin is bought with and sold into, or ``None`` for no funding leg.
+        :return -> ``None``:
+        """
+        self.strategy = strategy
+        self.tolerance = tolerance
+        self.min_trade_value = min_trade_value
+        self.funding_coin = funding_coin
+
+    @property
+    def stats_to_extract(self: Rebalancer) -> Tuple[str]:
+        """the statistics the strategy's weights and the trade prices are computed from."""
+        return tuple(dict.fromkeys(self.strategy.stats_to_extract + ("price",)))
+
+    async def fetch_columns(self: Rebalancer, base_url: str = coinmarketcap_url) -> Tuple[Tuple[str], Dict[str, np.ndarray]]:
+        """
+        retrieve the statistics of the strategy's basket.
+
+        :param base_url -> ``str``: the URL prefix coin statistics are requested from.
+        :return -> ``Tuple[Tuple[str], Dict[str, np.ndarray]]``: the coins of the basket and an array of shape (coins,) per statistic.
+        """
+        snapshot = await self.strategy(base_url).get_basket(self.stats_to_extract)
+
+        return snapshot.coins, snapshot.columns
+
+    @staticmethod
+    def holdings_matrix(holdings: Dict[str, Dict[str, float]], coins: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        arrange per-portfolio holdings as one row per portfolio and one column per coin of `coins`.
+
+        :param holdings -> ``Dict[str, Dict[str, float]]``: the units of each coin held by each portfolio.
+        :param coins -> ``Sequence[str]``: the coins of the basket.
+        :return -> ``Tuple[List[str], np.ndarray]``: the portfolio names and the holdings, shape (portfolios, coins).
+        """
+        column_of = {coin: column for column, coin in enumerate(coins)}
+        matrix = np.zeros((len(holdings), len(coins)))
+
+        for row, (portfolio, units) in enumerate(holdings.items()):
+            for coin, amount in units.items():
+                if coin not in column_of:
+                    raise ValueError(f"Portfolio {portfolio} holds {coin}, which is not in the basket.")
+                matrix[row, column_of[coin]] = amount
+
+        return list(holdings), matrix
+
+    def plan(self: Rebalancer, portfolios: Sequence[str], coins: Sequence[str], holdings: np.ndarray, columns: Dict[str, np.ndarray]) -> TradePlan:
+        """
+        compute the trades that rebalance every portfolio to the strategy's target weights.
+
+        :param portfolios -> ``Sequence[str]``: the name of each portfolio.
+        :param coins -> ``Sequence[str]``: the slug of each coin.
+        :param holdings -> ``np.ndarray``: units of each coin held, shape (portfolios, coins).
+        :param columns -> ``Dict[str, np.ndarray]``: the statistics of the basket, shape (coins,) or (portfolios, coins), including `price`.
+        :return -> ``TradePlan``: the trades.
+        """
+        coins = list(coins)
+        if self.funding_coin is not None and self.funding_coin not in coins:
+            raise ValueError(f"The funding coin {self.funding_coin} is not in the basket.")
+
+        holdings = np.asarray(holdings, dtype=np.float64).reshape(len(portfolios), len(coins))
+        target_weights = self.strategy.weights(columns)
+        funding_index = coins.index(self.funding_coin) if self.funding_coin is not None else None
+
+        units = engine.rebalance(holdings, columns["price"], target_weights, self.tolerance, self.min_trade_value, funding_index)
+        return TradePlan(portfolios, coins, np.asarray(columns["price"], dtype=np.float64), holdings, target_weights, units, self.funding_coin)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Plan the trades that convert pooled Algos and current holdings into the basket of a weighting strategy.")
+    parser.add_argument("holdings", help="JSON file mapping every portfolio to the units of each coin it holds, e.g. {\"pool\": {\"algorand\": 25000}}")
+    parser.add_argument("--strategy", choices=sorted(Rebalancer.strategies), default="net_asset_value", help="the strategy whose weights are targeted")
+    parser.add_argument("--tolerance", type=float, default=rebalance_tolerance, help="absolute weight drift tolerated before a coin is traded")
+    parser.add_argument("--min-trade", type=float, default=rebalance_min_trade, help="smallest trade worth placing, in USD")
+    parser.add_argument("--output", help="file the trade plan is written to as JSON lines (defaults to standard output)")
+    args = parser.parse_args()
+
+    with open(args.holdings) as f:
+        holdings = json.load(f)
+
+    rebalancer = Rebalancer(Rebalancer.strategies[args.strategy], args.tolerance, args.min_trade)
+    coins, columns = asyncio.run(rebalancer.fetch_columns())
+    portfolios, matrix = rebalancer.holdings_matrix(holdings, coins)
+    plan = rebalancer.plan(portfolios, coins, matrix, columns)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            count = plan.write(output)
+    else:
+        count = plan.write(sys.stdout)
+
+    for portfolio, summary in plan.summary().items():
+        print(f"{portfolio}: value ${summary['value']:,.2f}, {summary['trades']} trades, turnover ${summary['turnover']:,.2f}, net {rebalancer.funding_coin} flow ${summary['funding_flow']:,.2f}", file=sys.stderr)
+    print(f"{count} trades planned.", file=sys.stderr)
@@ -0,0 +1,3 @@
+from pos_etf.cli.rebalance import main
+
+main()
@@ -0,0 +1,449 @@
+from __future__ import annotations
+from typing import Dict, Iterable, Optional, Tuple
+import fcntl
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import numpy as np
+
+from pos_etf.cli.error import SnapshotStoreError
+from pos_etf.cli.utils import constants
+
+MAGIC = b"POSSNAP1"
+HEADER_FORMAT = "<8sIIQQI" # magic, n_coins, n_stats, capacity, count, index length
+HEADER_SIZE = 4096
+COUNT_OFFSET = struct.calcsize("<8sIIQ")
+DEFAULT_STATS = ('price', 'marketCap', 'circulatingSupply')
+
+class BasketSnapshot(object):
+    """
+    One fetch of the basket, stored as a single (stats, coins) float array instead of a dict
+    of dicts per coin. Only the requested statistics are kept, so a snapshot of ten coins and
+    three statistics costs a few hundred bytes, and thousands of them can be held in memory.
+
+    Attributes:
+        snapshot_id: the id of the fetch in the snapshot store, or ``None`` if it was not recorded.
+        timestamp: when the statistics were retrieved (seconds since the epoch).
+        coins: the slug of each coin, in column order.
+        stats: the statistics kept, in row order.
+        values: the statistics, shape (stats, coins).
+        freshness: which coins were filled in from last known good statistics, as built by `BaseEtf.get_basket` (``None`` if not reported).
+    """
+
+    __slots__ = ("snapshot_id", "timestamp", "coins", "stats", "values", "freshness")
+
+    def __init__(self: BasketSnapshot, coins: Tuple[str], stats: Tuple[str], values: np.ndarray, snapshot_id: Optional[int] = None, timestamp: Optional[float] = None) -> None:
+        """
+        initialize the BasketSnapshot object.
+
+        :param coins -> ``Tuple[str]``: the slug of each coin, in column order.
+        :param stats -> ``Tuple[str]``: the statistics kept, in row order.
+        :param values -> ``np.ndarray``: the statistics, shape (stats, coins).
+        :param snapshot_id -> ``int``: the id of the fetch in the snapshot store, or ``None``.
+        :param timestamp -> ``float``: when the statistics were retrieved, defaults to now.
+        :return -> ``None``:
+        """
+        self.coins = tuple(coins)
+        self.stats = tuple(stats)
+        self.values = values
+        self.snapshot_id = snapshot_id
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.freshness = None
+
+    @classmethod
+    def parse(cls: BasketSnapshot, coins: Iterable[str], statistics: Iterable[Dict[str, int or float]], stats: Iterable[str], snapshot_id: Optional[int] = None, timestamp: Optional[float] = None) -> BasketSnapshot:
+        """
+        keep `stats` of every coin's statistics in a snapshot. Nothing else of the statistics
+        objects is referenced afterwards, so they can be freed as soon as the caller drops them.
+
+        :param coins -> ``Iterable[str]``: the slug of each coin.
+        :param statistics -> ``Iterable[Dict[str, int or float]]``: the statistics of each coin, in the order of `coins`.
+        :param stats -> ``Iterable[str]``: the statistics to keep (missing or ``None`` values are stored as NaN).
+        :param snapshot_id -> ``int``: the id of the fetch in the snapshot store, or ``None``.
+        :param timestamp -> ``float``: when the statistics were retrieved, defaults to now.
+        :return -> ``BasketSnapshot``: the snapshot.
+        """
+        stats = tuple(stats)
+        statistics = list(statistics)
+        values = np.array(
+            [[np.nan if coin_statistics.get(stat) is None else coin_statistics[stat] for coin_statistics in statistics] for stat in stats],
+            dtype=np.float64
+        ).reshape(len(stats), len(statistics))
+
+        return cls(coins, stats, values, snapshot_id, timestamp)
+
+    @classmethod
+    def from_coin_data(cls: BasketSnapshot, coin_data: Dict[str, Dict[str, int or float]], snapshot_id: Optional[int] = None) -> BasketSnapshot:
+        """
+        build a snapshot from structured statistics.
+
+        :param coin_data -> ``Dict[str, Dict[str, int or float]]``: structured statistics, as returned by `BaseEtf.structure`.
+        :param snapshot_id -> ``int``: the id of the fetch in the snapshot store, or ``None``.
+        :return -> ``BasketSnapshot``: the snapshot.
+        """
+        stats = dict.fromkeys(stat for statistics in coin_data.values() for stat in statistics)
+        return cls.parse(coin_data, coin_data.values(), stats, snapshot_id)
+
+    @classmethod
+    def from_store(cls: BasketSnapshot, store: SnapshotStore, snapshot_id: int) -> BasketSnapshot:
+        """
+        copy a recorded snapshot out of `store`, e.g. to re-evaluate the strategies on a past quote.
+
+        :param store -> ``SnapshotStore``: the store the snapshot was recorded in.
+        :param snapshot_id -> ``int``: the id returned by `SnapshotStore.append`.
+        :return -> ``BasketSnapshot``: the snapshot.
+        """
+        if not 0 <= snapshot_id < len(store):
+            raise SnapshotStoreError(f"Snapshot {snapshot_id} does not exist.")
+
+        values = np.stack([store.column(stat)[snapshot_id] for stat in store.stats])
+        return cls(store.coins, store.stats, values, snapshot_id, float(store.timestamps[snapshot_id]))
+
+    @property
+    def columns(self: BasketSnapshot) -> Dict[str, np.ndarray]:
+        """zero-copy views of every statistic, shape (coins,), as the strategies' `evaluate` functions read them."""
+        return {stat: self.values[row] for row, stat in enumerate(self.stats)}
+
+    def coin(self: BasketSnapshot, coin: str) -> Dict[str, float]:
+        """
+        the statistics of one coin.
+
+        :param coin -> ``str``: the coin slug.
+        :return -> ``Dict[str, float]``: the value of every statistic.
+        """
+        column = self.coins.index(coin)
+        return {stat: float(self.values[row, column]) for row, stat in enumerate(self.stats)}
+
+    def to_coin_data(self: BasketSnapshot) -> Dict[str, Dict[str, float]]:
+        """
+        the snapshot as structured statistics, like `BaseEtf.structure` returns them.
+
+        :return -> ``Dict[str, Dict[str, float]]``: the statistics of every coin.
+        """
+        return {coin: self.coin(coin) for coin in self.coins}
+
+    @property
+    def key(self: BasketSnapshot) -> str:
+        """
+        a key identifying the snapshot by a digest of its coins, statistics and values. Snapshot
+        ids are only unique within one store, so they are not part of the key: snapshots from
+        different stores never collide, and identical data gets the same key.
+        """
+        digest = hashlib.sha1(",".join(self.coins + ("|",) + self.stats).encode())
+        digest.update(np.ascontiguousarray(self.values).tobytes())
+        return f"sha1:{digest.hexdigest()}"
+
+
+class SnapshotStore(object):
+    """
+    An append-only, memory-mapped columnar file of coin statistics. Every appended row is
+    one fetch of the basket: a timestamp plus one value per (coin, statistic).
+
+    Layout of the file:
+
+        [header: magic, n_coins, n_stats, capacity, count, JSON index of coins and stats]
+        [timestamps: float64 x capacity]
+        [stat 0: float64 x capacity x n_coins]
+        [stat 1: float64 x capacity x n_coins] ...
+
+    The file is pre-allocated to `capacity` rows and doubled when full, so appends only
+    write the new row and bump `count` in the header. Readers map the same file and get
+    zero-copy NumPy views of the first `count` rows. Timestamps must be non-decreasing,
+    which lets time-range queries use a binary search.
+
+    Attributes:
+        path: the location of the snapshot file.
+        coins: the coin slugs stored, in column order.
+        stats: the statistics stored, in column order.
+    """
+
+    def __init__(self: SnapshotStore, path: str, coins: Optional[Iterable[str]] = None, stats: Iterable[str] = DEFAULT_STATS, initial_capacity: int = 1024, readonly: bool = False) -> None:
+        """
+        open the snapshot file at `path`, creating it when it does not exist yet.
+
+        :param path -> ``str``: the location of the snapshot file.
+        :param coins -> ``Iterable[str]``: the coin slugs to store (required when creating the file).
+        :param stats -> ``Iterable[str]``: the statistics to store for each coin.
+        :param initial_capacity -> ``int``: number of rows to pre-allocate for a new file.
+        :param readonly -> ``bool``: map the file read-only.
+        :return -> ``None``:
+        """
+        self.path = path
+        self.readonly = readonly
+
+        if not os.path.exists(path):
+            if readonly or coins is None:
+                raise SnapshotStoreError(f"Snapshot file {path} does not exist.")
+            self._create(tuple(coins), tuple(stats), initial_capacity)
+
+        self._file = open(path, "rb" if readonly else "r+b")
+        self._map()
+
+        if coins is not None and (tuple(coins) != self.coins or tuple(stats) != self.stats):
+            raise SnapshotStoreError(
+                f"Snapshot file {path} stores coins {self.coins} and stats {self.stats}, which do not match the requested layout.")
+
+    @classmethod
+    def open(cls: SnapshotStore, path: str) -> SnapshotStore:
+        """
+        open an existing snapshot file read-only.
+
+        :param path -> ``str``: the location of the snapshot file.
+        :return -> ``SnapshotStore``: the opened store.
+        """
+        return cls(path, readonly=True)
+
+    def _create(self: SnapshotStore, coins: Tuple[str], stats: Tuple[str], capacity: int) -> None:
+        """write an empty snapshot file with room for `capacity` rows."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path, "wb") as f:
+            f.write(self._pack_header(coins, stats, capacity, 0))
+            f.truncate(HEADER_SIZE + self._data_size(capacity, len(coins), len(stats)))
+
+    @classmethod
+    def _pack_header(cls: SnapshotStore, coins: Tuple[str], stats: Tuple[str], capacity: int, count: int) -> bytes:
+        """serialize the header, padded to `HEADER_SIZE` bytes."""
+        index = json.dumps({"coins": coins, "stats": stats}).encode()
+        header = struct.pack(HEADER_FORMAT, MAGIC, len(coins), len(stats), capacity, count, len(index)) + index
+
+        if len(header) > HEADER_SIZE:
+            raise SnapshotStoreError("Too many coins or stats to fit in the snapshot header.")
+
+        return header.ljust(HEADER_SIZE, b"\0")
+
+    @classmethod
+    def _data_size(cls: SnapshotStore, capacity: int, n_coins: int, n_stats: int) -> int:
+        """number of bytes needed for the timestamp and stat columns."""
+        return 8 * capacity * (1 + n_coins * n_stats)
+
+    def _map(self: SnapshotStore) -> None:
+        """read the header and (re)map the columns of the file."""
+        self._file.seek(0)
+        raw_header = self._file.read(HEADER_SIZE)
+        magic, n_coins, n_stats, capacity, count, index_length = struct.unpack_from(HEADER_FORMAT, raw_header)
+
+        if magic != MAGIC:
+            raise SnapshotStoreError(f"{self.path} is not a snapshot file.")
+
+        index = json.loads(raw_header[struct.calcsize(HEADER_FORMAT):struct.calcsize(HEADER_FORMAT) + index_length])
+        self.coins = tuple(index["coins"])
+        self.stats = tuple(index["stats"])
+        self._coin_index = {coin: i for i, coin in enumerate(self.coins)}
+        self._capacity = capacity
+        self._count = count
+        self._inode = os.fstat(self._file.fileno()).st_ino
+
+        mode = "r" if self.readonly else "r+"
+        self._header = np.memmap(self._file, dtype=np.uint8, mode=mode, offset=0, shape=(HEADER_SIZE,))
+        data = np.memmap(self._file, dtype=np.float64, mode=mode, offset=HEADER_SIZE, shape=(capacity * (1 + n_coins * n_stats),))
+
+        self._data = data
+        self._timestamps = data[:capacity]
+        self._columns = {
+            stat: data[capacity * (1 + i * n_coins):capacity * (1 + (i + 1) * n_coins)].reshape(capacity, n_coins)
+            for i, stat in enumerate(self.stats)
+        }
+
+    def refresh(self: SnapshotStore) -> None:
+        """pick up rows appended by other processes since the file was mapped."""
+        if os.stat(self.path).st_ino != self._inode:
+            self._file.close()
+            self._file = open(self.path, "rb" if self.readonly else "r+b")
+            self._map()
+            return
+
+        count, = struct.unpack_from("<Q", self._header, COUNT_OFFSET)
+        if count > self._capacity:
+            self._map()
+        else:
+            self._count = count
+
+    def _grow(self: SnapshotStore, min_capacity: int) -> None:
+        """rewrite the file with at least `min_capacity` rows of room, doubling the current capacity."""
+        capacity = max(self._capacity * 2, min_capacity)
+        tmp_path = self.path + ".grow"
+
+        with open(tmp_path, "wb") as f:
+            f.write(self._pack_header(self.coins, self.stats, capacity, self._count))
+            f.truncate(HEADER_SIZE + self._data_size(capacity, len(self.coins), len(self.stats)))
+
+        grown = np.memmap(tmp_path, dtype=np.float64, mode="r+", offset=HEADER_SIZE, shape=(capacity * (1 + len(self.coins) * len(self.stats)),))
+        grown[:self._count] = self._timestamps[:self._count]
+        for i, stat in enumerate(self.stats):
+            start = capacity * (1 + i * len(self.coins))
+            grown[start:start + self._count * len(self.coins)] = self._columns[stat][:self._count].ravel()
+        grown.flush()
+        del grown
+
+        os.replace(tmp_path, self.path)
+        self._file.close()
+        self._file = open(self.path, "r+b")
+        self._map()
+
+    def append(self: SnapshotStore, timestamp: Optional[float], coin_data: Dict[str, Dict[str, int or float]]) -> int:
+        """
+        append one fetch of the basket. Coins or stats missing from `coin_data` are stored as NaN.
+
+        :param timestamp -> ``float``: when the statistics were retrieved (seconds since the epoch), or ``None`` to
+                                       stamp the row with the current time while holding the append lock, which keeps
+                                       concurrent writers in timestamp order.
+        :param coin_data -> ``Dict[str, Dict[str, int or float]]``: structured statistics, as returned by `BaseEtf.structure`.
+        :return -> ``int``: the snapshot id (row index) of the appended fetch.
+        """
+        values = {stat: np.full((1, len(self.coins)), np.nan) for stat in self.stats}
+
+        for coin, statistics in coin_data.items():
+            column = self._coin_index.get(coin)
+            if column is None:
+                continue
+            for stat, value in statistics.items():
+                if stat in values and value is not None:
+                    values[stat][0, column] = value
+
+        return self.append_many(None if timestamp is None else np.array([timestamp], dtype=np.float64), values)
+
+    def append_snapshot(self: SnapshotStore, snapshot: BasketSnapshot) -> int:
+        """
+        append one fetch of the basket, stamped with the current time.
+
+        :param snapshot -> ``BasketSnapshot``: the snapshot to record.
+        :return -> ``int``: the snapshot id of the appended fetch.
+        """
+        if snapshot.coins != self.coins:
+            return self.append(None, snapshot.to_coin_data())
+
+        return self.append_many(None, {stat: snapshot.values[row][np.newaxis] for row, stat in enumerate(snapshot.stats)})
+
+    def append_many(self: SnapshotStore, timestamps: Optional[np.ndarray], values: Dict[str, np.ndarray]) -> int:
+        """
+        append a block of rows at once.
+
+        :param timestamps -> ``np.ndarray``: shape (rows,) non-decreasing timestamps (``None`` stamps a single row with the current time).
+        :param values -> ``Dict[str, np.ndarray]``: for each stat, an array of shape (rows, coins).
+        :return -> ``int``: the snapshot id of the first appended row.
+        """
+        if self.readonly:
+            raise SnapshotStoreError(f"Snapshot file {self.path} is opened read-only.")
+
+        # appends are serialized through a sidecar lock file, which (unlike the data file) is never replaced by `_grow`.
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            return self._append_locked(timestamps, values)
+
+    def _append_locked(self: SnapshotStore, timestamps: Optional[np.ndarray], values: Dict[str, np.ndarray]) -> int:
+        """write the rows of `append_many` while holding the append lock."""
+        self.refresh()
+
+        timestamps = np.array([time.time()]) if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+        n_rows = len(timestamps)
+
+        last_timestamp = self._timestamps[self._count - 1] if self._count else -np.inf
+        if n_rows and (timestamps[0] < last_timestamp or np.any(np.diff(timestamps) < 0)):
+            raise SnapshotStoreError("Snapshot timestamps must be non-decreasing.")
+
+        if self._count + n_rows > self._capacity:
+            self._grow(self._count + n_rows)
+
+        first_id = self._count
+        self._timestamps[first_id:first_id + n_rows] = timestamps
+        for stat in self.stats:
+            column = values.get(stat)
+            self._columns[stat][first_id:first_id + n_rows] = np.nan if column is None else column
+
+        # rows are written before the count is published, so readers sharing the mapping never see a partial row.
+        self._count += n_rows
+        struct.pack_into("<Q", self._header, COUNT_OFFSET, self._count)
+
+        return first_id
+
+    def __len__(self: SnapshotStore) -> int:
+        return self._count
+
+    @property
+    def timestamps(self: SnapshotStore) -> np.ndarray:
+        """zero-copy view of the timestamps of every stored row."""
+        return self._timestamps[:self._count]
+
+    def column(self: SnapshotStore, stat: str) -> np.ndarray:
+        """
+        zero-copy view of `stat` for every stored row.
+
+        :param stat -> ``str``: one of `self.stats`.
+        :return -> ``np.ndarray``: shape (rows, coins).
+        """
+        return self._columns[stat][:self._count]
+
+    def between(self: SnapshotStore, start: float = -np.inf, end: float = np.inf) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        zero-copy views of the rows whose timestamp falls in [`start`, `end`).
+
+        :param start -> ``float``: inclusive lower bound (seconds since the epoch).
+        :param end -> ``float``: exclusive upper bound (seconds since the epoch).
+        :return -> ``Tuple[np.ndarray, Dict[str, np.ndarray]]``: the timestamps and a (rows, coins) array per stat.
+        """
+        timestamps = self.timestamps
+        first, last = np.searchsorted(timestamps, [start, end], side="left")
+
+        return (
+            timestamps[first:last],
+            {stat: self._columns[stat][first:last] for stat in self.stats}
+        )
+
+    def row(self: SnapshotStore, snapshot_id: int) -> Tuple[float, Dict[str, Dict[str, float]]]:
+        """
+        rebuild the structured statistics of a single snapshot, e.g. to audit a quoted NAV.
+
+        :param snapshot_id -> ``int``: the id returned by `append`.
+        :return -> ``Tuple[float, Dict[str, Dict[str, float]]]``: the timestamp and the statistics per coin.
+        """
+        if not 0 <= snapshot_id < self._count:
+            raise SnapshotStoreError(f"Snapshot {snapshot_id} does not exist.")
+
+        return (
+            float(self._timestamps[snapshot_id]),
+            {
+                coin: {stat: float(self._columns[stat][snapshot_id, i]) for stat in self.stats}
+                for i, coin in enumerate(self.coins)
+            }
+        )
+
+    def close(self: SnapshotStore) -> None:
+        """flush and close the underlying file."""
+        if not self.readonly:
+            self._data.flush()
+        self._file.close()
+
+
+_default_stores: Dict[Tuple[str, Tuple[str]], Optional[SnapshotStore]] = dict()
+_default_stores_lock = threading.Lock()
+
+def default_snapshot_store(coins: Iterable[str]) -> Optional[SnapshotStore]:
+    """
+    return the store of the snapshot file configured by `ALGOETF_SNAPSHOT_PATH` for recording
+    `coins`, opened once and shared by every caller in the process. Recording is best-effort:
+    if the file cannot be opened (e.g. it stores a different coin or stat layout), the error
+    is reported once and no store is returned, so a snapshot file never blocks a trade.
+
+    :param coins -> ``Iterable[str]``: the coin slugs that will be recorded.
+    :return -> ``SnapshotStore``: the store, or ``None`` if recording is disabled or the file cannot be opened.
+    """
+    if not constants.snapshot_path:
+        return None
+
+    key = (constants.snapshot_path, tuple(coins))
+
+    with _default_stores_lock:
+        if key not in _default_stores:
+            try:
+                _default_stores[key] = SnapshotStore(constants.snapshot_path, coins=key[1])
+            except (SnapshotStoreError, OSError, ValueError, struct.error) as e:
+                print(f"Not recording snapshots: {e}", file=sys.stderr)
+                _default_stores[key] = None
+        return _default_stores[key]
@@ -1,4 +1,5 @@
 from argparse import ArgumentError
+from typing import Any, Dict, List
 import asyncio
 from os import error
 from algosdk.transaction import (
@@ -10,19 +11,25 @@ from algosdk.v2client import algod
 
 from pos_etf.cli.utils import (
     add_network_params,
-    sign_and_send,
+    sign_and_send_many,
+    sign_and_send_group,
     balance_formatter,
-    convert_algos_to_microalgo,
-    get_algorand_price
+    convert_algos_to_microalgo
 )
-from pos_etf.cli.utils.constants import algoetf_addr, asset_id
+from pos_etf.cli.utils.constants import algoetf_addr, asset_id, coinmarketcap_url
+from pos_etf.cli.utils.tracing import tracer
+from pos_etf.cli.snapshots import default_snapshot_store
+from pos_etf.cli.feed import request_quote
 from pos_etf.cli.weights.net_asset_value import NetAssetValue
 class Transaction:
 
-    def __init__(self, client: algod.AlgodClient, sender: str, receiver_address: str, buy_or_sell_passphrase: str, algo_exchange_passphrase: str, amount: float):
+    def __init__(self, client: algod.AlgodClient, sender: str, receiver_address: str, buy_or_sell_passphrase: str, algo_exchange_passphrase: str, amount: float, note: bytes = None):
         """
         What is common across both buy and sell transactions? I should use
         the common values to instantiate this client
+
+        `note` is attached to both legs; a unique note keeps two otherwise identical trades
+        built from the same cached params from getting the same transaction ids.
         """
         self.client = client
         self.sender = sender
@@ -30,6 +37,7 @@ class Transaction:
         self.buy_or_sell_passphrase = buy_or_sell_passphrase
         self.algo_exchange_passphrase = algo_exchange_passphrase
         self.amount = amount
+        self.note = note
     
     def build_txn(self, txn_obj: PaymentTxn or AssetTransferTxn, **kwargs):
         """
@@ -46,64 +54,120 @@ class Transaction:
 
         if txn_obj == AssetTransferTxn:
             transfer_data["index"] = kwargs.get("index")
+        if self.transaction.note:
+            transfer_data["note"] = self.transaction.note
 
         data = add_network_params(self.transaction.client, transfer_data)
         transaction = txn_obj(**data)
         return transaction
     
+    def passphrase_for(self, txn: PaymentTxn or AssetTransferTxn) -> str:
+        """
+        return the passphrase that signs `txn`: the Algo exchange passphrase for the payment leg
+        and the buy/sell passphrase for the asset transfer leg.
+
+        :param txn -> ``PaymentTxn`` or ``AssetTransferTxn``: a transaction built by this object.
+        """
+        return self.algo_exchange_passphrase if isinstance(txn, PaymentTxn) else self.buy_or_sell_passphrase
+
+    @tracer.traced("Transaction.send_txns")
     def send_txns(self, txns: PaymentTxn or AssetTransferTxn):
         """
         send txn to the algorand network
         
         :param txns -> ``PaymentTxn`` or ``AssetTransferTxn``: list of ``PaymentTxn`` or ``AssetTransferTxn`` transactions to.
         """
-        def handle_algo_txn():
-            transaction_info = sign_and_send(
-                txn, self.algo_exchange_passphrase, self.client)
-            formatted_amount = balance_formatter(
-                self.amount, asset_id, self.client)
-            print("Transferred {} Algos from {} to {}".format(
-                self.amount, self.receiver_address, self.sender))
+        passphrase_for = self.passphrase_for
 
+        def report(txn, transaction_info):
+            if isinstance(txn, PaymentTxn):
+                print("Transferred {} Algos from {} to {}".format(
+                    self.amount, self.receiver_address, self.sender))
+            else:
+                formatted_amount = balance_formatter(
+                    self.amount, asset_id, self.client)
+                print("Transferred {} from {} to {}".format(
+                    formatted_amount, self.sender, self.receiver_address))
             print("Transaction ID Confirmation: {}".format(
-                transaction_info.get("tx"))) 
-
-        def handle_etf_txn():
-            transaction_info = sign_and_send(
-                txn, self.buy_or_sell_passphrase, self.client)
-            formatted_amount = balance_formatter(
-                self.amount, asset_id, self.client)
-            print("Transferred {} from {} to {}".format(
-                formatted_amount, self.sender, self.receiver_address))
-            print("Transaction ID Confirmation: {}".format(
-                transaction_info.get("tx")))
+                transaction_info.get("tx") if transaction_info else None))
 
+        signable_txns = [txn for txn in txns if passphrase_for(txn)]
         for txn in txns:
-            if isinstance(txn, PaymentTxn):
-                if self.algo_exchange_passphrase:
-                    handle_algo_txn()       
-                else:
-                    write_to_file([txn], "transfer.txn")
-            
-            elif isinstance(txn, AssetTransferTxn):
-                if self.buy_or_sell_passphrase:
-                    handle_etf_txn()
-                else:
-                    write_to_file([txn], "transfer.txn")
+            if not passphrase_for(txn):
+                write_to_file([txn], "transfer.txn")
+
+        if not signable_txns:
+            return
+
+        if len(signable_txns) > 1 and len(signable_txns) == len(txns):
+            # both legs can be signed here, so submit them as one atomic group: neither side
+            # of the trade can be confirmed without the other.
+            transaction_infos = sign_and_send_group(
+                [(txn, passphrase_for(txn)) for txn in txns], self.client)
+        else:
+            transaction_infos = sign_and_send_many(
+                [(txn, passphrase_for(txn)) for txn in signable_txns], self.client)
+
+        for txn, transaction_info in zip(signable_txns, transaction_infos):
+            report(txn, transaction_info)
+
+    @staticmethod
+    async def fetch_quote_inputs(strategy: NetAssetValue):
+        """
+        retrieve the basket statistics for `strategy` together with the coin prices in one fetch,
+        so the Algo price is read from the basket's algorand entry and is subject to the same
+        deadline as the rest of the basket.
+
+        :param strategy -> ``NetAssetValue``: the strategy whose statistics should be retrieved.
+        :return -> ``Tuple[float, BasketSnapshot]``: the Algo price in USD and the snapshot of the basket.
+        """
+        snapshot = await strategy.get_basket(tuple(dict.fromkeys(strategy.stats_to_extract + ('price',))))
 
+        return snapshot.coin("algorand")["price"], snapshot
 
-    def do(self, *args):
+    @classmethod
+    def quote(cls, strategy: NetAssetValue = None, loop: asyncio.AbstractEventLoop = None) -> Dict[str, Any]:
         """
-        perform the specified txn type.
-        
-        :param txn_type -> `str`: the type of txn to perform, as specified by args.buy or args.sell.
+        price the ETF: ask the price feed for its latest quote, or fetch the basket and compute
+        the NAV when no feed is running.
+
+        By default the basket is fetched on a new event loop with a fresh `NetAssetValue`. A
+        caller pricing trades from several threads can instead pass its own `strategy` and a
+        `loop` running in another thread, so every fetch runs on that one loop and the caches
+        and circuit breakers behind `strategy` are only touched from its thread.
+
+        :param strategy -> ``NetAssetValue``: the strategy to fetch the basket with, or ``None`` for a new one.
+        :param loop -> ``asyncio.AbstractEventLoop``: a loop running in another thread to fetch the basket on, or ``None`` to run a new one.
+        :return -> ``Dict[str, Any]``: the `nav` and `algorand_price` in USD, the `snapshot_id` of the basket they were computed from and its `freshness` report (see `BaseEtf.get_basket`).
+        """
+        with tracer.span("feed.request_quote"):
+            quote = request_quote() # served by `algoetf feed` when it is running
+
+        if quote is not None:
+            return quote
+
+        if strategy is None:
+            strategy = NetAssetValue(coinmarketcap_url)
+            strategy.snapshot_store = default_snapshot_store(strategy.distinct_coins)
+        with tracer.span("price_fetch"):
+            if loop is None:
+                algorand_in_usd, snapshot = asyncio.run(cls.fetch_quote_inputs(strategy))
+            else:
+                algorand_in_usd, snapshot = asyncio.run_coroutine_threadsafe(cls.fetch_quote_inputs(strategy), loop).result()
+        with tracer.span("nav_computation"):
+            nav_in_usd = round(float(strategy.evaluate(snapshot.columns)), 2)
+
+        return {"nav": nav_in_usd, "algorand_price": algorand_in_usd, "snapshot_id": snapshot.snapshot_id, "freshness": snapshot.freshness}
+
+    @tracer.traced("Transaction.build_txns")
+    def build_txns(self, quote: Dict[str, Any], *args) -> List[PaymentTxn or AssetTransferTxn]:
         """
+        build the unsigned transactions for the specified txn types at the prices of `quote`.
 
-        algorand_in_usd = asyncio.run(get_algorand_price())
-        NavStrategy = NetAssetValue("https://api.coinmarketcap.com/data-api/v3/cryptocurrency/detail?slug=")
-        nav_in_usd = NavStrategy.calculate()
-        
-        count_algos_needed_for_one_etf_token = nav_in_usd / algorand_in_usd # the number of Algos needed to buy one ETF token
+        :param quote -> ``Dict[str, Any]``: the quote to price the exchange leg at, as returned by `quote`.
+        :param txn_type -> `str`: the type of txn to build, as specified by args.buy or args.sell.
+        """
+        count_algos_needed_for_one_etf_token = quote["nav"] / quote["algorand_price"] # the number of Algos needed to buy one ETF token
         total_algos_to_be_transferred = count_algos_needed_for_one_etf_token * self.amount
 
         assert all(txn_type in ('buy', 'sell', 'exchange') for txn_type in args)
@@ -116,8 +180,18 @@ class Transaction:
                 txns.append(Buy(self).build())
             elif txn_type == 'sell':
                 txns.append(Sell(self).build())
+
+        return txns
+
+    @tracer.traced("Transaction.do")
+    def do(self, *args, quote: Dict[str, Any] = None):
+        """
+        perform the specified txn type.
         
-        
+        :param txn_type -> `str`: the type of txn to perform, as specified by args.buy or args.sell.
+        :param quote -> ``Dict[str, Any]``: the quote to price the trade at, or ``None`` to fetch one with `quote`.
+        """
+        txns = self.build_txns(quote if quote is not None else self.quote(), *args)
         self.send_txns(txns)
 
 class Buy(Transaction):
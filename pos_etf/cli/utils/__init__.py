@@ -1,11 +1,36 @@
-import re
-import aiohttp 
-from typing import List, Dict, Any
-from algosdk import account, mnemonic
-from algosdk.v2client import algod
-from algosdk import algod as algod_v1
+from __future__ import annotations
+from importlib import import_module
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
 from . import constants
-from pos_etf.cli.error import InvalidAccountNameError
+from .credentials import CredentialsStore, credentials_store
+from .params import ParamsCache, params_cache
+from .tracing import tracer
+
+if TYPE_CHECKING:
+    from algosdk.v2client import algod
+    from .assets import AssetCache, asset_cache
+    from .cache import PriceCache, price_cache
+    from .confirmations import ConfirmationTracker
+    from .fetch import coin_fetcher
+    from .session import session_pool
+
+# these pull in asyncio, aiohttp or algosdk, so they are only imported once they are used
+# (keeping commands such as `algoetf --help` fast).
+_lazy_attributes = {
+    "AssetCache": ".assets",
+    "asset_cache": ".assets",
+    "PriceCache": ".cache",
+    "price_cache": ".cache",
+    "ConfirmationTracker": ".confirmations",
+    "coin_fetcher": ".fetch",
+    "session_pool": ".session",
+}
+
+def __getattr__(name: str):
+    if name in _lazy_attributes:
+        return getattr(import_module(_lazy_attributes[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def clean_acct_names(user_dotfile: str) -> List[str]:
     """
@@ -13,53 +38,10 @@ def clean_acct_names(user_dotfile: str) -> List[str]:
 
     :param user_dotfile -> ``str``: path to users `.pos_etf` dotfile
     """
-    all_acct_names = filter(
-        re.compile(
-            r"^\[[a-zA-Z0-9]").search, open(user_dotfile).readlines()
-    )
-
-    def formatted_acct_names(acct_names): return [
-        name.strip("[]\n") for name in acct_names
-    ]
-
-    list_of_formatted_acct_names = formatted_acct_names(all_acct_names)
-
-    return list_of_formatted_acct_names
-
-
-def extract_matching_pub_key(acct_name: str, dotfile_contents: List[str]):
-    """
-    extract public key that matches `acct_name`.
-
-    :param acct_name -> ``str``: the name of the account
-    """
-    try:
-        index_of_acct_name = dotfile_contents.index(acct_name)
-    except ValueError as e:
-        raise InvalidAccountNameError(f"The provided account name, {acct_name}, does not exist.")
-    index_of_pub_key = index_of_acct_name + 1
-
-    messy_pub_key = dotfile_contents[index_of_pub_key]
-
-    clean_pub_key = messy_pub_key.split(" = ")[-1]
-    return clean_pub_key
-
-
-def extract_matching_passphrase(acct_name: str, dotfile_contents: List[str]):
-    """
-    extract the passphrase that matches `acct_name`.
-
-    :param acct_name -> ``str``: the name of the account
-    """
-    index_of_acct_name = dotfile_contents.index(acct_name)
-    index_of_passphrase = index_of_acct_name + 2
-
-    messy_passphrase = dotfile_contents[index_of_passphrase]
-
-    clean_passphrase = messy_passphrase.split(" = ")[-1]
-    return clean_passphrase
+    return credentials_store(user_dotfile).names()
 
 
+@tracer.traced("add_network_params")
 def add_network_params(client: algod.AlgodClient, tx_data: Dict[str, str or int]) -> Dict[str, str or int]:
     """
     Adds network-related parameters to supplied transaction data.
@@ -67,7 +49,8 @@ def add_network_params(client: algod.AlgodClient, tx_data: Dict[str, str or int]
     :param client -> ``algod.AlgodClient``: an algorand client object.
     :param tx_data -> ``Dict[str, str or int]``: data for the transaction.
     """
-    params = client.suggested_params()
+    with tracer.span("algod.suggested_params"):
+        params = params_cache.get(client)
     tx_data["first"] = params.first
     tx_data["last"] = params.last
     tx_data["gh"] = params.gh
@@ -77,6 +60,25 @@ def add_network_params(client: algod.AlgodClient, tx_data: Dict[str, str or int]
     return tx_data
 
 
+def sign(transactions_and_passphrases: List[Tuple[Any, str]]) -> Tuple[List[Any], List[str]]:
+    """
+    sign every transaction with the passphrase of its sender.
+
+    :param transactions_and_passphrases -> ``List[Tuple[algosdk.transaction.Transaction, str]]``: each transaction with the passphrase of its sender.
+    :return -> ``Tuple[List[algosdk.transaction.SignedTransaction], List[str]]``: the signed transactions and their ids.
+    """
+    from algosdk import mnemonic
+
+    with tracer.span("sign", transactions=len(transactions_and_passphrases)):
+        signed_transactions = [
+            transaction.sign(mnemonic.to_private_key(passphrase))
+            for transaction, passphrase in transactions_and_passphrases
+        ]
+        transaction_ids = [signed_transaction.transaction.get_txid() for signed_transaction in signed_transactions]
+    return signed_transactions, transaction_ids
+
+
+@tracer.traced("sign_and_send")
 def sign_and_send(transaction: str, passphrase: str, client: algod.AlgodClient) -> Dict[str, str or int]:
     """
     sign and send a transaction to the algorand network. Return the transaction
@@ -86,15 +88,53 @@ def sign_and_send(transaction: str, passphrase: str, client: algod.AlgodClient)
     :param passphrase -> ``str``: the public key for the user involved in the transaction.
     :param client -> ``algod.AlgodClient``: an algorand client object.
     """
-    private_key = mnemonic.to_private_key(passphrase)
-    signed_transaction = transaction.sign(private_key)
-    transaction_id = signed_transaction.transaction.get_txid()
-    client.send_transaction(signed_transaction, headers={
-                            'content-type': 'application/x-binary'})
-    transaction_info = wait_for_confirmation(client, transaction_id)
-    return transaction_info
+    return sign_and_send_many([(transaction, passphrase)], client)[0]
 
 
+@tracer.traced("sign_and_send_many")
+def sign_and_send_many(transactions_and_passphrases: List[Tuple[Any, str]], client: algod.AlgodClient, return_exceptions: bool = False) -> List[Dict[str, str or int]]:
+    """
+    sign and send independent transactions to the algorand network, then wait for all of
+    them together. Return the transaction info of every transaction when all of them are completed.
+
+    :param transactions_and_passphrases -> ``List[Tuple[algosdk.transaction.Transaction, str]]``: each transaction with the passphrase of its sender.
+    :param client -> ``algod.AlgodClient``: an algorand client object.
+    :param return_exceptions -> ``bool``: return the errors of failed transactions in place of their info instead of raising the first one.
+    """
+    import asyncio
+    from .confirmations import ConfirmationTracker
+
+    signed_transactions, transaction_ids = sign(transactions_and_passphrases)
+    with tracer.span("algod.send_transaction", txids=transaction_ids):
+        for signed_transaction in signed_transactions:
+            client.send_transaction(signed_transaction) # send_raw_transaction already sets the binary content-type
+    return asyncio.run(ConfirmationTracker(client).wait(transaction_ids, return_exceptions))
+
+
+@tracer.traced("sign_and_send_group")
+def sign_and_send_group(transactions_and_passphrases: List[Tuple[Any, str]], client: algod.AlgodClient) -> List[Dict[str, str or int]]:
+    """
+    group, sign and send transactions to the algorand network as one atomic transaction
+    group: either every transaction is confirmed, in the same round, or none is. Return the
+    transaction info of every transaction when the group is completed.
+
+    :param transactions_and_passphrases -> ``List[Tuple[algosdk.transaction.Transaction, str]]``: each transaction with the passphrase of its sender.
+    :param client -> ``algod.AlgodClient``: an algorand client object.
+    """
+    import asyncio
+    from algosdk.transaction import assign_group_id
+    from .confirmations import ConfirmationTracker
+
+    transactions = assign_group_id([transaction for transaction, _ in transactions_and_passphrases])
+    signed_transactions, transaction_ids = sign(
+        [(transaction, passphrase) for transaction, (_, passphrase) in zip(transactions, transactions_and_passphrases)])
+
+    with tracer.span("algod.send_transactions", txids=transaction_ids):
+        client.send_transactions(signed_transactions)
+    return asyncio.run(ConfirmationTracker(client).wait(transaction_ids))
+
+
+@tracer.traced("wait_for_confirmation")
 def wait_for_confirmation(client: algod.AlgodClient, transaction_id: str, timeout: int = 100) -> Dict[str, str or int]:
     """
     Check for when the transaction is confirmed by the network. Once confirmed, return
@@ -103,7 +143,9 @@ def wait_for_confirmation(client: algod.AlgodClient, transaction_id: str, timeou
     :param client -> ``algod.AlgodClient``: an algorand client object.
     :param transaction_id -> ``str``: id for the transaction.
     """
-    start_round = client.status()["last-round"] + 1;
+    last_round = client.status()["last-round"]
+    params_cache.observe_round(client, last_round)
+    start_round = last_round + 1
     current_round = start_round
 
 
@@ -117,7 +159,9 @@ def wait_for_confirmation(client: algod.AlgodClient, transaction_id: str, timeou
         elif pending_txn["pool-error"]:  
             raise Exception(
                 'pool error: {}'.format(pending_txn["pool-error"]))
-        client.status_after_block(current_round)                   
+        with tracer.span("algod.status_after_block", round=current_round):
+            status = client.status_after_block(current_round)
+        params_cache.observe_round(client, status.get("last-round"))
         current_round += 1
     raise Exception(
         'pending tx not found in timeout rounds, timeout value = : {}'.format(timeout))
@@ -144,9 +188,9 @@ def balance_formatter(amount, asset_id, client):
     :param asset_id -> ``int``: the ID for the asset.
     :param client -> ``algod.Client``: instantiated client object.
     """
-    v1_client = algod_v1.AlgodClient(client.algod_token, client.algod_address, headers={'User-Agent': 'DanM'})
-    
-    asset_info = v1_client.asset_info(asset_id)
+    from .assets import asset_cache
+
+    asset_info = asset_cache.get(asset_id, client)
     decimals = asset_info.get("decimals")
     unit = asset_info.get("unitname")
     formatted_amount = amount/10**decimals
@@ -163,16 +207,39 @@ async def get_algorand_price():
     Using the coin market cap public API, retrieve and return the
     most recent Algorand price.
     """
-    base_url = "https://api.coinmarketcap.com/data-api/v3/cryptocurrency/detail?slug="
-    async with aiohttp.ClientSession() as session:
-        response = await session.request("GET", base_url + "algorand")
-        response.raise_for_status()
-        json_data = await response.json()
+    from .cache import PriceCache, price_cache
+    from .fetch import coin_fetcher
+
+    base_url = constants.coinmarketcap_url
+
+    async def fetch_price():
+        statistics = await coin_fetcher.fetch_statistics(base_url + "algorand")
+        return {"price": statistics['price']}
 
-        return json_data['data']['statistics']['price']
+    statistics = await price_cache.get_or_fetch(PriceCache.key("algorand", ("price",)), fetch_price)
+    price_cache.persist()
+    return statistics['price']
 
 async def send_request_to(url: str, req_type: str, **kwargs):
-    async with aiohttp.ClientSession() as session:
+    from .session import session_pool
+
+    async with session_pool.session() as session:
         async with session.request(req_type, url, data=kwargs.get("body", dict()), headers=kwargs.get("headers", dict())) as response:
             response.raise_for_status()
-            return await response.json()
\ No newline at end of file
+            return await response.json()
+
+def fetch_json(url: str, headers: Dict[str, str] = dict()) -> Dict[str, Any]:
+    """
+    send a single blocking GET request and return the JSON body. Unlike `send_request_to`, this
+    does not need an event loop or aiohttp, so one-off lookups (e.g. `algoetf --view`) do not
+    pay for importing them.
+
+    :param url -> ``str``: the URL to request.
+    :param headers -> ``Dict[str, str]``: extra headers for the request.
+    :return -> ``Dict[str, Any]``: the decoded JSON body.
+    """
+    import json
+    from urllib.request import Request, urlopen
+
+    with urlopen(Request(url, headers={'User-Agent': 'DanM', **headers})) as response:
+        return json.load(response)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional
+import threading
+
+from algosdk import algod as algod_v1
+
+from . import constants
+from .jsonfile import JsonFile
+
+class AssetCache(object):
+    """
+    Caches the metadata (`decimals` and `unitname`) of Algorand assets, which practically never
+    changes, so formatting an amount does not need a network round-trip. Entries are kept in
+    memory and mirrored to a JSON file, so consecutive CLI invocations only ever look an
+    asset up once. Entries are keyed by algod endpoint and asset id, since the same id can
+    name different assets on different networks, and are only dropped by `invalidate`.
+
+    Attributes:
+        path: the JSON file backing the cache (``None`` keeps the cache in memory only).
+        hits: the number of lookups served from the cache.
+        misses: the number of lookups that requested the asset info.
+    """
+
+    def __init__(self: AssetCache, path: Optional[str] = constants.asset_cache_path) -> None:
+        """
+        initialize the AssetCache object.
+
+        :param path -> ``str``: the JSON file backing the cache, or ``None`` for memory only.
+        :return -> ``None``:
+        """
+        self.path = path
+        self._file = JsonFile(path, prefix=".asset_cache.")
+        self._entries: Dict[str, Dict[str, Any]] = dict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(client: Any, asset_id: int) -> str:
+        """
+        build the cache key for `asset_id` on the network `client` talks to.
+
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        :param asset_id -> ``int``: the ID for the asset.
+        :return -> ``str``: the cache key.
+        """
+        return f"{client.algod_address}:{asset_id}"
+
+    def _load(self: AssetCache) -> None:
+        """read the backing file into memory the first time the cache is used."""
+        self._loaded = True
+        self._entries.update(self._file.read())
+
+    def _persist(self: AssetCache, drop: Callable[[str], bool] = lambda key: False) -> None:
+        """merge the current entries into the backing file, keeping other processes' entries except the keys `drop` selects."""
+        self._file.update(lambda on_disk: {key: metadata for key, metadata in {**on_disk, **self._entries}.items() if not drop(key)})
+
+    def get(self: AssetCache, asset_id: int, client: Any) -> Dict[str, Any]:
+        """
+        return the metadata of `asset_id`, requesting it from `client`'s algod node on a miss.
+
+        :param asset_id -> ``int``: the ID for the asset.
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        :return -> ``Dict[str, Any]``: the `decimals` and `unitname` of the asset.
+        """
+        key = self.key(client, asset_id)
+
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+            metadata = self._entries.get(key)
+            if metadata is not None:
+                self.hits += 1
+                return metadata
+
+            self.misses += 1
+            v1_client = algod_v1.AlgodClient(client.algod_token, client.algod_address, headers={'User-Agent': 'DanM'})
+            asset_info = v1_client.asset_info(asset_id)
+
+            metadata = self._entries[key] = {
+                "decimals": asset_info.get("decimals"),
+                "unitname": asset_info.get("unitname")
+            }
+            self._persist()
+            return metadata
+
+    def invalidate(self: AssetCache, asset_id: Optional[int] = None, client: Optional[Any] = None) -> None:
+        """
+        drop the cached metadata of `asset_id` on `client`'s network, of `asset_id` on every
+        network if `client` is ``None``, or of every asset if `asset_id` is ``None``.
+
+        :param asset_id -> ``int``: the ID for the asset.
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+            if asset_id is None:
+                drop = lambda key: True
+            elif client is not None:
+                drop = lambda key, dropped=self.key(client, asset_id): key == dropped
+            else:
+                drop = lambda key: key.rsplit(":", 1)[-1] == str(asset_id)
+
+            for key in [key for key in self._entries if drop(key)]:
+                del self._entries[key]
+            self._persist(drop)
+
+    def stats(self: AssetCache) -> Dict[str, int]:
+        """
+        return the hit/miss counters.
+
+        :return -> ``Dict[str, int]``: the number of hits and misses.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+asset_cache = AssetCache()
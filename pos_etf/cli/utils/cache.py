@@ -0,0 +1,292 @@
+from __future__ import annotations
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import time
+
+from . import constants
+from .jsonfile import JsonFile
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+class PriceCache(object):
+    """
+    A TTL cache for coin statistics. Entries are keyed by coin slug and the set of statistics
+    requested for it, and are mirrored to a JSON file so consecutive CLI invocations share them.
+
+    An entry younger than `ttl` is served as is. An entry older than `ttl` but younger than
+    `max_staleness` is refreshed before it is returned, and only served if the refresh fails.
+    With `background_refresh`, meant for long-running processes whose event loop outlives the
+    request, it is instead served immediately while a refresh is scheduled on the running loop
+    (stale-while-revalidate); one-shot `asyncio.run` calls would cancel that refresh on exit.
+    Statistics older than the configured TTL count as stale in a basket's freshness report
+    (see `BaseEtf.freshness`), so such a process sets `max_staleness` to that TTL and `ttl`
+    below it, revalidating entries before they would be reported stale.
+    Anything older is treated as a miss and fetched before returning, but is still kept as the
+    coin's last known good statistics (see `last_known_good`).
+
+    `store` only updates memory; `persist` writes every change at once, merging it with what
+    other processes wrote to the file in the meantime (the newer entry of each key wins).
+
+    Attributes:
+        path: the JSON file backing the cache (``None`` keeps the cache in memory only).
+        ttl: number of seconds an entry is considered fresh.
+        max_staleness: number of seconds an entry may be served at all.
+        background_refresh: whether stale entries are served while they are refreshed in the background.
+        hits, stale_hits, misses, refreshes, refresh_errors, fallbacks: usage counters for this process.
+    """
+
+    def __init__(self: PriceCache, path: Optional[str] = constants.price_cache_path, ttl: float = constants.price_cache_ttl, max_staleness: float = constants.price_cache_max_staleness, background_refresh: bool = False) -> None:
+        """
+        initialize the PriceCache object.
+
+        :param path -> ``str``: the JSON file backing the cache, or ``None`` for memory only.
+        :param ttl -> ``float``: number of seconds an entry is considered fresh.
+        :param max_staleness -> ``float``: number of seconds an entry may be served while stale.
+        :param background_refresh -> ``bool``: serve stale entries while they are refreshed in the background.
+        :return -> ``None``:
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_staleness = max(max_staleness, ttl)
+        self.background_refresh = background_refresh
+        self._file = JsonFile(path, prefix=".price_cache.")
+        self._entries: Dict[str, Tuple[float, Dict[str, int or float]]] = dict()
+        self._refreshing: Dict[str, asyncio.Future] = dict()
+        self._loaded = False
+        self._changed: Set[str] = set()
+        self._dropped: Set[str] = set()
+        self._drop_all = False
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def key(cls: PriceCache, slug: str, stats_to_extract: Optional[Tuple[str]] = None) -> str:
+        """
+        build the cache key for `slug` and the statistics requested for it.
+
+        :param slug -> ``str``: a valid coin slug.
+        :param stats_to_extract -> ``Tuple[str]``: the statistics requested, or ``None`` for all of them.
+        :return -> ``str``: the cache key.
+        """
+        stat_set = ",".join(sorted(set(stats_to_extract))) if stats_to_extract else "*"
+        return f"{slug}:{stat_set}"
+
+    def _load(self: PriceCache) -> None:
+        """read the backing file into memory the first time the cache is used."""
+        self._loaded = True
+
+        for key, entry in self._file.read().items():
+            self._entries.setdefault(key, (entry["fetched_at"], entry["statistics"]))
+
+    def persist(self: PriceCache) -> None:
+        """
+        write the entries stored or invalidated since the last call to the backing file. The
+        file is re-read under a lock and merged, keeping the newer entry of every key, so
+        entries written by other processes are not lost, and is then atomically replaced.
+        """
+        if not self.path or not (self._changed or self._dropped or self._drop_all):
+            return
+
+        def merge(stored_entries):
+            merged = dict() if self._drop_all else stored_entries
+            for key in self._dropped:
+                merged.pop(key, None)
+            for key in self._changed:
+                if key in self._entries and (key not in merged or merged[key]["fetched_at"] <= self._entries[key][0]):
+                    fetched_at, statistics = self._entries[key]
+                    merged[key] = {"fetched_at": fetched_at, "statistics": statistics}
+            return merged
+
+        if self._file.update(merge):
+            self._changed.clear()
+            self._dropped.clear()
+            self._drop_all = False
+
+    def lookup(self: PriceCache, key: str) -> Tuple[Optional[Dict[str, int or float]], str]:
+        """
+        look up `key` without fetching anything.
+
+        :param key -> ``str``: a key built by `PriceCache.key`.
+        :return -> ``Tuple[Dict[str, int or float], str]``: the cached statistics (or ``None``) and one of `FRESH`, `STALE` or `MISS`.
+        """
+        if not self._loaded:
+            self._load()
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return (None, MISS)
+
+        fetched_at, statistics = entry
+        age = time.time() - fetched_at
+
+        if age < self.ttl:
+            return (statistics, FRESH)
+        elif age < self.max_staleness:
+            return (statistics, STALE)
+
+        return (None, MISS)
+
+    def age(self: PriceCache, key: str) -> Optional[float]:
+        """
+        how long ago the entry under `key` was fetched, however old it is.
+
+        :param key -> ``str``: a key built by `PriceCache.key`.
+        :return -> ``float``: the age of the entry in seconds, or ``None`` if there is none.
+        """
+        if not self._loaded:
+            self._load()
+
+        entry = self._entries.get(key)
+        return time.time() - entry[0] if entry is not None else None
+
+    def last_known_good(self: PriceCache, slug: str, stats_to_extract: Optional[Tuple[str]] = None, max_age: Optional[float] = None) -> Tuple[Optional[Dict[str, int or float]], Optional[float]]:
+        """
+        the most recently stored statistics of `slug` that contain `stats_to_extract`, whichever
+        set of statistics they were requested with and, unless `max_age` is given, however old.
+
+        :param slug -> ``str``: a valid coin slug.
+        :param stats_to_extract -> ``Tuple[str]``: the statistics needed, or ``None`` for all of them.
+        :param max_age -> ``float``: the age in seconds past which statistics are not returned, or ``None`` for no limit.
+        :return -> ``Tuple[Dict[str, int or float], float]``: the statistics and their age in seconds, or ``(None, None)`` if none recent enough were stored.
+        """
+        if not self._loaded:
+            self._load()
+
+        latest = None
+        for key, (fetched_at, statistics) in self._entries.items():
+            if key.split(":", 1)[0] != slug:
+                continue
+            if stats_to_extract and any(statistics.get(stat) is None for stat in stats_to_extract):
+                continue
+            if latest is None or fetched_at > latest[0]:
+                latest = (fetched_at, statistics)
+
+        if latest is None:
+            return (None, None)
+
+        fetched_at, statistics = latest
+        if max_age is not None and time.time() - fetched_at > max_age:
+            return (None, None)
+        if stats_to_extract:
+            statistics = {stat: statistics[stat] for stat in stats_to_extract}
+
+        self.fallbacks += 1
+        return (statistics, time.time() - fetched_at)
+
+    def store(self: PriceCache, key: str, statistics: Dict[str, int or float]) -> None:
+        """
+        store freshly fetched `statistics` under `key`; `persist` writes them to the backing file.
+
+        :param key -> ``str``: a key built by `PriceCache.key`.
+        :param statistics -> ``Dict[str, int or float]``: the statistics to store.
+        """
+        if not self._loaded:
+            self._load()
+
+        self._entries[key] = (time.time(), statistics)
+        self._changed.add(key)
+        self._dropped.discard(key)
+
+    async def get_or_fetch(self: PriceCache, key: str, fetch: Callable[[], Awaitable[Dict[str, int or float]]]) -> Dict[str, int or float]:
+        """
+        return the statistics cached under `key`, calling `fetch` on a miss or when the cached
+        entry is stale (scheduling it in the background instead with `background_refresh`).
+
+        :param key -> ``str``: a key built by `PriceCache.key`.
+        :param fetch -> ``Callable[[], Awaitable[Dict[str, int or float]]]``: coroutine function that retrieves fresh statistics.
+        :return -> ``Dict[str, int or float]``: the statistics for `key`.
+        """
+        statistics, state = self.lookup(key)
+
+        if state == FRESH:
+            self.hits += 1
+            return statistics
+
+        if state == STALE and self.background_refresh:
+            self.stale_hits += 1
+            self._revalidate(key, fetch)
+            return statistics
+
+        self.misses += 1
+        try:
+            fresh_statistics = await fetch()
+        except Exception:
+            if state != STALE:
+                raise
+            # the source is failing, so the stale entry is still the best answer.
+            self.stale_hits += 1
+            return statistics
+
+        self.store(key, fresh_statistics)
+        return fresh_statistics
+
+    def _revalidate(self: PriceCache, key: str, fetch: Callable[[], Awaitable[Dict[str, int or float]]]) -> None:
+        """schedule a background refresh of `key` unless one is already in flight."""
+        if key in self._refreshing:
+            return
+
+        self._refreshing[key] = asyncio.ensure_future(self._refresh(key, fetch))
+
+    async def _refresh(self: PriceCache, key: str, fetch: Callable[[], Awaitable[Dict[str, int or float]]]) -> None:
+        """fetch and store `key`, keeping the stale entry if the fetch fails."""
+        try:
+            self.store(key, await fetch())
+            self.refreshes += 1
+        except Exception:
+            self.refresh_errors += 1
+        finally:
+            del self._refreshing[key]
+
+    async def drain(self: PriceCache) -> None:
+        """wait for every in-flight background refresh to finish."""
+        if self._refreshing:
+            await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+
+    def invalidate(self: PriceCache, key: Optional[str] = None) -> None:
+        """
+        drop `key` from the cache, or every entry if no key is given.
+
+        :param key -> ``str``: a key built by `PriceCache.key`.
+        """
+        if not self._loaded:
+            self._load()
+
+        if key is None:
+            self._entries.clear()
+            self._changed.clear()
+            self._dropped.clear()
+            self._drop_all = True
+        else:
+            self._entries.pop(key, None)
+            self._changed.discard(key)
+            self._dropped.add(key)
+
+        self.persist()
+
+    def stats(self: PriceCache) -> Dict[str, int or float]:
+        """
+        return the usage counters for this process, for tuning `ttl` against quote accuracy.
+
+        :return -> ``Dict[str, int or float]``: the counters and the resulting hit ratio.
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "fallbacks": self.fallbacks,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0
+        }
+
+
+price_cache = PriceCache()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+
+import aiohttp
+from algosdk import constants as algosdk_constants
+from algosdk.v2client import algod
+
+from .params import params_cache
+from .resilience import is_retryable
+from .session import SessionPool, session_pool
+from .tracing import tracer
+
+class ConfirmationTracker(object):
+    """
+    Waits for any number of submitted transactions on one event loop. A single poller makes
+    one `status_after_block` request per round and, after every block, checks all the
+    outstanding transaction ids concurrently, so N transactions cost one wait per round
+    rather than N serial waits.
+
+    Every tracked transaction id gets a future that resolves with its pending transaction
+    info once it is confirmed (or ``None`` if algod does not know it, as in
+    `wait_for_confirmation`) and fails on a pool error or after `timeout` rounds. A check
+    that fails transiently (a timeout, a dropped connection or a 5xx response) is retried
+    on the next round rather than failing a transaction that may still confirm.
+
+    Attributes:
+        client: the algod client whose endpoint, token and headers are used.
+        session_pool: the pool providing the shared HTTP session.
+        timeout: number of rounds a transaction may stay pending before its future fails.
+        rounds: the number of rounds waited for.
+        checks: the number of pending transaction info requests made.
+    """
+
+    def __init__(self: ConfirmationTracker, client: algod.AlgodClient, session_pool: SessionPool = session_pool, timeout: int = 100) -> None:
+        """
+        initialize the ConfirmationTracker object.
+
+        :param client -> ``algod.AlgodClient``: the algod client whose endpoint, token and headers are used.
+        :param session_pool -> ``SessionPool``: the pool providing the shared HTTP session.
+        :param timeout -> ``int``: number of rounds a transaction may stay pending before its future fails.
+        :return -> ``None``:
+        """
+        self.client = client
+        self.session_pool = session_pool
+        self.timeout = timeout
+        self.rounds = 0
+        self.checks = 0
+        self._pending: Dict[str, asyncio.Future] = dict()
+        self._deadlines: Dict[str, int] = dict()
+        self._poller: Optional[asyncio.Task] = None
+
+        self._headers = dict(client.headers or dict())
+        self._headers[algosdk_constants.algod_auth_header] = client.algod_token
+
+    def track(self: ConfirmationTracker, transaction_id: str) -> asyncio.Future:
+        """
+        start waiting for `transaction_id`, which must already have been submitted.
+
+        :param transaction_id -> ``str``: id for the transaction.
+        :return -> ``asyncio.Future``: resolves with the pending transaction info once the transaction is confirmed.
+        """
+        future = self._pending.get(transaction_id)
+        if future is None:
+            future = self._pending[transaction_id] = asyncio.get_running_loop().create_future()
+
+        if self._poller is None:
+            self._poller = asyncio.ensure_future(self._poll())
+
+        return future
+
+    async def wait(self: ConfirmationTracker, transaction_ids: Iterable[str], return_exceptions: bool = False) -> List[Optional[Dict[str, Any]]]:
+        """
+        track every id in `transaction_ids` and wait until all of them are resolved.
+
+        :param transaction_ids -> ``Iterable[str]``: ids for the transactions.
+        :param return_exceptions -> ``bool``: return the errors of failed transactions in place of their info instead of raising the first one.
+        :return -> ``List[Dict[str, Any]]``: the pending transaction info of every transaction, in order.
+        """
+        return await asyncio.gather(*(self.track(transaction_id) for transaction_id in transaction_ids), return_exceptions=return_exceptions)
+
+    async def _get(self: ConfirmationTracker, session: aiohttp.ClientSession, path: str) -> Optional[Dict[str, Any]]:
+        """send a GET request for the v2 `path` of the algod endpoint, returning ``None`` if it is not found."""
+        async with session.get(f"{self.client.algod_address}/v2{path}", headers=self._headers) as response:
+            if response.status == 404:
+                return None
+            response.raise_for_status()
+            return await response.json()
+
+    def _resolve(self: ConfirmationTracker, transaction_id: str, current_round: int, pending_transaction: Any) -> None:
+        """settle the future of `transaction_id` if the result of its check is final."""
+        future = self._pending[transaction_id]
+        deadline = self._deadlines.setdefault(transaction_id, current_round + self.timeout)
+
+        if future.done():
+            pass # cancelled by the caller
+        elif isinstance(pending_transaction, Exception):
+            if is_retryable(pending_transaction) and current_round < deadline:
+                return # check again after the next block
+            future.set_exception(pending_transaction)
+        elif pending_transaction is None:
+            future.set_result(None)
+        elif pending_transaction.get("confirmed-round", 0) > 0:
+            pending_transaction.setdefault("tx", transaction_id)
+            future.set_result(pending_transaction)
+        elif pending_transaction.get("pool-error"):
+            future.set_exception(Exception(
+                'pool error: {}'.format(pending_transaction["pool-error"])))
+        elif current_round >= deadline:
+            future.set_exception(Exception(
+                'pending tx not found in timeout rounds, timeout value = : {}'.format(self.timeout)))
+        else:
+            return
+
+        del self._pending[transaction_id]
+        del self._deadlines[transaction_id]
+
+    async def _check(self: ConfirmationTracker, session: aiohttp.ClientSession, current_round: int) -> None:
+        """check every outstanding transaction concurrently and settle the ones that are final."""
+        transaction_ids = list(self._pending)
+        self.checks += len(transaction_ids)
+
+        with tracer.span("algod.pending_transaction_info", round=current_round, transactions=len(transaction_ids)):
+            pending_transactions = await asyncio.gather(
+                *(self._get(session, f"/transactions/pending/{transaction_id}") for transaction_id in transaction_ids),
+                return_exceptions=True
+            )
+
+        for transaction_id, pending_transaction in zip(transaction_ids, pending_transactions):
+            self._resolve(transaction_id, current_round, pending_transaction)
+
+    async def _poll(self: ConfirmationTracker) -> None:
+        """check the outstanding transactions after every block until none is left."""
+        try:
+            async with self.session_pool.session() as session:
+                current_round = (await self._get(session, "/status"))["last-round"]
+
+                while True:
+                    params_cache.observe_round(self.client, current_round)
+                    await self._check(session, current_round)
+
+                    if not self._pending:
+                        # cleared before any further await, so a `track` call from here on starts a new poller.
+                        self._poller = None
+                        return
+
+                    with tracer.span("algod.status_after_block", round=current_round):
+                        status = await self._get(session, f"/status/wait-for-block-after/{current_round}")
+                    current_round = status["last-round"]
+                    self.rounds += 1
+        except Exception as e:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            self._pending.clear()
+            self._deadlines.clear()
+            self._poller = None
+
+    def stats(self: ConfirmationTracker) -> Dict[str, int]:
+        """
+        return the round and check counters.
+
+        :return -> ``Dict[str, int]``: the number of rounds waited for, checks made and transactions outstanding.
+        """
+        return {"rounds": self.rounds, "checks": self.checks, "pending": len(self._pending)}
@@ -5,5 +5,76 @@ amt_microalgos_in_one_algo = 1000000
 amt_algos_in_one_microalgo = 10 ** -6 # or 1/amt_microalgos_in_one_algo
 asset_id = 14875048
 algoetf_addr = "3J5C253U6UEQS4Q3TCDVWNWHG5WYOM5RYXP7N5YKNTBJW2NMSDICPCIWD4"
-creator_passphrase = \
-    os.environ["CREATOR_PASSPHRASE"]
\ No newline at end of file
+pos_etf_dir = os.path.join(os.path.expanduser("~"), ".pos_etf")
+
+# base URLs of the data sources (override these to point the CLI at a local simulator)
+algod_url = os.environ.get("ALGOETF_ALGOD_URL", "https://testnet.algoexplorerapi.io")
+indexer_url = os.environ.get("ALGOETF_INDEXER_URL", "https://testnet.algoexplorerapi.io")
+coinmarketcap_url = os.environ.get("ALGOETF_COINMARKETCAP_URL", "https://api.coinmarketcap.com/data-api/v3/cryptocurrency/detail?slug=")
+
+# HTTP connection pooling (shared by the coin fetchers and `send_request_to`)
+http_limit_per_host = int(os.environ.get("ALGOETF_HTTP_LIMIT_PER_HOST", 10))
+http_dns_cache_ttl = int(os.environ.get("ALGOETF_HTTP_DNS_CACHE_TTL", 300)) # seconds
+http_keepalive_timeout = float(os.environ.get("ALGOETF_HTTP_KEEPALIVE_TIMEOUT", 30)) # seconds
+
+# coin statistics cache (shared by consecutive CLI invocations through the backing file)
+price_cache_ttl = float(os.environ.get("ALGOETF_PRICE_CACHE_TTL", 30)) # seconds an entry is served as fresh
+price_cache_max_staleness = float(os.environ.get("ALGOETF_PRICE_CACHE_MAX_STALENESS", 300)) # seconds a stale entry may still be served
+price_cache_path = os.environ.get("ALGOETF_PRICE_CACHE_PATH", os.path.join(pos_etf_dir, "price_cache.json"))
+
+# resilient coin statistics requests (see `resilience.py`)
+fetch_timeout = float(os.environ.get("ALGOETF_FETCH_TIMEOUT", 5)) # seconds one request attempt may take
+fetch_retries = int(os.environ.get("ALGOETF_FETCH_RETRIES", 2)) # retries after the first attempt
+fetch_backoff_base = float(os.environ.get("ALGOETF_FETCH_BACKOFF_BASE", 0.1)) # upper bound of the first jittered backoff, in seconds
+fetch_backoff_max = float(os.environ.get("ALGOETF_FETCH_BACKOFF_MAX", 2)) # upper bound of any jittered backoff, in seconds
+fetch_hedge = os.environ.get("ALGOETF_FETCH_HEDGE", "1") not in ("", "0") # send a duplicate request once an attempt exceeds the host's p95 latency
+breaker_failure_threshold = int(os.environ.get("ALGOETF_BREAKER_FAILURES", 5)) # consecutive failures that open a host's circuit
+breaker_reset_timeout = float(os.environ.get("ALGOETF_BREAKER_RESET_TIMEOUT", 30)) # seconds a circuit stays open before a trial request
+
+# deadline-bounded basket fetches (see `BaseEtf.get_basket`)
+basket_deadline = float(os.environ.get("ALGOETF_BASKET_DEADLINE", 0)) # seconds to wait for the basket before filling late coins from their last known good statistics; 0 waits for every coin
+max_stale_weight = float(os.environ.get("ALGOETF_MAX_STALE_WEIGHT", 0.1)) # largest share of the basket's weight that may be filled in or older than the price cache TTL
+max_fill_age = float(os.environ.get("ALGOETF_MAX_FILL_AGE", 600)) # seconds past which last known good statistics are too old to fill a late coin in with
+
+# asset metadata (decimals and unit name), kept until explicitly invalidated
+asset_cache_path = os.environ.get("ALGOETF_ASSET_CACHE_PATH", os.path.join(pos_etf_dir, "asset_cache.json"))
+
+# suggested transaction params, shared by every transaction built against the same algod endpoint
+params_cache_ttl = float(os.environ.get("ALGOETF_PARAMS_CACHE_TTL", 4.5)) # seconds, about one block
+
+# append-only history of every basket fetch (set to an empty string to disable recording)
+snapshot_path = os.environ.get("ALGOETF_SNAPSHOT_PATH", os.path.join(pos_etf_dir, "snapshots.bin"))
+
+# price feed daemon (`algoetf feed`)
+feed_socket_path = os.environ.get("ALGOETF_FEED_SOCKET", os.path.join(pos_etf_dir, "feed.sock"))
+feed_refresh_interval = float(os.environ.get("ALGOETF_FEED_REFRESH_INTERVAL", 10)) # seconds between basket refreshes
+feed_max_quote_age = float(os.environ.get("ALGOETF_FEED_MAX_QUOTE_AGE", 60)) # seconds before a daemon quote is ignored
+
+# holdings of viewed accounts, re-read only once an account has activity after the cached round
+holdings_cache_path = os.environ.get("ALGOETF_HOLDINGS_CACHE_PATH", os.path.join(pos_etf_dir, "holdings_cache.json"))
+
+# `algoetf --view --all`
+view_concurrency = int(os.environ.get("ALGOETF_VIEW_CONCURRENCY", 64)) # account requests in flight at once
+
+# bulk order execution (`algoetf --orders`)
+orders_window = int(os.environ.get("ALGOETF_ORDERS_WINDOW", 256)) # orders in flight at once
+netting_interval = float(os.environ.get("ALGOETF_NETTING_INTERVAL", 5)) # seconds orders are collected for before a netted batch is settled
+netting_max_batch = int(os.environ.get("ALGOETF_NETTING_MAX_BATCH", 10000)) # orders in one netted batch
+
+# daily rebalancing of the pool into the basket (`python -m pos_etf.cli.rebalance`)
+rebalance_tolerance = float(os.environ.get("ALGOETF_REBALANCE_TOLERANCE", 0.01)) # absolute weight drift tolerated before a coin is traded
+rebalance_min_trade = float(os.environ.get("ALGOETF_REBALANCE_MIN_TRADE", 10)) # smallest trade worth placing, in USD
+
+# per-phase latency tracing: a file path, `-` for stderr, or unset to disable
+trace_sink = os.environ.get("ALGOETF_TRACE")
+
+
+def __getattr__(name: str):
+    """
+    resolve settings that must not be read at import time. `creator_passphrase` is only
+    needed to sign pool transactions, so it is read from the environment on first use
+    (raising ``KeyError`` if `CREATOR_PASSPHRASE` is unset) instead of on import.
+    """
+    if name == "creator_passphrase":
+        return os.environ["CREATOR_PASSPHRASE"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
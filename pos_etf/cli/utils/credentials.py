@@ -0,0 +1,145 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import os
+import re
+import threading
+
+from pos_etf.cli.error import InvalidAccountNameError
+
+_acct_name_line = re.compile(r"^\[[a-zA-Z0-9]")
+
+class CredentialsStore(object):
+    """
+    An index of the accounts in a `.pos_etf` credentials file, which stores every account as
+
+        [account_name]
+        addr = <address>
+        pk = <passphrase>
+
+    The file is parsed once into a name -> (address, passphrase) mapping and reparsed only
+    when its modification time or size changes, so looking an account up is a dict access
+    instead of a scan of the file.
+
+    Attributes:
+        path: the credentials file.
+    """
+
+    def __init__(self: CredentialsStore, path: str) -> None:
+        """
+        initialize the CredentialsStore object.
+
+        :param path -> ``str``: the credentials file.
+        :return -> ``None``:
+        """
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._accounts: Dict[str, Tuple[str, str]] = dict()
+
+    @staticmethod
+    def parse(lines: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        parse the lines of a credentials file. The first entry wins if an account name is repeated.
+
+        :param lines -> ``List[str]``: the lines of the file.
+        :return -> ``Dict[str, Tuple[str, str]]``: maps every account name to its address and passphrase, in file order.
+        """
+        accounts: Dict[str, Tuple[str, str]] = dict()
+
+        for index, line in enumerate(lines):
+            if not _acct_name_line.search(line):
+                continue
+
+            acct_name = line.strip("[]\n")
+            address, passphrase = (
+                lines[index + offset].strip("[]\n").split(" = ")[-1] if index + offset < len(lines) else ""
+                for offset in (1, 2)
+            )
+            accounts.setdefault(acct_name, (address, passphrase))
+
+        return accounts
+
+    def _index(self: CredentialsStore) -> Dict[str, Tuple[str, str]]:
+        """return the parsed accounts, reparsing the file if it changed since it was last read."""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._signature, self._accounts = None, dict()
+                return self._accounts
+
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature != self._signature:
+                with open(self.path) as f:
+                    self._accounts = self.parse(f.readlines())
+                self._signature = signature
+
+            return self._accounts
+
+    def names(self: CredentialsStore) -> List[str]:
+        """
+        return the name of every account, in file order.
+
+        :return -> ``List[str]``: the account names.
+        """
+        return list(self._index())
+
+    def accounts(self: CredentialsStore) -> Dict[str, Tuple[str, str]]:
+        """
+        return every account.
+
+        :return -> ``Dict[str, Tuple[str, str]]``: maps every account name to its address and passphrase.
+        """
+        return dict(self._index())
+
+    def __contains__(self: CredentialsStore, acct_name: str) -> bool:
+        return acct_name in self._index()
+
+    def get(self: CredentialsStore, acct_name: str) -> Tuple[str, str]:
+        """
+        return the address and passphrase of `acct_name`.
+
+        :param acct_name -> ``str``: the name of the account.
+        :return -> ``Tuple[str, str]``: the address and passphrase.
+        """
+        try:
+            return self._index()[acct_name]
+        except KeyError:
+            raise InvalidAccountNameError(f"The provided account name, {acct_name}, does not exist.")
+
+    def address(self: CredentialsStore, acct_name: str) -> str:
+        """
+        return the address of `acct_name`.
+
+        :param acct_name -> ``str``: the name of the account.
+        :return -> ``str``: the address.
+        """
+        return self.get(acct_name)[0]
+
+    def passphrase(self: CredentialsStore, acct_name: str) -> str:
+        """
+        return the passphrase of `acct_name`.
+
+        :param acct_name -> ``str``: the name of the account.
+        :return -> ``str``: the passphrase.
+        """
+        return self.get(acct_name)[1]
+
+
+_stores: Dict[str, CredentialsStore] = dict()
+_stores_lock = threading.Lock()
+
+def credentials_store(path: str) -> CredentialsStore:
+    """
+    return the store of the credentials file at `path`, shared by every caller in the process.
+
+    :param path -> ``str``: the credentials file.
+    :return -> ``CredentialsStore``: the store.
+    """
+    path = os.path.abspath(str(path))
+
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = CredentialsStore(path)
+        return store
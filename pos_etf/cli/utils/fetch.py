@@ -0,0 +1,111 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from urllib.parse import urlsplit
+import asyncio
+
+from .resilience import ResiliencePolicy, resilience_policy
+from .session import SessionPool, session_pool
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls that share a key into a single in-flight future, so callers
+    that ask for the same thing at the same time all wait on one underlying call.
+
+    Attributes:
+        calls: the number of underlying calls that were actually made.
+        coalesced: the number of calls that joined an in-flight call instead of making their own.
+    """
+
+    def __init__(self: SingleFlight) -> None:
+        """
+        initialize the SingleFlight object.
+
+        :return -> ``None``:
+        """
+        self._in_flight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future] = dict()
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self: SingleFlight, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        await `fn()`, or the call already in flight for `key` on the running event loop.
+
+        :param key -> ``Hashable``: identifies calls that may share a result.
+        :param fn -> ``Callable[[], Awaitable[Any]]``: coroutine function making the underlying call.
+        :return -> ``Any``: the result of the (possibly shared) call.
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        future = self._in_flight.get(flight_key)
+
+        if future is None:
+            self.calls += 1
+            future = self._in_flight[flight_key] = asyncio.ensure_future(fn())
+            future.add_done_callback(lambda _: self._in_flight.pop(flight_key, None))
+        else:
+            self.coalesced += 1
+
+        # shield the shared future so one cancelled caller does not cancel it for the rest.
+        return await asyncio.shield(future)
+
+    def stats(self: SingleFlight) -> Dict[str, int]:
+        """
+        return the call counters.
+
+        :return -> ``Dict[str, int]``: the number of calls made and coalesced.
+        """
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+class CoinFetcher(object):
+    """
+    Retrieves coin statistics over the pooled session. Concurrent requests for the same
+    URL are coalesced, so a trade that needs the Algo price and the basket (which also
+    contains algorand) makes one request per distinct coin. Every request runs under the
+    resilience policy, so a slow or failing response is timed out, retried or hedged
+    instead of stalling the whole basket.
+
+    Attributes:
+        session_pool: the pool providing the shared HTTP session.
+        single_flight: the coalescer that in-flight requests are deduplicated through.
+        policy: the timeout, retry, hedging and circuit-breaker policy requests run under.
+    """
+
+    def __init__(self: CoinFetcher, session_pool: SessionPool = session_pool, policy: ResiliencePolicy = resilience_policy) -> None:
+        """
+        initialize the CoinFetcher object.
+
+        :param session_pool -> ``SessionPool``: the pool providing the shared HTTP session.
+        :param policy -> ``ResiliencePolicy``: the policy requests run under.
+        :return -> ``None``:
+        """
+        self.session_pool = session_pool
+        self.single_flight = SingleFlight()
+        self.policy = policy
+
+    async def _request_statistics(self: CoinFetcher, url: str) -> Dict[str, int or float]:
+        """
+        send the request for `url` under the resilience policy and return the `statistics` object of the response.
+
+        :param url -> ``str``: the coinmarketcap detail URL for a coin.
+        :return -> ``Dict[str, int or float]``: every statistic returned for the coin.
+        """
+        async with self.session_pool.session() as session:
+
+            async def request():
+                async with session.request("GET", url) as response:
+                    response.raise_for_status()
+                    return (await response.json())["data"]["statistics"]
+
+            return await self.policy.call(urlsplit(url).netloc, request)
+
+    async def fetch_statistics(self: CoinFetcher, url: str) -> Dict[str, int or float]:
+        """
+        retrieve every statistic for the coin at `url`, joining an identical in-flight request if there is one.
+
+        :param url -> ``str``: the coinmarketcap detail URL for a coin.
+        :return -> ``Dict[str, int or float]``: every statistic returned for the coin.
+        """
+        return await self.single_flight.do(url, lambda: self._request_statistics(url))
+
+
+coin_fetcher = CoinFetcher()
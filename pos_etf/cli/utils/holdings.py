@@ -0,0 +1,188 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import threading
+
+from . import constants
+from .jsonfile import JsonFile
+
+class HoldingsCache(object):
+    """
+    Caches the ETF holdings of accounts together with the round they were read at, so
+    repeated views of accounts that did not change are served locally.
+
+    A cached holding is still current if the chain has not advanced past its round. If it
+    has, the holding is only re-read when the account has had activity since that round,
+    which callers detect cheaply with an indexer query for at most one transaction of the
+    account after the cached round (see `activity_url`); otherwise the entry is moved
+    forward with `touch`, but only as far as the indexer has indexed (see `checked_round`).
+
+    Only the ETF amount is cached: an asset balance changes only through a transaction, but
+    the Algo balance also grows with participation rewards, so it cannot be served from the
+    cache. Entries are keyed by algod endpoint and address and mirrored to a JSON file,
+    which `persist` merges into.
+
+    Attributes:
+        path: the JSON file backing the cache (``None`` keeps the cache in memory only).
+        hits: the number of holdings served from the cache.
+        misses: the number of holdings that had to be read from the chain.
+    """
+
+    def __init__(self: HoldingsCache, path: Optional[str] = constants.holdings_cache_path) -> None:
+        """
+        initialize the HoldingsCache object.
+
+        :param path -> ``str``: the JSON file backing the cache, or ``None`` for memory only.
+        :return -> ``None``:
+        """
+        self.path = path
+        self._file = JsonFile(path, prefix=".holdings_cache.")
+        self._entries: Dict[str, Dict[str, Any]] = dict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(algod_url: str, address: str) -> str:
+        """
+        build the cache key for `address` on the network served by `algod_url`.
+
+        :param algod_url -> ``str``: the base URL of the algod node.
+        :param address -> ``str``: the address of the account.
+        :return -> ``str``: the cache key.
+        """
+        return f"{algod_url}:{address}"
+
+    @staticmethod
+    def activity_url(indexer_url: str, address: str, since_round: int) -> str:
+        """
+        build the indexer query that returns at most one transaction of `address` after `since_round`.
+
+        :param indexer_url -> ``str``: the base URL of the indexer.
+        :param address -> ``str``: the address of the account.
+        :param since_round -> ``int``: the round the cached holding was read at.
+        :return -> ``str``: the URL of the query.
+        """
+        return f"{indexer_url}/idx2/v2/transactions?address={address}&min-round={since_round + 1}&limit=1"
+
+    @staticmethod
+    def checked_round(current_round: int, activity: Optional[Dict[str, Any]], cached_round: int) -> int:
+        """
+        the round up to which an account is known to have had no activity. The indexer lags
+        algod, so a transaction algod has confirmed may not be indexed yet; moving the entry
+        past the indexer's round would make later activity queries start after it.
+
+        :param current_round -> ``int``: the last round of algod.
+        :param activity -> ``Dict[str, Any]``: the response of the `activity_url` query, or ``None`` if none was needed.
+        :param cached_round -> ``int``: the round of the cached holding.
+        :return -> ``int``: the round the entry may be moved forward to.
+        """
+        if activity is None:
+            return current_round
+        return min(current_round, activity.get("current-round", cached_round))
+
+    def _load(self: HoldingsCache) -> None:
+        """read the backing file into memory the first time the cache is used."""
+        self._loaded = True
+        self._entries.update(self._file.read())
+
+    def lookup(self: HoldingsCache, algod_url: str, address: str) -> Optional[Dict[str, Any]]:
+        """
+        return the cached holding of `address` without checking whether it is current.
+
+        :param algod_url -> ``str``: the base URL of the algod node.
+        :param address -> ``str``: the address of the account.
+        :return -> ``Dict[str, Any]``: the `amount` and `round` of the holding, or ``None``.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._entries.get(self.key(algod_url, address))
+            # files written before only the ETF amount was cached also hold an `algos` balance, which is not returned.
+            return {"amount": entry["amount"], "round": entry["round"]} if entry is not None else None
+
+    def store(self: HoldingsCache, algod_url: str, address: str, amount: int, round: int) -> None:
+        """
+        record the holding of `address` read from the chain at `round`.
+
+        :param algod_url -> ``str``: the base URL of the algod node.
+        :param address -> ``str``: the address of the account.
+        :param amount -> ``int``: the ETF amount held, in base units.
+        :param round -> ``int``: the round the account was read at.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self.misses += 1
+            self._entries[self.key(algod_url, address)] = {"amount": amount, "round": round}
+            self._dirty = True
+
+    def touch(self: HoldingsCache, algod_url: str, address: str, round: int) -> None:
+        """
+        record that the cached holding of `address` is still current at `round`.
+
+        :param algod_url -> ``str``: the base URL of the algod node.
+        :param address -> ``str``: the address of the account.
+        :param round -> ``int``: the round the holding was confirmed at.
+        """
+        with self._lock:
+            entry = self._entries.get(self.key(algod_url, address))
+            if entry is not None and entry["round"] < round:
+                entry["round"] = round
+                self._dirty = True
+
+    def hit(self: HoldingsCache) -> None:
+        """count a holding served from the cache."""
+        with self._lock:
+            self.hits += 1
+
+    def invalidate(self: HoldingsCache, algod_url: Optional[str] = None, address: Optional[str] = None) -> None:
+        """
+        drop the cached holding of `address`, or every cached holding if `address` is ``None``.
+
+        :param algod_url -> ``str``: the base URL of the algod node.
+        :param address -> ``str``: the address of the account.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if address is None:
+                drop = lambda key: True
+            else:
+                drop = lambda key, dropped=self.key(algod_url, address): key == dropped
+
+            for key in [key for key in self._entries if drop(key)]:
+                del self._entries[key]
+            self._file.update(lambda on_disk: {key: entry for key, entry in on_disk.items() if not drop(key)})
+
+    def persist(self: HoldingsCache) -> None:
+        """
+        merge the entries into the backing file if any changed. Where the file and this process
+        hold different holdings of an account, the one read or confirmed at the later round wins,
+        so a concurrent view that saw newer activity is not overwritten.
+        """
+        def merge(on_disk: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            merged = dict(on_disk)
+            for key, entry in self._entries.items():
+                if key not in merged or merged[key]["round"] <= entry["round"]:
+                    merged[key] = entry
+            return merged
+
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+
+            if self._file.update(merge):
+                self._dirty = False
+
+    def stats(self: HoldingsCache) -> Dict[str, int]:
+        """
+        return the hit/miss counters.
+
+        :return -> ``Dict[str, int]``: the number of hits and misses.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+holdings_cache = HoldingsCache()
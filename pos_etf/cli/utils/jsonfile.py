@@ -0,0 +1,86 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional
+import fcntl
+import json
+import os
+import tempfile
+
+class JsonFile(object):
+    """
+    A JSON object mirrored to a file, as the on-disk caches under ~/.pos_etf keep it. The file
+    is only ever replaced atomically (written to a temporary file in the same directory, then
+    renamed over it), so a reader never sees a half-written file, and a missing or unreadable
+    file reads as empty.
+
+    Attributes:
+        path: the file (``None`` disables reading and writing).
+        prefix: the name prefix of the temporary files.
+    """
+
+    def __init__(self: JsonFile, path: Optional[str], prefix: str = ".json.") -> None:
+        """
+        initialize the JsonFile object.
+
+        :param path -> ``str``: the file, or ``None`` to disable reading and writing.
+        :param prefix -> ``str``: the name prefix of the temporary files.
+        :return -> ``None``:
+        """
+        self.path = path
+        self.prefix = prefix
+
+    def read(self: JsonFile) -> Dict[str, Any]:
+        """
+        the object in the file.
+
+        :return -> ``Dict[str, Any]``: the object, or an empty one if the file is missing or unreadable.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return dict()
+
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def write(self: JsonFile, entries: Dict[str, Any]) -> bool:
+        """
+        atomically replace the file with `entries`.
+
+        :param entries -> ``Dict[str, Any]``: the object to write.
+        :return -> ``bool``: ``True`` if the file was written.
+        """
+        if not self.path:
+            return False
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=directory, prefix=self.prefix)
+        try:
+            with os.fdopen(file_descriptor, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        return True
+
+    def update(self: JsonFile, merge: Callable[[Dict[str, Any]], Dict[str, Any]]) -> bool:
+        """
+        re-read the file, apply `merge` to its object and write the result, holding a lock file
+        throughout so concurrent updates from other processes are not lost.
+
+        :param merge -> ``Callable[[Dict[str, Any]], Dict[str, Any]]``: builds the new object from the one in the file.
+        :return -> ``bool``: ``True`` if the file was written.
+        """
+        if not self.path:
+            return False
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            return self.write(merge(self.read()))
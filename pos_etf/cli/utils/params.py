@@ -0,0 +1,143 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+
+from . import constants
+
+class ParamsCache(object):
+    """
+    Caches the suggested transaction params of every algod endpoint, so transactions built
+    in the same round share one `suggested_params` request instead of making one each.
+
+    An entry is reused until the endpoint is seen at a later round than the one the params
+    were suggested at (see `observe_round`) or until it is `ttl` seconds old, whichever
+    comes first. Both v2 clients (``SuggestedParams`` objects) and v1 clients (dicts with
+    a `lastRound` key) are supported.
+
+    `get` requests params synchronously. Coroutines should `await prefetch` first, so a cold
+    or expired entry is requested on a worker thread instead of blocking the event loop.
+
+    Attributes:
+        ttl: number of seconds an entry is reused for when no later round has been observed.
+        hits: the number of requests served from the cache.
+        misses: the number of requests that called `suggested_params`.
+    """
+
+    def __init__(self: ParamsCache, ttl: float = constants.params_cache_ttl) -> None:
+        """
+        initialize the ParamsCache object.
+
+        :param ttl -> ``float``: number of seconds an entry is reused for when no later round has been observed.
+        :return -> ``None``:
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[Any, int, float]] = dict()
+        self._single_flight = None # created by the first `prefetch`, so importing this module stays cheap
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(client: Any) -> Tuple[str, str]:
+        """
+        build the cache key of `client`: its API version and algod endpoint.
+
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        :return -> ``Tuple[str, str]``: the cache key.
+        """
+        return (type(client).__module__, client.algod_address)
+
+    @staticmethod
+    def round_of(params: Any) -> int:
+        """
+        return the round that `params` were suggested at.
+
+        :param params -> ``SuggestedParams`` or ``Dict``: the params returned by `suggested_params`.
+        :return -> ``int``: the round.
+        """
+        if isinstance(params, dict):
+            return params.get("lastRound", 0)
+        return params.first
+
+    def get(self: ParamsCache, client: Any) -> Any:
+        """
+        return the suggested params of `client`'s endpoint, requesting them only when the
+        cached entry is missing, older than `ttl` or from an earlier round than observed.
+
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        :return -> ``SuggestedParams`` or ``Dict``: the params, as returned by `client.suggested_params`.
+        """
+        key = self.key(client)
+
+        # the lock is held while requesting, so builders racing on a cold entry share one request.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl:
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            params = client.suggested_params()
+            self._entries[key] = (params, self.round_of(params), time.monotonic())
+            return params
+
+    async def prefetch(self: ParamsCache, client: Any) -> None:
+        """
+        make sure `client`'s endpoint has params cached, requesting them on a worker thread if the
+        entry is missing or expired. Concurrent prefetches of one endpoint share one request.
+
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        """
+        import asyncio
+        from .fetch import SingleFlight
+
+        key = self.key(client)
+        # read without the lock: it is held by any worker thread requesting params, and waiting on it would block the loop.
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[2] < self.ttl:
+            return
+        if self._single_flight is None:
+            self._single_flight = SingleFlight()
+
+        loop = asyncio.get_running_loop()
+        await self._single_flight.do(key, lambda: loop.run_in_executor(None, self.get, client))
+
+    def observe_round(self: ParamsCache, client: Any, round: Optional[int]) -> None:
+        """
+        record that `client`'s endpoint has reached `round`, dropping its params if they were suggested at an earlier round.
+
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        :param round -> ``int``: the last round reported by the endpoint.
+        """
+        if round is None:
+            return
+
+        key = self.key(client)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < round:
+                del self._entries[key]
+
+    def invalidate(self: ParamsCache, client: Optional[Any] = None) -> None:
+        """
+        drop the params of `client`'s endpoint, or of every endpoint if `client` is ``None``.
+
+        :param client -> ``algod.AlgodClient``: a v1 or v2 algorand client object.
+        """
+        with self._lock:
+            if client is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.key(client), None)
+
+    def stats(self: ParamsCache) -> Dict[str, int]:
+        """
+        return the hit/miss counters.
+
+        :return -> ``Dict[str, int]``: the number of hits and misses.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+params_cache = ParamsCache()
@@ -0,0 +1,312 @@
+from __future__ import annotations
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from pos_etf.cli.error import CircuitOpenError
+from . import constants
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    whether a failed request is worth retrying: timeouts, connection errors and 5xx/429
+    responses are; other client errors (e.g. a 404 for an unknown coin slug) are not.
+
+    :param error -> ``BaseException``: the error the request failed with.
+    :return -> ``bool``: ``True`` if the request should be retried.
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+class LatencyWindow(object):
+    """
+    The latencies of the most recent successful requests to one host, used to decide how
+    long to wait before hedging a request.
+
+    Attributes:
+        samples: the latencies, in seconds, oldest first.
+    """
+
+    def __init__(self: LatencyWindow, size: int = 256) -> None:
+        """
+        initialize the LatencyWindow object.
+
+        :param size -> ``int``: the number of latencies kept.
+        :return -> ``None``:
+        """
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def record(self: LatencyWindow, latency: float) -> None:
+        """add the latency of a successful request."""
+        self.samples.append(latency)
+
+    def quantile(self: LatencyWindow, q: float, min_samples: int = 20) -> Optional[float]:
+        """
+        the `q` quantile of the recorded latencies.
+
+        :param q -> ``float``: the quantile, between 0 and 1.
+        :param min_samples -> ``int``: the number of latencies needed for a meaningful estimate.
+        :return -> ``float``: the quantile in seconds, or ``None`` if fewer than `min_samples` latencies were recorded.
+        """
+        if len(self.samples) < min_samples:
+            return None
+
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker(object):
+    """
+    Fails requests to a host fast while it is down. After `failure_threshold` consecutive
+    failures the circuit opens and every request is rejected with `CircuitOpenError` for
+    `reset_timeout` seconds; then one trial request is let through (half-open), which closes
+    the circuit if it succeeds and opens it again if it fails.
+
+    Attributes:
+        failure_threshold: the number of consecutive failures that open the circuit.
+        reset_timeout: the number of seconds the circuit stays open before a trial request.
+        state: one of `CLOSED`, `OPEN` or `HALF_OPEN`.
+        failures: the number of consecutive failures.
+    """
+
+    def __init__(self: CircuitBreaker, failure_threshold: int = constants.breaker_failure_threshold, reset_timeout: float = constants.breaker_reset_timeout, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        initialize the CircuitBreaker object.
+
+        :param failure_threshold -> ``int``: the number of consecutive failures that open the circuit.
+        :param reset_timeout -> ``float``: the number of seconds the circuit stays open before a trial request.
+        :param clock -> ``Callable[[], float]``: the clock the open period is measured with.
+        :return -> ``None``:
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self: CircuitBreaker) -> bool:
+        """
+        whether a request may be sent now. In the half-open state only one trial request is allowed at a time.
+
+        :return -> ``bool``: ``True`` if the request may be sent.
+        """
+        if self.state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._trial_in_flight = False
+
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self: CircuitBreaker) -> None:
+        """close the circuit after a successful request."""
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release(self: CircuitBreaker) -> None:
+        """give back a request that ended without an answer (e.g. it was cancelled), letting another half-open trial through."""
+        self._trial_in_flight = False
+
+    def record_failure(self: CircuitBreaker) -> None:
+        """count a failed request, opening the circuit once the threshold is reached or a trial request failed."""
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self._opened_at = self.clock()
+            self._trial_in_flight = False
+
+
+class ResiliencePolicy(object):
+    """
+    Runs requests with a per-attempt timeout, jittered exponential backoff between retries,
+    an optional hedged duplicate once an attempt has taken longer than the host's recent p95
+    latency, and a per-host `CircuitBreaker` that rejects requests while the host is failing.
+
+    The backoff before retry n is drawn uniformly from [0, min(`backoff_max`, `backoff_base` * 2^n)]
+    ("full jitter"), so clients retrying after a shared outage do not retry in lockstep. A
+    hedge is only sent once `min_samples` latencies are known for the host, and whichever of
+    the original and the hedge answers first wins; the other is cancelled.
+
+    Attributes:
+        timeout: the number of seconds one attempt may take.
+        retries: the number of retries after the first attempt.
+        backoff_base: the upper bound of the first backoff, in seconds.
+        backoff_max: the upper bound of any backoff, in seconds.
+        hedge: whether hedged requests are sent.
+        hedge_quantile: the latency quantile after which a hedge is sent.
+        calls, retries_made, hedges, hedge_wins, timeouts, rejected: usage counters for this process.
+    """
+
+    def __init__(self: ResiliencePolicy, timeout: float = constants.fetch_timeout, retries: int = constants.fetch_retries, backoff_base: float = constants.fetch_backoff_base, backoff_max: float = constants.fetch_backoff_max, hedge: bool = constants.fetch_hedge, hedge_quantile: float = 0.95, min_samples: int = 20, breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker) -> None:
+        """
+        initialize the ResiliencePolicy object.
+
+        :param timeout -> ``float``: the number of seconds one attempt may take.
+        :param retries -> ``int``: the number of retries after the first attempt.
+        :param backoff_base -> ``float``: the upper bound of the first backoff, in seconds.
+        :param backoff_max -> ``float``: the upper bound of any backoff, in seconds.
+        :param hedge -> ``bool``: whether hedged requests are sent.
+        :param hedge_quantile -> ``float``: the latency quantile after which a hedge is sent.
+        :param min_samples -> ``int``: the number of latencies needed before hedging a host.
+        :param breaker_factory -> ``Callable[[], CircuitBreaker]``: builds the circuit breaker of a host.
+        :return -> ``None``:
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.breaker_factory = breaker_factory
+        self._breakers: Dict[str, CircuitBreaker] = dict()
+        self._latencies: Dict[str, LatencyWindow] = dict()
+
+        self.calls = 0
+        self.retries_made = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def breaker(self: ResiliencePolicy, host: str) -> CircuitBreaker:
+        """the circuit breaker of `host`."""
+        if host not in self._breakers:
+            self._breakers[host] = self.breaker_factory()
+        return self._breakers[host]
+
+    def latencies(self: ResiliencePolicy, host: str) -> LatencyWindow:
+        """the recent latencies of `host`."""
+        if host not in self._latencies:
+            self._latencies[host] = LatencyWindow()
+        return self._latencies[host]
+
+    def backoff(self: ResiliencePolicy, retry: int) -> float:
+        """
+        the number of seconds to wait before retry number `retry` (starting at 0).
+
+        :param retry -> ``int``: the number of retries already made.
+        :return -> ``float``: the jittered backoff.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    async def _timed(self: ResiliencePolicy, host: str, request: Callable[[], Awaitable[T]]) -> T:
+        """run one request under the per-attempt timeout, recording its latency if it succeeds."""
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(request(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        self.latencies(host).record(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self: ResiliencePolicy, host: str, request: Callable[[], Awaitable[T]]) -> T:
+        """run one attempt, hedging it if it is slower than the host's recent `hedge_quantile` latency."""
+        hedge_delay = self.latencies(host).quantile(self.hedge_quantile, self.min_samples) if self.hedge else None
+        primary = asyncio.ensure_future(self._timed(host, request))
+        hedged: Optional[asyncio.Future] = None
+
+        if hedge_delay is None:
+            return await primary
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            hedged = asyncio.ensure_future(self._timed(host, request))
+            pending = {primary, hedged}
+            error: Optional[BaseException] = None
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge_wins += task is hedged
+                        return task.result()
+                    error = task.exception()
+
+            raise error
+        finally:
+            for task in (primary, hedged):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def call(self: ResiliencePolicy, host: str, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        run `request` against `host` under the policy.
+
+        :param host -> ``str``: the host the request is sent to, which selects its circuit breaker and latency window.
+        :param request -> ``Callable[[], Awaitable[T]]``: coroutine function sending the request once; it may be called several times.
+        :return -> ``T``: the result of the first successful attempt.
+        """
+        self.calls += 1
+        breaker = self.breaker(host)
+
+        for retry in range(self.retries + 1):
+            if not breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError(f"Requests to {host} are failing; not retrying for up to {breaker.reset_timeout}s.")
+
+            try:
+                result = await self._attempt(host, request)
+            except Exception as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status < 500 and not is_retryable(e):
+                    # the host answered with a client error, so it is up.
+                    breaker.record_success()
+                    raise
+                if not is_retryable(e):
+                    # e.g. a malformed body: the host's health is unknown, so only free a half-open trial.
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if retry == self.retries:
+                    raise
+            except BaseException:
+                # cancelled (a hedge loser, a late basket coin, loop shutdown): the host's health is unknown.
+                breaker.release()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+            self.retries_made += 1
+            await asyncio.sleep(self.backoff(retry))
+
+    def stats(self: ResiliencePolicy) -> Dict[str, Any]:
+        """
+        return the usage counters and the state of every host's circuit.
+
+        :return -> ``Dict[str, Any]``: the counters and the circuit state per host.
+        """
+        return {
+            "calls": self.calls,
+            "retries": self.retries_made,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "circuits": {host: breaker.state for host, breaker in self._breakers.items()}
+        }
+
+
+resilience_policy = ResiliencePolicy()
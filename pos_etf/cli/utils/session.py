@@ -0,0 +1,78 @@
+from __future__ import annotations
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+import asyncio
+import aiohttp
+
+from . import constants
+
+class SessionPool(object):
+    """
+    Owns one keep-alive ``aiohttp.ClientSession`` per running event loop so that every
+    request made on that loop (coin statistics, the Algo price, algod/indexer lookups)
+    reuses the same TCP+TLS connections instead of paying a new handshake per request.
+
+    The session is reference counted: it is opened by the first `session()` context on a
+    loop and closed when the last one exits, so short-lived `asyncio.run` calls clean up
+    after themselves while long-running loops can hold it open for their whole lifetime.
+
+    Attributes:
+        limit_per_host: maximum number of simultaneous connections to a single host.
+        dns_cache_ttl: number of seconds a resolved host is cached for.
+        keepalive_timeout: number of seconds an idle connection is kept open.
+    """
+
+    def __init__(self: SessionPool, limit_per_host: int = constants.http_limit_per_host, dns_cache_ttl: int = constants.http_dns_cache_ttl, keepalive_timeout: float = constants.http_keepalive_timeout) -> None:
+        """
+        initialize the SessionPool object.
+
+        :param limit_per_host -> ``int``: maximum number of simultaneous connections per host.
+        :param dns_cache_ttl -> ``int``: number of seconds to cache DNS lookups for.
+        :param keepalive_timeout -> ``float``: number of seconds to keep idle connections open.
+        :return -> ``None``:
+        """
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = dict()
+        self._users: Dict[asyncio.AbstractEventLoop, int] = dict()
+
+    def _open(self: SessionPool) -> aiohttp.ClientSession:
+        """
+        build a new session whose connector is configured with the pool settings.
+
+        :return -> ``aiohttp.ClientSession``: the newly created session.
+        """
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    @asynccontextmanager
+    async def session(self: SessionPool) -> AsyncIterator[aiohttp.ClientSession]:
+        """
+        yield the shared session for the running event loop, opening it if necessary.
+
+        :return -> ``AsyncIterator[aiohttp.ClientSession]``: the pooled session.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+
+        if session is None or session.closed:
+            session = self._sessions[loop] = self._open()
+
+        self._users[loop] = self._users.get(loop, 0) + 1
+        try:
+            yield session
+        finally:
+            self._users[loop] -= 1
+            if self._users[loop] == 0:
+                del self._users[loop]
+                del self._sessions[loop]
+                await session.close()
+
+
+session_pool = SessionPool()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, TextIO
+import contextlib
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+from . import constants
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("algoetf_current_span", default=None)
+
+class Span(object):
+    """
+    A timed section of work. Spans opened while another span is active become its children
+    and share its trace id; a span opened with no active span starts a new trace.
+
+    Attributes:
+        tracer: the tracer the span is emitted to.
+        name: the name of the span.
+        attributes: extra fields emitted with the span.
+        trace_id: the id shared by every span of one trace.
+        span_id: the id of this span.
+        parent_id: the id of the enclosing span (``None`` for the root span).
+    """
+
+    __slots__ = ("tracer", "name", "attributes", "trace_id", "span_id", "parent_id", "_start", "_token")
+
+    def __init__(self: Span, tracer: Tracer, name: str, attributes: Dict[str, Any]) -> None:
+        """
+        initialize the Span object.
+
+        :param tracer -> ``Tracer``: the tracer the span is emitted to.
+        :param name -> ``str``: the name of the span.
+        :param attributes -> ``Dict[str, Any]``: extra fields emitted with the span.
+        :return -> ``None``:
+        """
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self: Span) -> Span:
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = uuid.uuid4().hex[:16]
+        self._token = _current_span.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self: Span, exc_type, exc_value, traceback) -> bool:
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "duration_ms": round(duration * 1000, 3),
+            "outcome": "ok" if exc_type is None else "error"
+        }
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc_value}"
+        record.update(self.attributes)
+
+        self.tracer.emit(record)
+        return False
+
+
+class Tracer(object):
+    """
+    Emits nested timing spans as JSON lines to a sink. When no sink is configured the
+    tracer is disabled: `span` returns a shared no-op context manager and `traced` calls
+    straight through to the wrapped function, so instrumentation costs a single check.
+
+    Attributes:
+        sink: where spans are written: a file path, `-` for stderr, or ``None`` to disable tracing.
+    """
+
+    def __init__(self: Tracer, sink: Optional[str] = None) -> None:
+        """
+        initialize the Tracer object.
+
+        :param sink -> ``str``: a file path, `-` for stderr, or ``None`` to disable tracing.
+        :return -> ``None``:
+        """
+        self._lock = threading.Lock()
+        self._stream: Optional[TextIO] = None
+        self.configure(sink)
+
+    def configure(self: Tracer, sink: Optional[str]) -> None:
+        """
+        change where spans are written.
+
+        :param sink -> ``str``: a file path, `-` for stderr, or ``None`` to disable tracing.
+        """
+        with self._lock:
+            if self._stream is not None and self._stream is not sys.stderr:
+                self._stream.close()
+
+            self.sink = sink or None
+            self._stream = None
+            self.enabled = self.sink is not None
+
+    def emit(self: Tracer, record: Dict[str, Any]) -> None:
+        """
+        write one span record as a JSON line.
+
+        :param record -> ``Dict[str, Any]``: the span record.
+        """
+        line = json.dumps(record, default=str) + "\n"
+
+        with self._lock:
+            if self._stream is None:
+                if self.sink == "-":
+                    self._stream = sys.stderr
+                else:
+                    os.makedirs(os.path.dirname(self.sink) or ".", exist_ok=True)
+                    self._stream = open(self.sink, "a", buffering=1)
+            self._stream.write(line)
+
+    def span(self: Tracer, name: str, **attributes: Any) -> contextlib.AbstractContextManager:
+        """
+        open a span named `name` for the duration of a `with` block.
+
+        :param name -> ``str``: the name of the span.
+        :param attributes -> ``Any``: extra fields emitted with the span.
+        :return -> ``contextlib.AbstractContextManager``: the span, or a no-op context manager when tracing is disabled.
+        """
+        if not self.enabled:
+            return _noop_span
+
+        return Span(self, name, attributes)
+
+    def traced(self: Tracer, name: Optional[str] = None) -> Callable:
+        """
+        decorate a function or coroutine function so every call is wrapped in a span.
+
+        :param name -> ``str``: the name of the span, defaults to the function's qualified name.
+        :return -> ``Callable``: the decorator.
+        """
+        def decorator(fn: Callable) -> Callable:
+            span_name = name or fn.__qualname__
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await fn(*args, **kwargs)
+                    with Span(self, span_name, dict()):
+                        return await fn(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with Span(self, span_name, dict()):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+_noop_span = contextlib.nullcontext()
+tracer = Tracer(constants.trace_sink)
@@ -0,0 +1,215 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from pos_etf.cli.utils import constants, fetch_json
+from pos_etf.cli.utils.holdings import HoldingsCache, holdings_cache
+
+if TYPE_CHECKING:
+    import aiohttp
+    from pos_etf.cli.utils.session import SessionPool
+
+def etf_holding(account_info: Dict[str, Any], asset_id: int = constants.asset_id) -> int:
+    """
+    return the amount of `asset_id` held by an account, in base units.
+
+    :param account_info -> ``Dict[str, Any]``: the account object returned by algod's `/v2/accounts/{address}`.
+    :param asset_id -> ``int``: the ID for the asset.
+    :return -> ``int``: the amount held (0 if the account has not opted in to the asset).
+    """
+    for asset in account_info.get("assets") or list():
+        if asset["asset-id"] == asset_id:
+            return asset["amount"]
+    return 0
+
+
+def holding_of(address: str, algod_url: str = constants.algod_url, indexer_url: str = constants.indexer_url, cache: Optional[HoldingsCache] = holdings_cache, fresh: bool = False) -> Dict[str, Any]:
+    """
+    retrieve the holding of one account with blocking requests, serving it from `cache` when
+    the account has had no activity since it was cached (see `HoldingsCache`).
+
+    :param address -> ``str``: the address of the account.
+    :param algod_url -> ``str``: the base URL of the algod node.
+    :param indexer_url -> ``str``: the base URL of the indexer.
+    :param cache -> ``HoldingsCache``: the holdings cache, or ``None`` to always read the chain.
+    :param fresh -> ``bool``: read the chain even if the cached holding is current.
+    :return -> ``Dict[str, Any]``: the ETF `amount` (base units), `algos` (microalgos, ``None`` if `cached`), `round` and whether it was `cached`.
+    """
+    if cache is not None and not fresh:
+        entry = cache.lookup(algod_url, address)
+        if entry is not None:
+            current_round = fetch_json(f"{algod_url}/v2/status")["last-round"]
+            activity = fetch_json(HoldingsCache.activity_url(indexer_url, address, entry["round"])) if entry["round"] < current_round else None
+            if activity is None or not activity["transactions"]:
+                cache.touch(algod_url, address, HoldingsCache.checked_round(current_round, activity, entry["round"]))
+                cache.hit()
+                cache.persist()
+                return dict(entry, algos=None, cached=True)
+
+    account_info = fetch_json(f"{algod_url}/v2/accounts/{address}")
+    holding = {"amount": etf_holding(account_info), "algos": account_info.get("amount"), "round": account_info.get("round")}
+
+    if cache is not None:
+        cache.store(algod_url, address, holding["amount"], holding["round"])
+        cache.persist()
+    return dict(holding, cached=False)
+
+
+class HoldingsView(object):
+    """
+    Retrieves the ETF holdings of many accounts at once. Every account is requested
+    concurrently over one pooled session whose per-host connection limit is the
+    concurrency limit, so thousands of accounts take seconds rather than minutes.
+
+    With a holdings cache, the current round is read once for all accounts and only the
+    accounts with activity since they were cached are requested again.
+
+    Attributes:
+        algod_url: the base URL of the algod node accounts are read from.
+        indexer_url: the base URL of the indexer account activity is checked on.
+        asset_id: the ID of the ETF asset.
+        holdings_cache: the holdings cache, or ``None`` to always read the chain.
+        session_pool: the pool providing the shared HTTP session.
+    """
+
+    def __init__(self: HoldingsView, algod_url: str = constants.algod_url, asset_id: int = constants.asset_id, concurrency: int = constants.view_concurrency, session_pool: Optional[SessionPool] = None, indexer_url: str = constants.indexer_url, holdings_cache: Optional[HoldingsCache] = holdings_cache) -> None:
+        """
+        initialize the HoldingsView object.
+
+        :param algod_url -> ``str``: the base URL of the algod node accounts are read from.
+        :param asset_id -> ``int``: the ID of the ETF asset.
+        :param concurrency -> ``int``: maximum number of account requests in flight at once.
+        :param session_pool -> ``SessionPool``: the pool providing the shared HTTP session (by default, one sized to `concurrency`).
+        :param indexer_url -> ``str``: the base URL of the indexer account activity is checked on.
+        :param holdings_cache -> ``HoldingsCache``: the holdings cache, or ``None`` to always read the chain.
+        :return -> ``None``:
+        """
+        from pos_etf.cli.utils.session import SessionPool
+
+        self.algod_url = algod_url
+        self.indexer_url = indexer_url
+        self.asset_id = asset_id
+        self.holdings_cache = holdings_cache
+        self.session_pool = session_pool or SessionPool(limit_per_host=concurrency)
+
+    async def _get_json(self: HoldingsView, session: aiohttp.ClientSession, url: str) -> Dict[str, Any]:
+        """send a GET request for `url` and return the JSON body."""
+        async with session.get(url, headers={'User-Agent': 'DanM'}) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def fetch_account(self: HoldingsView, session: aiohttp.ClientSession, address: str) -> Dict[str, Any]:
+        """
+        request the account object of `address`.
+
+        :param session -> ``aiohttp.ClientSession``: the pooled session.
+        :param address -> ``str``: the address of the account.
+        :return -> ``Dict[str, Any]``: the account object.
+        """
+        return await self._get_json(session, f"{self.algod_url}/v2/accounts/{address}")
+
+    async def cached_holding(self: HoldingsView, session: aiohttp.ClientSession, address: str, current_round: int) -> Optional[Dict[str, Any]]:
+        """
+        return the cached holding of `address` if it is still current at `current_round`.
+
+        :param session -> ``aiohttp.ClientSession``: the pooled session.
+        :param address -> ``str``: the address of the account.
+        :param current_round -> ``int``: the last round of the chain.
+        :return -> ``Dict[str, Any]``: the cached holding, or ``None`` if it is missing or the account has had activity since.
+        """
+        entry = self.holdings_cache.lookup(self.algod_url, address)
+        if entry is None:
+            return None
+
+        if entry["round"] < current_round:
+            activity = await self._get_json(session, HoldingsCache.activity_url(self.indexer_url, address, entry["round"]))
+            if activity["transactions"]:
+                return None
+            self.holdings_cache.touch(self.algod_url, address, HoldingsCache.checked_round(current_round, activity, entry["round"]))
+
+        self.holdings_cache.hit()
+        return entry
+
+    async def fetch_holding(self: HoldingsView, session: aiohttp.ClientSession, name: str, address: str, current_round: Optional[int] = None) -> Dict[str, Any]:
+        """
+        retrieve the holdings of one account, recording the error instead of raising it.
+
+        :param session -> ``aiohttp.ClientSession``: the pooled session.
+        :param name -> ``str``: the name of the account.
+        :param address -> ``str``: the address of the account.
+        :param current_round -> ``int``: the last round of the chain, or ``None`` to bypass the holdings cache.
+        :return -> ``Dict[str, Any]``: the `name`, `address`, ETF `amount` (base units), `algos` (microalgos, ``None`` if `cached`), `round`, `error` and whether it was `cached`.
+        """
+        holding = {"name": name, "address": address, "amount": None, "algos": None, "round": None, "error": None, "cached": False}
+        try:
+            entry = await self.cached_holding(session, address, current_round) if current_round is not None else None
+            if entry is not None:
+                holding.update(entry, cached=True)
+                return holding
+
+            account_info = await self.fetch_account(session, address)
+            holding.update(amount=etf_holding(account_info, self.asset_id), algos=account_info.get("amount"), round=account_info.get("round"))
+            if self.holdings_cache is not None:
+                self.holdings_cache.store(self.algod_url, address, holding["amount"], holding["round"])
+        except Exception as e:
+            holding["error"] = f"{type(e).__name__}: {e}"
+        return holding
+
+    async def fetch_all(self: HoldingsView, accounts: Dict[str, str], fresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        retrieve the holdings of every account concurrently.
+
+        :param accounts -> ``Dict[str, str]``: maps every account name to its address.
+        :param fresh -> ``bool``: read every account from the chain even if its cached holding is current.
+        :return -> ``List[Dict[str, Any]]``: the holdings of every account, in the order of `accounts`.
+        """
+        import asyncio
+
+        async with self.session_pool.session() as session:
+            current_round = None
+            if self.holdings_cache is not None and not fresh:
+                # one status request decides for every account whether the chain has advanced.
+                current_round = (await self._get_json(session, f"{self.algod_url}/v2/status"))["last-round"]
+
+            holdings = await asyncio.gather(*(self.fetch_holding(session, name, address, current_round) for name, address in accounts.items()))
+
+        if self.holdings_cache is not None:
+            self.holdings_cache.persist()
+        return holdings
+
+    @staticmethod
+    def format(holdings: List[Dict[str, Any]], nav_in_usd: float, decimals: int = 0, unit: str = "") -> str:
+        """
+        render the holdings as a table with the USD value of every account at `nav_in_usd` and a totals row.
+
+        :param holdings -> ``List[Dict[str, Any]]``: the holdings, as returned by `fetch_all`.
+        :param nav_in_usd -> ``float``: the NAV of one ETF token, in USD.
+        :param decimals -> ``int``: the number of decimals of the ETF asset.
+        :param unit -> ``str``: the unit name of the ETF asset.
+        :return -> ``str``: the table.
+        """
+        rows = list()
+        total_tokens = total_usd = 0.0
+
+        for holding in holdings:
+            if holding["error"]:
+                rows.append((holding["name"], holding["address"], "-", "-", holding["error"]))
+                continue
+
+            tokens = holding["amount"] / 10 ** decimals
+            usd = tokens * nav_in_usd
+            total_tokens += tokens
+            total_usd += usd
+            rows.append((holding["name"], holding["address"], f"{tokens:,.{decimals}f}", f"{usd:,.2f}", ""))
+
+        failed = sum(1 for holding in holdings if holding["error"])
+        cached = sum(1 for holding in holdings if holding.get("cached"))
+        header = ("ACCOUNT", "ADDRESS", f"HOLDINGS ({unit})" if unit else "HOLDINGS", "USD VALUE", "")
+        footer = (f"TOTAL ({len(holdings) - failed} accounts)", "", f"{total_tokens:,.{decimals}f}", f"{total_usd:,.2f}", f"{failed} failed" if failed else "")
+
+        widths = [max(len(str(row[column])) for row in rows + [header, footer]) for column in range(4)]
+
+        def render(row):
+            return "  ".join([str(row[0]).ljust(widths[0]), str(row[1]).ljust(widths[1]), str(row[2]).rjust(widths[2]), str(row[3]).rjust(widths[3]), row[4]]).rstrip()
+
+        separator = "  ".join("-" * width for width in widths)
+        return "\n".join([render(header), separator] + [render(row) for row in rows] + [separator, render(footer), f"NAV: {nav_in_usd} USD" + (f" ({cached} accounts unchanged since they were cached)" if cached else "")])
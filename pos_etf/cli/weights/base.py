@@ -1,7 +1,19 @@
 from __future__ import annotations
-from typing import Tuple, Dict, List
+from typing import TYPE_CHECKING, Any, Tuple, Dict, Iterable, List, Optional
 import asyncio
-import aiohttp
+import sys
+import numpy as np
+
+from pos_etf.cli.error import SnapshotStoreError, StaleBasketError
+from pos_etf.cli.snapshots import BasketSnapshot
+from pos_etf.cli.utils import constants
+from pos_etf.cli.utils.cache import PriceCache, price_cache
+from pos_etf.cli.utils.fetch import CoinFetcher, coin_fetcher
+from pos_etf.cli.utils.session import SessionPool, session_pool
+from pos_etf.cli.utils.tracing import tracer
+
+if TYPE_CHECKING:
+    from pos_etf.cli.snapshots import SnapshotStore
 
 class BaseEtf(object):
     """
@@ -12,6 +24,11 @@ class BaseEtf(object):
 
     Attributes:
         coins_tuple: a tuple containing the coins that make up the ETF.
+        session_pool: the pool that provides the keep-alive HTTP session for requests.
+        price_cache: the TTL cache that coin statistics are served from.
+        coin_fetcher: the fetcher that coalesces identical in-flight requests.
+        snapshot_store: an optional store that every fresh basket of `get_basket` is appended to.
+        last_snapshot_id: the id of the most recently recorded basket (``None`` if nothing was recorded).
 
     Methods:
         [TODO]
@@ -31,43 +48,216 @@ class BaseEtf(object):
         'near-protocol'
     )
 
-    def __init__(self: BaseEtf, base_request_url: str) -> None:
+    def __init__(self: BaseEtf, base_request_url: str, session_pool: SessionPool = session_pool, price_cache: PriceCache = price_cache, coin_fetcher: CoinFetcher = coin_fetcher, snapshot_store: Optional[SnapshotStore] = None) -> None:
         """
         initialize the BaseEtf object.
 
         :param base_request_url -> ``str``: the base request URL to be used for HTTP requests.
+        :param session_pool -> ``SessionPool``: the pool providing the shared HTTP session.
+        :param price_cache -> ``PriceCache``: the cache coin statistics are served from.
+        :param coin_fetcher -> ``CoinFetcher``: the fetcher that coalesces identical in-flight requests.
+        :param snapshot_store -> ``SnapshotStore``: an optional store to record every basket fetch in.
         :return -> ``None``:
         """
         self.base_request_url = base_request_url
+        self.session_pool = session_pool
+        self.price_cache = price_cache
+        self.coin_fetcher = coin_fetcher
+        self.snapshot_store = snapshot_store
+        self.last_snapshot_id = None
 
-    async def get_coin(self: BaseEtf, coin: str) -> Tuple[str, Dict[str, int or float or str]]:
+    @property
+    def distinct_coins(self: BaseEtf) -> Tuple[str]:
+        """
+        the coins in `self.coins_tuple` with duplicates removed, in their original order.
         """
-        retrieve data from coinmarketcap.com for the coins in `self.coins_tuple`.
+        return tuple(dict.fromkeys(self.coins_tuple))
+
+    async def _fetch_statistics(self: BaseEtf, coin: str, stats_to_extract: Optional[Tuple[str]] = None) -> Dict[str, int or float]:
+        """
+        retrieve the statistics for `coin` from coinmarketcap.com, bypassing the cache.
 
         :param coin -> ``str``: a valid slug for a Proof-of-Stake coin.
-        :return ``Dict[str, int or float or str]`` -> the JSON object containing coin data.
+        :param stats_to_extract -> ``Tuple[str]``: the statistics to keep, or ``None`` to keep all of them.
+        :return -> ``Dict[str, int or float]``: the statistics for `coin`.
+        """
+        statistics = await self.coin_fetcher.fetch_statistics(f"{self.base_request_url}{coin}")
+        if stats_to_extract:
+            statistics = self._build_json_dump(*stats_to_extract, data=statistics)
+
+        return statistics
+
+    async def _statistics(self: BaseEtf, coin: str, stats_to_extract: Optional[Tuple[str]] = None) -> Dict[str, int or float]:
+        """
+        retrieve the statistics for `coin`, serving them from `self.price_cache` when a recent enough copy is available.
+
+        :param coin -> ``str``: a valid slug for a Proof-of-Stake coin.
+        :param stats_to_extract -> ``Tuple[str]``: the statistics needed, or ``None`` for all of them.
+        :return -> ``Dict[str, int or float]``: the statistics for `coin`.
+        """
+        return await self.price_cache.get_or_fetch(
+            PriceCache.key(coin, stats_to_extract),
+            lambda: self._fetch_statistics(coin, stats_to_extract)
+        )
+
+    async def get_coin(self: BaseEtf, coin: str, stats_to_extract: Optional[Tuple[str]] = None) -> Tuple[str, Dict[str, int or float or str]]:
+        """
+        retrieve data from coinmarketcap.com for the coins in `self.coins_tuple`, serving
+        it from `self.price_cache` when a recent enough copy is available.
+
+        :param coin -> ``str``: a valid slug for a Proof-of-Stake coin.
+        :param stats_to_extract -> ``Tuple[str]``: the statistics needed, or ``None`` for all of them.
+        :return ``Dict[str, int or float or str]`` -> the JSON object containing coin data (trimmed to its statistics).
+        """
+        statistics = await self._statistics(coin, stats_to_extract)
+
+        return (coin, {"data": {"statistics": statistics}})
+
+    async def _statistics_by_deadline(self: BaseEtf, coins: Tuple[str], stats_to_extract: Tuple[str], deadline: float, max_fill_age: float) -> Tuple[List[Dict[str, int or float]], Dict[str, float]]:
+        """
+        retrieve the statistics of `coins`, waiting at most `deadline` seconds for them. A coin
+        that is late or failed is filled in from its last known good statistics in
+        `self.price_cache`; a coin that has none younger than `max_fill_age` is waited for.
+
+        :param coins -> ``Tuple[str]``: the coin slugs.
+        :param stats_to_extract -> ``Tuple[str]``: the statistics needed.
+        :param deadline -> ``float``: the number of seconds to wait for the basket.
+        :param max_fill_age -> ``float``: the age in seconds past which statistics are too old to fill a coin in with.
+        :return -> ``Tuple[List[Dict[str, int or float]], Dict[str, float]]``: the statistics of every coin, in the order of `coins`, and the age in seconds of every filled-in coin.
+        """
+        tasks = [asyncio.ensure_future(self._statistics(coin, stats_to_extract)) for coin in coins]
+        await asyncio.wait(tasks, timeout=deadline)
+
+        statistics, filled_ages = list(), dict()
+        for coin, task in zip(coins, tasks):
+            if task.done() and task.exception() is None:
+                statistics.append(task.result())
+                continue
+
+            filled, age = self.price_cache.last_known_good(coin, stats_to_extract, max_fill_age)
+            if filled is None:
+                statistics.append(await task)
+                continue
+
+            # a late request is left running: on a long-lived loop (the price feed) its answer still
+            # reaches the price cache, while a one-shot `asyncio.run` cancels it on exit.
+            task.add_done_callback(lambda late: late.cancelled() or late.exception())
+            statistics.append(filled)
+            filled_ages[coin] = age
+
+        return statistics, filled_ages
+
+    def freshness(self: BaseEtf, snapshot: BasketSnapshot, ages: Dict[str, float], filled: Iterable[str], deadline: Optional[float], fresh_age: float = constants.price_cache_ttl) -> Dict[str, Any]:
         """
-        async with aiohttp.ClientSession() as session:
-            response = await session.request("GET", f"{self.base_request_url}{coin}")
-            response.raise_for_status()
-            json_data = await response.json()
+        report how old the statistics of every coin of `snapshot` are and the share of the
+        basket's weight held by stale coins: those filled in past the deadline, and those whose
+        statistics are older than `fresh_age` (served from the price cache because refreshing
+        them failed). Coins are weighted by the strategy's `weights` (equally if it defines none).
 
-            return (coin, json_data)
+        :param snapshot -> ``BasketSnapshot``: the snapshot.
+        :param ages -> ``Dict[str, float]``: the age in seconds of the statistics of every coin.
+        :param filled -> ``Iterable[str]``: the coins filled in from last known good statistics.
+        :param deadline -> ``float``: the deadline the basket was fetched with, or ``None``.
+        :param fresh_age -> ``float``: the age in seconds past which statistics are stale.
+        :return -> ``Dict[str, Any]``: the `deadline`, the `ages` of every coin, the number of `fresh` coins, the age of every `stale` coin, the `filled` coins and the `stale_weight`.
+        """
+        filled = set(filled)
+        stale = {coin: age for coin, age in ages.items() if coin in filled or age > fresh_age}
 
-    async def get_coins(self: BaseEtf):
+        stale_weight = 0.0
+        if stale:
+            weights = self.weights(snapshot.columns) if hasattr(self, "weights") else np.full(len(snapshot.coins), 1 / len(snapshot.coins))
+            stale_weight = float(np.nansum(weights[np.isin(snapshot.coins, list(stale))]) / np.nansum(weights))
+
+        return {
+            "deadline": deadline,
+            "ages": {coin: round(age, 1) for coin, age in ages.items()},
+            "fresh": len(snapshot.coins) - len(stale),
+            "stale": {coin: round(age, 1) for coin, age in stale.items()},
+            "filled": sorted(filled),
+            "stale_weight": round(stale_weight, 4)
+        }
+
+    @tracer.traced("BaseEtf.get_basket")
+    async def get_basket(self: BaseEtf, stats_to_extract: Tuple[str], deadline: Optional[float] = constants.basket_deadline, max_stale_weight: float = constants.max_stale_weight, max_fill_age: float = constants.max_fill_age) -> BasketSnapshot:
         """
-        for each coin in coins, setup the get_coin_market_cap() coroutine and gather them.
+        retrieve `stats_to_extract` for every distinct coin in `self.coins_tuple` as one compact
+        `BasketSnapshot`, recording it in `self.snapshot_store` if there is one. The statistics
+        objects of the responses are not kept once the snapshot is built.
+
+        With a `deadline`, coins that have not arrived in time are filled in from their last
+        known good statistics (at most `max_fill_age` seconds old) instead of holding up the
+        whole basket. The snapshot's `freshness` reports the age of every coin's statistics, and
+        the snapshot is refused with `StaleBasketError` if stale coins hold more than
+        `max_stale_weight` of the basket's weight. A snapshot with stale coins is not recorded,
+        so replays of the snapshot store only ever see statistics that were current.
+
+        :param stats_to_extract -> ``Tuple[str]``: the statistics needed.
+        :param deadline -> ``float``: the number of seconds to wait for the basket, or 0/``None`` to wait for every coin.
+        :param max_stale_weight -> ``float``: the largest share of the basket's weight that may be stale.
+        :param max_fill_age -> ``float``: the age in seconds past which statistics are too old to fill a late coin in with.
+        :return -> ``BasketSnapshot``: the snapshot, carrying its snapshot store id when it was recorded.
+        """
+        coins = self.distinct_coins
+
+        async with self.session_pool.session():
+            if deadline:
+                statistics, filled_ages = await self._statistics_by_deadline(coins, stats_to_extract, deadline, max_fill_age)
+            else:
+                statistics, filled_ages = await asyncio.gather(*(self._statistics(coin, stats_to_extract) for coin in coins)), dict()
+        self.price_cache.persist()
+
+        ages = {
+            coin: filled_ages[coin] if coin in filled_ages else self.price_cache.age(PriceCache.key(coin, stats_to_extract)) or 0.0
+            for coin in coins
+        }
+
+        snapshot = BasketSnapshot.parse(coins, statistics, stats_to_extract)
+        snapshot.freshness = self.freshness(snapshot, ages, filled_ages, deadline or None)
+
+        if snapshot.freshness["stale_weight"] > max_stale_weight:
+            stale = ", ".join(f"{coin} ({age}s old)" for coin, age in snapshot.freshness["stale"].items())
+            raise StaleBasketError(f"Refusing to quote: the statistics of {stale} are stale and hold {snapshot.freshness['stale_weight']:.1%} of the basket, more than {max_stale_weight:.1%}.")
+
+        if self.snapshot_store is not None and not snapshot.freshness["stale"]:
+            snapshot.snapshot_id = self.record(snapshot)
+        self.last_snapshot_id = snapshot.snapshot_id
+
+        return snapshot
+
+    def record(self: BaseEtf, snapshot: BasketSnapshot) -> Optional[int]:
+        """
+        append `snapshot` to `self.snapshot_store`. Recording is best-effort: if the store
+        fails, the error is reported and recording is turned off for this strategy, rather
+        than failing the quote the snapshot was fetched for.
+
+        :param snapshot -> ``BasketSnapshot``: the snapshot to record.
+        :return -> ``int``: the snapshot id, or ``None`` if it could not be recorded.
+        """
+        try:
+            return self.snapshot_store.append_snapshot(snapshot)
+        except (SnapshotStoreError, OSError) as e:
+            print(f"Not recording snapshots: {e}", file=sys.stderr)
+            self.snapshot_store = None
+            return None
+
+    @tracer.traced("BaseEtf.get_coins")
+    async def get_coins(self: BaseEtf, stats_to_extract: Optional[Tuple[str]] = None):
+        """
+        for each distinct coin in `self.coins_tuple`, setup the get_coin() coroutine and gather them.
         Return the gathered coroutines
 
-        :param coins -> Tuple[str]: a tuple containing valid slugs for Proof-of-Stake coins.
+        :param stats_to_extract -> ``Tuple[str]``: the statistics needed, or ``None`` for all of them.
         :return ``Dict[str, int or float]``
         """
-        list_of_coin_data = await asyncio.gather(*(
-            self.get_coin(coin) for coin in self.coins_tuple
-        ))
+        async with self.session_pool.session():
+            list_of_coin_data = await asyncio.gather(*(
+                self.get_coin(coin, stats_to_extract) for coin in self.distinct_coins
+            ))
+        self.price_cache.persist()
 
         assert len(list_of_coin_data) == len(
-            self.coins_tuple), "length of market caps list != length of coins list"
+            self.distinct_coins), "length of market caps list != length of coins list"
 
         return list_of_coin_data
 
@@ -95,6 +285,19 @@ class BaseEtf(object):
         """"""
         self._coin_data = coin_data
 
+    def columns(self: BaseEtf, stats_to_extract: Tuple[str]) -> Dict[str, np.ndarray]:
+        """
+        convert ``self.coin_data`` into one array per statistic, ordered like the coins in
+        ``self.coin_data``, for the vectorized strategy functions in `engine.py`.
+
+        :param stats_to_extract -> ``Tuple[str]``: the statistics to convert.
+        :return -> ``Dict[str, np.ndarray]``: an array of shape (coins,) for each statistic.
+        """
+        return {
+            stat: np.fromiter((stats[stat] for stats in self.coin_data.values()), dtype=np.float64, count=len(self.coin_data))
+            for stat in stats_to_extract
+        }
+
     def structure(self: BaseEtf, coin_tuples: List[Tuple[str, str, str]], stats_to_extract: Tuple[str]) -> Dict[str, Dict[str, int or float]]:
         """
         structure the coin statistics as a dictionary with each coin as the keys and
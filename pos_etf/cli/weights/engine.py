@@ -0,0 +1,119 @@
+from typing import Optional
+import numpy as np
+
+def net_asset_value(market_caps: np.ndarray, circulating_supplies: np.ndarray) -> np.ndarray:
+    """
+    divide the total market cap of the basket by the total number of coins in circulation.
+
+    :param market_caps -> ``np.ndarray``: market cap of each coin, shape (..., coins).
+    :param circulating_supplies -> ``np.ndarray``: circulating supply of each coin, shape (..., coins).
+    :return -> ``np.ndarray``: the NAV of the ETF, shape (...).
+    """
+    market_caps = np.asarray(market_caps, dtype=np.float64)
+    circulating_supplies = np.asarray(circulating_supplies, dtype=np.float64)
+
+    return market_caps.sum(axis=-1) / circulating_supplies.sum(axis=-1)
+
+
+def equal_proportions(prices: np.ndarray, percentage: Optional[float] = None) -> np.ndarray:
+    """
+    give every coin the same weight and sum the weighted prices.
+
+    :param prices -> ``np.ndarray``: price of each coin, shape (..., coins).
+    :param percentage -> ``float``: the weight of each coin, defaults to 1/coins.
+    :return -> ``np.ndarray``: the price of the ETF, shape (...).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+
+    if percentage is None:
+        percentage = 1 / prices.shape[-1]
+
+    return percentage * prices.sum(axis=-1)
+
+
+def price_weighted(prices: np.ndarray) -> np.ndarray:
+    """
+    weight every coin by its share of the summed prices, i.e. sum(p_i * p_i / sum(p)).
+
+    :param prices -> ``np.ndarray``: price of each coin, shape (..., coins).
+    :return -> ``np.ndarray``: the price of the ETF, shape (...).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+
+    return np.square(prices).sum(axis=-1) / prices.sum(axis=-1)
+
+
+def _normalize(scores: np.ndarray) -> np.ndarray:
+    """scale `scores` so they sum to one along the last axis (all zeros where they sum to zero)."""
+    totals = scores.sum(axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(totals != 0, scores / totals, 0.0)
+
+
+def equal_weights(prices: np.ndarray) -> np.ndarray:
+    """
+    the target weight of every coin of an equal-proportion basket: 1/coins each.
+
+    :param prices -> ``np.ndarray``: price of each coin, shape (..., coins).
+    :return -> ``np.ndarray``: the weight of each coin, shape (..., coins).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+
+    return np.full(prices.shape, 1 / prices.shape[-1])
+
+
+def price_weights(prices: np.ndarray) -> np.ndarray:
+    """
+    the target weight of every coin of a price-weighted basket: its price / the sum of all prices.
+
+    :param prices -> ``np.ndarray``: price of each coin, shape (..., coins).
+    :return -> ``np.ndarray``: the weight of each coin, shape (..., coins).
+    """
+    return _normalize(np.asarray(prices, dtype=np.float64))
+
+
+def market_cap_weights(market_caps: np.ndarray) -> np.ndarray:
+    """
+    the target weight of every coin of a basket tracking the NAV: its market cap / the total
+    market cap, i.e. holding every coin in proportion to its circulating supply.
+
+    :param market_caps -> ``np.ndarray``: market cap of each coin, shape (..., coins).
+    :return -> ``np.ndarray``: the weight of each coin, shape (..., coins).
+    """
+    return _normalize(np.asarray(market_caps, dtype=np.float64))
+
+
+def rebalance(holdings: np.ndarray, prices: np.ndarray, weights: np.ndarray, tolerance: float = 0.0, min_trade_value: float = 0.0, funding_index: Optional[int] = None) -> np.ndarray:
+    """
+    compute the trades that bring every portfolio back to its target weights. Only coins whose
+    weight drifted more than `tolerance` from the target and whose trade is worth at least
+    `min_trade_value` are traded, back to their target. If `funding_index` is given, that coin
+    is the one every other coin is bought with and sold into, so it absorbs the net of the
+    other trades and the plan is self-financing.
+
+    :param holdings -> ``np.ndarray``: units of each coin held, shape (..., coins).
+    :param prices -> ``np.ndarray``: price of each coin, broadcastable to `holdings`.
+    :param weights -> ``np.ndarray``: target weight of each coin, broadcastable to `holdings`.
+    :param tolerance -> ``float``: the absolute weight drift tolerated before a coin is traded.
+    :param min_trade_value -> ``float``: the smallest trade worth placing, in the currency of `prices`.
+    :param funding_index -> ``int``: the position of the funding coin, or ``None`` for no funding leg.
+    :return -> ``np.ndarray``: units of each coin to buy (positive) or sell (negative), shape (..., coins).
+    """
+    holdings = np.asarray(holdings, dtype=np.float64)
+    prices = np.broadcast_to(np.asarray(prices, dtype=np.float64), holdings.shape)
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), holdings.shape)
+
+    values = holdings * prices
+    current_weights = _normalize(values)
+    trade_values = weights * values.sum(axis=-1, keepdims=True) - values
+
+    traded = (np.abs(current_weights - weights) > tolerance) & (np.abs(trade_values) >= min_trade_value) & (prices > 0)
+    if funding_index is not None:
+        traded[..., funding_index] = False
+    trade_values = np.where(traded, trade_values, 0.0)
+
+    if funding_index is not None:
+        trade_values[..., funding_index] = -trade_values.sum(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(prices > 0, trade_values / prices, 0.0)
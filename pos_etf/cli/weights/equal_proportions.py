@@ -1,11 +1,16 @@
 from __future__ import annotations
-from base import BaseEtf
+from typing import Dict, List, Optional, Tuple
+from pos_etf.cli.weights.base import BaseEtf
+from pos_etf.cli.weights import engine
 import asyncio
+import numpy as np
 
 class EqualProportions(BaseEtf):
 
-    def __init__(self: EqualProportions, base_url: str):
-        super().__init__(base_url)
+    stats_to_extract = ('price',)
+
+    def __init__(self: EqualProportions, base_url: str, **kwargs):
+        super().__init__(base_url, **kwargs)
     
     @classmethod
     def _get_percentage(cls: EqualProportions, n: int) -> float: 
@@ -24,28 +29,47 @@ class EqualProportions(BaseEtf):
 
         :return -> ``float``: the price of the ETF coin.
         """
-        percentages = self._get_percentage(len(self.coins_tuple))
-        
-        coin_price = 0
-        for coin, data in self.coin_data.items():
-            coin_price += percentages * (data['price'])
-        
-        return round(coin_price, 2)
+        return round(float(self.evaluate(self.columns(self.stats_to_extract))), 2)
+
+    @classmethod
+    def evaluate(cls: EqualProportions, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        calculate the equal-proportion price for every snapshot in `columns` at once. Every
+        distinct coin of the basket gets the same share, the one `weights` targets (`cosmos`
+        appears twice in `coins_tuple` but is only priced once).
+
+        :param columns -> ``Dict[str, np.ndarray]``: an array of shape (..., coins) for `price`.
+        :return -> ``np.ndarray``: the unrounded ETF price for each snapshot, shape (...).
+        """
+        return engine.equal_proportions(columns["price"], cls._get_percentage(np.shape(columns["price"])[-1]))
+
+    @classmethod
+    def weights(cls: EqualProportions, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        the target weight of every coin, an equal share, for every snapshot in `columns` at once.
+
+        :param columns -> ``Dict[str, np.ndarray]``: an array of shape (..., coins) for `price`.
+        :return -> ``np.ndarray``: the weight of each coin, shape (..., coins).
+        """
+        return engine.equal_weights(columns["price"])
     
-    def calculate(self: EqualProportions) -> int or float:
+    def calculate(self: EqualProportions, list_of_coin_data: Optional[List[Tuple[str, Dict]]] = None) -> int or float:
         """
         the formula used to calculate the equal-proportion weights are:
 
             1. determine which % of the ETF each coin makes up (1/N where N is the number of coins in the ETF).
             2. use that % to calculate the $ value that each coin puts towards the total value of the coin.
             3. sum up the individual $ values to get the total price of the coin.
+
+        :param list_of_coin_data -> ``List[Tuple[str, Dict]]``: coin data already retrieved via `get_coins`; fetched when omitted.
         """
 
-        list_of_coin_data = asyncio.run(self.get_coins())
-        self.coin_data = self.structure(list_of_coin_data, stats_to_extract=('price',))
+        if list_of_coin_data is None:
+            list_of_coin_data = asyncio.run(self.get_coins(self.stats_to_extract))
+        self.coin_data = self.structure(list_of_coin_data, stats_to_extract=self.stats_to_extract)
         etf_price = self._calc_etf_price()
 
         return etf_price
 
-EqualProp = EqualProportions(base_url="https://api.coinmarketcap.com/data-api/v3/cryptocurrency/detail?slug=")
-print(EqualProp.calculate())
\ No newline at end of file
+# EqualProp = EqualProportions(base_url="https://api.coinmarketcap.com/data-api/v3/cryptocurrency/detail?slug=")
+# print(EqualProp.calculate())
@@ -0,0 +1,97 @@
+from __future__ import annotations
+from typing import Dict, Optional
+import math
+
+class IncrementalNav(object):
+    """
+    Maintains the net asset value of the basket under single-coin updates. Running totals
+    of market cap and circulating supply are adjusted by the delta of each update, so a new
+    NAV costs O(1) regardless of the basket size. Every `recompute_every` updates the totals
+    are rebuilt from the per-coin values with `math.fsum` to bound floating-point drift.
+
+    Attributes:
+        recompute_every: number of updates between two full recomputations.
+        updates: number of updates applied since the last full recomputation.
+    """
+
+    def __init__(self: IncrementalNav, coin_data: Optional[Dict[str, Dict[str, int or float]]] = None, recompute_every: int = 10000) -> None:
+        """
+        initialize the IncrementalNav object.
+
+        :param coin_data -> ``Dict[str, Dict[str, int or float]]``: structured `marketCap` and `circulatingSupply` per coin, as returned by `BaseEtf.structure`.
+        :param recompute_every -> ``int``: number of updates between two full recomputations.
+        :return -> ``None``:
+        """
+        self.recompute_every = recompute_every
+        self._market_caps: Dict[str, float] = dict()
+        self._circulating_supplies: Dict[str, float] = dict()
+
+        for coin, stats in (coin_data or dict()).items():
+            self._market_caps[coin] = float(stats["marketCap"])
+            self._circulating_supplies[coin] = float(stats["circulatingSupply"])
+
+        self.recompute()
+
+    def recompute(self: IncrementalNav) -> None:
+        """rebuild the running totals from the per-coin values."""
+        self._total_market_cap = math.fsum(self._market_caps.values())
+        self._total_circulating_supply = math.fsum(self._circulating_supplies.values())
+        self.updates = 0
+
+    def update(self: IncrementalNav, coin: str, market_cap: Optional[float] = None, circulating_supply: Optional[float] = None) -> float:
+        """
+        apply a new market cap and/or circulating supply for a single coin (adding it to the basket if it is new).
+
+        :param coin -> ``str``: the coin slug.
+        :param market_cap -> ``float``: the coin's new market cap, or ``None`` if unchanged.
+        :param circulating_supply -> ``float``: the coin's new circulating supply, or ``None`` if unchanged.
+        :return -> ``float``: the NAV after the update.
+        """
+        if market_cap is not None:
+            market_cap = float(market_cap)
+            self._total_market_cap += market_cap - self._market_caps.get(coin, 0.0)
+            self._market_caps[coin] = market_cap
+
+        if circulating_supply is not None:
+            circulating_supply = float(circulating_supply)
+            self._total_circulating_supply += circulating_supply - self._circulating_supplies.get(coin, 0.0)
+            self._circulating_supplies[coin] = circulating_supply
+
+        self.updates += 1
+        if self.updates >= self.recompute_every:
+            self.recompute()
+
+        return self.value
+
+    def remove(self: IncrementalNav, coin: str) -> float:
+        """
+        drop a coin from the basket.
+
+        :param coin -> ``str``: the coin slug.
+        :return -> ``float``: the NAV after the removal.
+        """
+        self._total_market_cap -= self._market_caps.pop(coin, 0.0)
+        self._total_circulating_supply -= self._circulating_supplies.pop(coin, 0.0)
+        self.recompute()
+
+        return self.value
+
+    def __len__(self: IncrementalNav) -> int:
+        return len(self._market_caps.keys() | self._circulating_supplies.keys())
+
+    @property
+    def value(self: IncrementalNav) -> float:
+        """
+        the unrounded NAV: total market cap / total circulating supply.
+        """
+        if not self._total_circulating_supply:
+            return math.nan
+
+        return self._total_market_cap / self._total_circulating_supply
+
+    @property
+    def nav(self: IncrementalNav) -> float:
+        """
+        the NAV rounded like `NetAssetValue.calculate`.
+        """
+        return round(self.value, 2)
@@ -1,13 +1,38 @@
 from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
 from pos_etf.cli.weights.base import BaseEtf
+from pos_etf.cli.weights import engine
 import asyncio
+import numpy as np
 
 class NetAssetValue(BaseEtf):
 
-    def __init__(self: NetAssetValue, base_url: str):
-        super().__init__(base_url)
+    stats_to_extract = ('marketCap', 'circulatingSupply')
 
-    def calculate(self: NetAssetValue) -> int or float:
+    def __init__(self: NetAssetValue, base_url: str, **kwargs):
+        super().__init__(base_url, **kwargs)
+
+    @classmethod
+    def evaluate(cls: NetAssetValue, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        calculate the NAV for every snapshot in `columns` at once.
+
+        :param columns -> ``Dict[str, np.ndarray]``: arrays of shape (..., coins) for `marketCap` and `circulatingSupply`.
+        :return -> ``np.ndarray``: the unrounded NAV for each snapshot, shape (...).
+        """
+        return engine.net_asset_value(columns["marketCap"], columns["circulatingSupply"])
+
+    @classmethod
+    def weights(cls: NetAssetValue, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        the target weight of every coin, its share of the total market cap, for every snapshot in `columns` at once.
+
+        :param columns -> ``Dict[str, np.ndarray]``: an array of shape (..., coins) for `marketCap`.
+        :return -> ``np.ndarray``: the weight of each coin, shape (..., coins).
+        """
+        return engine.market_cap_weights(columns["marketCap"])
+
+    def calculate(self: NetAssetValue, list_of_coin_data: Optional[List[Tuple[str, Dict]]] = None) -> int or float:
         """
         the formula used to calculate net asset value (NAV) is:
 
@@ -17,16 +42,11 @@ class NetAssetValue(BaseEtf):
         Furthermore, in this context, the total number of shares is the total number of coins in
         circulation for the given cryptocurrency.
 
+        :param list_of_coin_data -> ``List[Tuple[str, Dict]]``: coin data already retrieved via `get_coins`; fetched when omitted.
         :return -> ``int`` or ``float``: total_market_cap / total_coins_outstanding, which is the NAV for the fund.
         """
-        list_of_coin_data = asyncio.run(self.get_coins())
-        self.coin_data = self.structure(list_of_coin_data, stats_to_extract=('marketCap', 'circulatingSupply'))
-
-        total_market_cap = 0
-        total_circulating_supply = 0
-
-        for _, stats in self.coin_data.items():
-            total_market_cap += stats["marketCap"]
-            total_circulating_supply += stats["circulatingSupply"]
+        if list_of_coin_data is None:
+            list_of_coin_data = asyncio.run(self.get_coins(self.stats_to_extract))
+        self.coin_data = self.structure(list_of_coin_data, stats_to_extract=self.stats_to_extract)
 
-        return round((total_market_cap) / (total_circulating_supply), 2)
+        return round(float(self.evaluate(self.columns(self.stats_to_extract))), 2)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from pos_etf.cli.weights.base import BaseEtf
+from pos_etf.cli.weights import engine
+import asyncio
+import numpy as np
+
+class PriceWeighted(BaseEtf):
+
+    stats_to_extract = ('price',)
+
+    def __init__(self: PriceWeighted, base_url: str, **kwargs):
+        super().__init__(base_url, **kwargs)
+
+    @classmethod
+    def evaluate(cls: PriceWeighted, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        calculate the price-weighted price for every snapshot in `columns` at once.
+
+        :param columns -> ``Dict[str, np.ndarray]``: an array of shape (..., coins) for `price`.
+        :return -> ``np.ndarray``: the unrounded ETF price for each snapshot, shape (...).
+        """
+        return engine.price_weighted(columns["price"])
+
+    @classmethod
+    def weights(cls: PriceWeighted, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        the target weight of every coin, its share of the summed prices, for every snapshot in `columns` at once.
+
+        :param columns -> ``Dict[str, np.ndarray]``: an array of shape (..., coins) for `price`.
+        :return -> ``np.ndarray``: the weight of each coin, shape (..., coins).
+        """
+        return engine.price_weights(columns["price"])
+
+    def calculate(self: PriceWeighted, list_of_coin_data: Optional[List[Tuple[str, Dict]]] = None) -> int or float:
+        """
+        the formula used to calculate the price-weighted value is:
+
+            1. determine which % of the ETF each coin makes up (its price / the sum of all prices).
+            2. use that % to calculate the $ value that each coin puts towards the total value of the coin.
+            3. sum up the individual $ values to get the total price of the coin.
+
+        :param list_of_coin_data -> ``List[Tuple[str, Dict]]``: coin data already retrieved via `get_coins`; fetched when omitted.
+        :return -> ``int`` or ``float``: the price of the ETF coin.
+        """
+        if list_of_coin_data is None:
+            list_of_coin_data = asyncio.run(self.get_coins(self.stats_to_extract))
+        self.coin_data = self.structure(list_of_coin_data, stats_to_extract=self.stats_to_extract)
+
+        return round(float(self.evaluate(self.columns(self.stats_to_extract))), 2)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Type
+import threading
+
+from pos_etf.cli.snapshots import BasketSnapshot
+from pos_etf.cli.weights.base import BaseEtf
+from pos_etf.cli.weights.equal_proportions import EqualProportions
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+from pos_etf.cli.weights.price_weighted import PriceWeighted
+
+class StrategyRegistry(object):
+    """
+    The ETF-weighting strategies published side by side, by name. Every strategy declares the
+    statistics it needs in `stats_to_extract`, so the basket is fetched once for the union of
+    them (`fetch`) and any number of strategies are evaluated against that one snapshot
+    (`evaluate`). Results are memoized per snapshot (by `BasketSnapshot.key`, a digest of its
+    data) for the `max_snapshots` most recently evaluated snapshots, so asking again for the
+    same snapshot costs a hash and a dict lookup.
+
+    The registry is a read-only mapping of names to strategy classes.
+
+    Attributes:
+        max_snapshots: the number of snapshots whose results are kept.
+    """
+
+    def __init__(self: StrategyRegistry, strategies: Optional[Dict[str, Type[BaseEtf]]] = None, max_snapshots: int = 64) -> None:
+        """
+        initialize the StrategyRegistry object.
+
+        :param strategies -> ``Dict[str, Type[BaseEtf]]``: strategy classes to register, by name.
+        :param max_snapshots -> ``int``: the number of snapshots whose results are kept.
+        :return -> ``None``:
+        """
+        self.max_snapshots = max_snapshots
+        self._strategies: Dict[str, Type[BaseEtf]] = dict()
+        self._results: OrderedDict[str, Dict[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evaluations = 0
+
+        for name, strategy in (strategies or dict()).items():
+            self.register(name, strategy)
+
+    def register(self: StrategyRegistry, name: str, strategy: Type[BaseEtf]) -> Type[BaseEtf]:
+        """
+        add `strategy` under `name`. The class must define `stats_to_extract` and a vectorized `evaluate`.
+
+        :param name -> ``str``: the name the strategy is published under.
+        :param strategy -> ``Type[BaseEtf]``: the strategy class.
+        :return -> ``Type[BaseEtf]``: the strategy class.
+        """
+        if not getattr(strategy, "stats_to_extract", None) or not callable(getattr(strategy, "evaluate", None)):
+            raise ValueError(f"Strategy {name} must declare `stats_to_extract` and define `evaluate`.")
+        if name in self._strategies and self._strategies[name] is not strategy:
+            raise ValueError(f"A different strategy is already registered as {name}.")
+
+        self._strategies[name] = strategy
+        return strategy
+
+    def __getitem__(self: StrategyRegistry, name: str) -> Type[BaseEtf]:
+        return self._strategies[name]
+
+    def __iter__(self: StrategyRegistry) -> Iterator[str]:
+        return iter(self._strategies)
+
+    def __len__(self: StrategyRegistry) -> int:
+        return len(self._strategies)
+
+    def __contains__(self: StrategyRegistry, name: str) -> bool:
+        return name in self._strategies
+
+    def _names(self: StrategyRegistry, names: Optional[Iterable[str]]) -> List[str]:
+        """the requested strategy names, or every registered one."""
+        names = list(self._strategies) if names is None else list(names)
+        for name in names:
+            if name not in self._strategies:
+                raise KeyError(f"No strategy is registered as {name}.")
+        return names
+
+    def stats_to_extract(self: StrategyRegistry, names: Optional[Iterable[str]] = None, extra: Tuple[str] = ()) -> Tuple[str]:
+        """
+        the union of the statistics declared by the strategies, in declaration order.
+
+        :param names -> ``Iterable[str]``: the strategies to cover, or ``None`` for every registered one.
+        :param extra -> ``Tuple[str]``: statistics needed besides the strategies' (e.g. `price` for the Algo price).
+        :return -> ``Tuple[str]``: the statistics to fetch.
+        """
+        return tuple(dict.fromkeys(
+            [stat for name in self._names(names) for stat in self._strategies[name].stats_to_extract] + list(extra)
+        ))
+
+    async def fetch(self: StrategyRegistry, fetcher: BaseEtf, names: Optional[Iterable[str]] = None, extra: Tuple[str] = ()) -> BasketSnapshot:
+        """
+        fetch the basket once for the union of the statistics of the strategies.
+
+        :param fetcher -> ``BaseEtf``: the strategy instance whose fetch machinery (session, cache, snapshot store) is used.
+        :param names -> ``Iterable[str]``: the strategies to cover, or ``None`` for every registered one.
+        :param extra -> ``Tuple[str]``: statistics needed besides the strategies'.
+        :return -> ``BasketSnapshot``: the snapshot, carrying the snapshot store id of the fetch when it was recorded.
+        """
+        return await fetcher.get_basket(self.stats_to_extract(names, extra))
+
+    def evaluate(self: StrategyRegistry, snapshot: BasketSnapshot, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        evaluate the strategies against one snapshot, reusing the results memoized for it.
+
+        :param snapshot -> ``BasketSnapshot``: the snapshot, as returned by `fetch`.
+        :param names -> ``Iterable[str]``: the strategies to evaluate, or ``None`` for every registered one.
+        :return -> ``Dict[str, float]``: the unrounded ETF price of each strategy.
+        """
+        names = self._names(names)
+        key = snapshot.key
+
+        with self._lock:
+            results = self._results.get(key)
+            if results is None:
+                results = self._results[key] = dict()
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_snapshots:
+                self._results.popitem(last=False)
+
+            for name in names:
+                if name in results:
+                    continue
+
+                strategy = self._strategies[name]
+                missing = [stat for stat in strategy.stats_to_extract if stat not in snapshot.columns]
+                if missing:
+                    raise ValueError(f"Strategy {name} needs {', '.join(missing)}, which the snapshot does not contain.")
+
+                results[name] = float(strategy.evaluate(snapshot.columns))
+                self.evaluations += 1
+
+            return {name: results[name] for name in names}
+
+    def stats(self: StrategyRegistry) -> Dict[str, int]:
+        """
+        return the memoization counters.
+
+        :return -> ``Dict[str, int]``: the number of snapshots memoized and of strategy evaluations run.
+        """
+        return {"snapshots": len(self._results), "evaluations": self.evaluations}
+
+
+strategy_registry = StrategyRegistry({
+    "net_asset_value": NetAssetValue,
+    "equal_proportions": EqualProportions,
+    "price_weighted": PriceWeighted
+})
@@ -4,6 +4,8 @@ from algosdk import mnemonic, algod
 from typing import Dict
 from algosdk import account, mnemonic
 import json
+from pos_etf.cli.utils.params import params_cache
+
 def generate_new_account():
     """
     Generate a new Algorand account and print the public address
@@ -24,7 +26,7 @@ def add_network_params(client: algod.AlgodClient, tx_data: Dict[str, str or int]
     :param client -> ``algod.AlgodClient``: an algorand client object.
     :param tx_data -> ``Dict[str, str or int]``: data for the transaction.
     """
-    params = client.suggested_params()
+    params = params_cache.get(client) # shared with the CLI, so bulk runs make one request per round
     tx_data["first"] = params.get("lastRound")
     tx_data["last"] = params.get("lastRound") + 1000
     tx_data["gh"] = params.get("genesishashb64")
@@ -70,7 +72,8 @@ def wait_for_confirmation(client: algod.AlgodClient, transaction_id: str) -> Dic
         else:
             print("Waiting for confirmation...")
             last_round += 1
-            client.status_after_block(last_round)
+            status = client.status_after_block(last_round)
+            params_cache.observe_round(client, status.get("lastRound"))
 
 def sign_and_send(transaction: str, passphrase: str, client: algod.AlgodClient) -> Dict[str, str or int]:
     """
@@ -1,17 +1,16 @@
 import argparse
-from PyInquirer import prompt
 import os
 from pathlib import Path
 from typing import List, Optional, Dict, Any
-import json
-import asyncio
-from algosdk.v2client import algod
 
-from pos_etf.cli.auth import Auth
-from pos_etf.cli.utils import extract_matching_pub_key, extract_matching_passphrase, clean_acct_names, send_request_to
-from pos_etf.cli.utils.constants import algoetf_addr, creator_passphrase, asset_id
+# PyInquirer, algosdk, aiohttp and the transaction machinery are imported by the subcommands
+# that need them, so `--help` and `--view` start without loading them.
+from pos_etf.cli.utils import clean_acct_names
+from pos_etf.cli.utils import constants
+from pos_etf.cli.utils.credentials import credentials_store
+from pos_etf.cli.utils.constants import algoetf_addr, asset_id, algod_url, indexer_url, coinmarketcap_url
+from pos_etf.cli.view import holding_of
 from pos_etf.cli.error import DuplicateAcctNameError, NoSpecifiedAccountError, InvalidAuthArgError
-from pos_etf.cli.transaction import Transaction
 
 user_home_dir = str(Path.home())  # same as os.path.expanduser("~")
 pos_etf_dir = os.path.join(user_home_dir, ".pos_etf")
@@ -24,7 +23,7 @@ __algoetf_version__ = '0.0.1'
 # DONE: on sell, Algos are sent from the receiver (the algoetf addr) to the sender and the sender sends the receiver POS coin (which should be converted to underlying holdings of POS coin 1x per day).
 #DONE: calculate NAV of the ETF when someone buys or sells, use the NAV to determine how many Algos must be sent for the exchange
 
-#TODO: After determining how many Algos are sent, determine how to calculate the % of the underlying assets that must be bought with the Algos/transfer algos to USDC
+#DONE: After determining how many Algos are sent, determine how to calculate the % of the underlying assets that must be bought with the Algos (see `python -m pos_etf.cli.rebalance`, which plans the daily conversion to a strategy's weights)/transfer algos to USDC
 
 def init_parser(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
     """
@@ -38,7 +37,8 @@ def init_parser(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
         "auth",
         type=str,
         nargs="?",
-        help="""Valid option is signup'. If 'signup', sign up for an account."""
+        help="""Valid options are 'signup' and 'feed'. If 'signup', sign up for an account.
+If 'feed', run the price feed daemon that serves the latest NAV to other algoetf commands."""
     )
 
     parser.add_argument(
@@ -63,6 +63,44 @@ def init_parser(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
         help="""View Your POS_ETF holdings."""
     )
 
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="""With `--view`, show the holdings of every account in the credentials
+file, with their USD value at the current NAV."""
+    )
+
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="""With `--view`, read holdings from the chain even if the locally
+cached holdings are still current."""
+    )
+
+    parser.add_argument(
+        "--orders",
+        type=str,
+        nargs=1,
+        help="""Execute every buy and sell order of a JSON lines or CSV file (with
+`side`, `account`, `amount` and an optional `id` per order) at one NAV."""
+    )
+
+    parser.add_argument(
+        "--net",
+        action="store_true",
+        help="""With `--orders`, settle the orders in batch auctions: every customer's
+orders of a batch are netted, opposing customers are crossed with each other at one
+NAV and only the remainder is settled against the pool."""
+    )
+
+    parser.add_argument(
+        "--output",
+        type=str,
+        nargs=1,
+        help="""File the per-order results of `--orders` are written to
+(defaults to the order file with a `.results.jsonl` extension)."""
+    )
+
     parser.add_argument(
         "--account",
         type=str,
@@ -83,6 +121,8 @@ def acct_name_question(default_val: Optional[str] = None, extras: Dict[str, str]
 
 def handle_auth_flow(auth_type: str):
     """handle signup flow for user."""
+    from PyInquirer import prompt
+
     if not os.path.exists(pos_etf_dir):
         os.makedirs(pos_etf_dir)
         credentials_file_path.touch()
@@ -118,18 +158,75 @@ def handle_auth_flow(auth_type: str):
 
 def do_txn(args: Dict[str, Any], default_account_name: str):
     """Build and send transaction"""
+    from algosdk.v2client import algod
+    from pos_etf.cli.transaction import Transaction
+
     client = algod.AlgodClient(
-        "", "https://testnet.algoexplorerapi.io", headers={'User-Agent': 'DanM'})
+        "", algod_url, headers={'User-Agent': 'DanM'})
 
-    pub_key = extract_matching_pub_key(default_account_name, [line.strip(
-        "[]\n") for line in open(credentials_file_path).readlines()])
-    passphrase = extract_matching_passphrase(default_account_name, [line.strip(
-        "[]\n") for line in open(credentials_file_path).readlines()])
+    pub_key, passphrase = credentials_store(credentials_file_path).get(default_account_name)
 
     txn = Transaction(client, algoetf_addr, pub_key,
-                        creator_passphrase, int(args.buy[0]))
+                        constants.creator_passphrase, int(args.buy[0]))
     print(txn.buy())
 
+def do_bulk_orders(orders_path: str, output_path: str):
+    """Execute every order of `orders_path` at one NAV and write the results to `output_path`."""
+    import asyncio
+    from algosdk.v2client import algod
+    from pos_etf.cli.orders import BulkOrders, read_orders
+    from pos_etf.cli.transaction import Transaction
+
+    client = algod.AlgodClient(
+        "", algod_url, headers={'User-Agent': 'DanM'})
+
+    credentials = credentials_store(credentials_file_path).accounts()
+
+    quote = Transaction.quote()
+    print(f"Pricing every order at NAV {quote['nav']} USD (1 Algo = {quote['algorand_price']} USD).")
+
+    bulk_orders = BulkOrders(client, credentials, constants.creator_passphrase)
+    with open(output_path, "w") as output:
+        counts = asyncio.run(bulk_orders.run(read_orders(orders_path), quote, output))
+
+    print(f"{counts['executed']} orders executed, {counts['failed']} failed. Results written to {output_path}.")
+
+def do_netted_orders(orders_path: str, output_path: str):
+    """Net and cross the orders of `orders_path` in batch auctions and write the results to `output_path`."""
+    import asyncio
+    from algosdk.v2client import algod
+    from pos_etf.cli.orders import read_orders
+    from pos_etf.cli.orders.netting import NettedOrders
+    from pos_etf.cli.transaction import Transaction
+
+    client = algod.AlgodClient(
+        "", algod_url, headers={'User-Agent': 'DanM'})
+
+    credentials = credentials_store(credentials_file_path).accounts()
+
+    netted_orders = NettedOrders(client, credentials, constants.creator_passphrase)
+    with open(output_path, "w") as output:
+        counts = asyncio.run(netted_orders.run(read_orders(orders_path), Transaction.quote, output))
+
+    orders = counts['executed'] + counts['partial'] + counts['failed']
+    print(f"{counts['executed']} orders executed, {counts['partial']} partially settled, {counts['failed']} failed, settled with {counts['transactions']} transactions ({2 * orders} without netting). Results written to {output_path}.")
+
+def do_view_all(fresh: bool = False):
+    """Display the holdings of every account in the credentials file, valued at the current NAV."""
+    import asyncio
+    from algosdk.v2client import algod
+    from pos_etf.cli.transaction import Transaction
+    from pos_etf.cli.utils import asset_cache
+    from pos_etf.cli.view import HoldingsView
+
+    accounts = {acct_name: pub_key for acct_name, (pub_key, _) in credentials_store(credentials_file_path).accounts().items()}
+
+    holdings = asyncio.run(HoldingsView(algod_url).fetch_all(accounts, fresh=fresh))
+    quote = Transaction.quote()
+    asset_info = asset_cache.get(asset_id, algod.AlgodClient("", algod_url, headers={'User-Agent': 'DanM'}))
+
+    print(HoldingsView.format(holdings, quote["nav"], asset_info["decimals"], asset_info["unitname"]))
+
 def display_txn_info(sending_addr: str, receiver_addr: str, amount: int) -> None:
     """display transaction info"""
 
@@ -154,22 +251,33 @@ def main():
 
     auth_type = args.auth
 
-    if auth_type:
+    if auth_type == "feed":
+
+        import asyncio
+        from pos_etf.cli.feed import PriceFeed
+
+        feed = PriceFeed(coinmarketcap_url)
+        try:
+            asyncio.run(feed.run())
+        except KeyboardInterrupt:
+            print("Price feed stopped.")
+
+    elif auth_type:
 
         auth_results = handle_auth_flow(auth_type)
 
-        pub_key = auth_results.get('public_key') if auth_type == "signup" else extract_matching_pub_key(
-            auth_results['acct_name'], [line.strip("[]\n") for line in open(credentials_file_path).readlines()])
-        passphrase = auth_results.get('passphrase') if auth_type == "signup" else extract_matching_passphrase(
-            auth_results['acct_name'], [line.strip("[]\n") for line in open(credentials_file_path).readlines()])
+        pub_key, passphrase = (auth_results.get('public_key'), auth_results.get('passphrase')) if auth_type == "signup" else credentials_store(
+            credentials_file_path).get(auth_results['acct_name'])
+
 
+        from pos_etf.cli.auth import Auth
 
         auth = Auth(
             pub_key,
             passphrase,
             auth_results['acct_name'],
             credentials_file_path,
-            "https://testnet.algoexplorerapi.io",
+            indexer_url,
         )
 
         auth.verify(auth_type)
@@ -184,18 +292,18 @@ def main():
 
             default_account_name = args.account[0] if args.account else os.environ.get("ALGOETF_PROFILE")
 
+            from algosdk.v2client import algod
+            from pos_etf.cli.transaction import Transaction
+
             client = algod.AlgodClient(
-                "", "https://testnet.algoexplorerapi.io", headers={'User-Agent': 'DanM'})
+                "", algod_url, headers={'User-Agent': 'DanM'})
 
-            pub_key = extract_matching_pub_key(default_account_name, [line.strip(
-                "[]\n") for line in open(credentials_file_path).readlines()])
-            passphrase = extract_matching_passphrase(default_account_name, [line.strip(
-                "[]\n") for line in open(credentials_file_path).readlines()])
+            pub_key, passphrase = credentials_store(credentials_file_path).get(default_account_name)
 
 
             display_txn_info(sending_addr=algoetf_addr, receiver_addr=pub_key, amount=int(args.buy[0]))
 
-            txn = Transaction(client, algoetf_addr, pub_key, buy_or_sell_passphrase=creator_passphrase, algo_exchange_passphrase=passphrase, amount=int(args.buy[0]))
+            txn = Transaction(client, algoetf_addr, pub_key, buy_or_sell_passphrase=constants.creator_passphrase, algo_exchange_passphrase=passphrase, amount=int(args.buy[0]))
             txn.do("buy", "exchange")
 
         elif args.sell:
@@ -206,24 +314,40 @@ def main():
             
             default_account_name = args.account[0] if args.account else os.environ.get("ALGOETF_PROFILE")
             
+            from algosdk.v2client import algod
+            from pos_etf.cli.transaction import Transaction
+
             client = algod.AlgodClient(
-                "", "https://testnet.algoexplorerapi.io", headers={'User-Agent': 'DanM'})
+                "", algod_url, headers={'User-Agent': 'DanM'})
 
-            pub_key = extract_matching_pub_key(default_account_name, [line.strip(
-                "[]\n") for line in open(credentials_file_path).readlines()])
-            buy_or_sell_passphrase = extract_matching_passphrase(default_account_name, [line.strip(
-                "[]\n") for line in open(credentials_file_path).readlines()])
+            pub_key, buy_or_sell_passphrase = credentials_store(credentials_file_path).get(default_account_name)
             
             display_txn_info(sending_addr=pub_key, receiver_addr=algoetf_addr, amount=int(args.sell[0]))
 
-            txn = Transaction(client, sender=pub_key, receiver_address=algoetf_addr, buy_or_sell_passphrase=buy_or_sell_passphrase, algo_exchange_passphrase=creator_passphrase, amount=int(args.sell[0]))
+            txn = Transaction(client, sender=pub_key, receiver_address=algoetf_addr, buy_or_sell_passphrase=buy_or_sell_passphrase, algo_exchange_passphrase=constants.creator_passphrase, amount=int(args.sell[0]))
             txn.do("sell", "exchange")
         
+        elif args.orders:
+
+            from pos_etf.cli.orders import default_output_path
+
+            output_path = args.output[0] if args.output else default_output_path(args.orders[0])
+            if args.net:
+                do_netted_orders(args.orders[0], output_path)
+            else:
+                do_bulk_orders(args.orders[0], output_path)
+
         elif args.view:
 
-            if args.view == 'None':
+            if args.view == 'None' and args.all:
+
+                do_view_all(fresh=args.fresh)
+
+            elif args.view == 'None':
 
                 if not (os.environ.get('ALGOETF_PROFILE', None)):
+                    from PyInquirer import prompt
+
                     cleaned_acct_names = clean_acct_names(credentials_file_path)
 
                     customized_acct_question = acct_name_question(
@@ -237,14 +361,10 @@ def main():
                 else:
                     name_for_acct = os.environ.get('ALGOETF_PROFILE')
 
-                pub_key = extract_matching_pub_key(name_for_acct, [
-                    line.strip("[]\n") for line in open(credentials_file_path).readlines()
-                ])
-                # https://testnet.algoexplorerapi.io/v2/accounts/{pubkey}
-                json_res = asyncio.run(send_request_to(f"https://testnet.algoexplorerapi.io/v2/accounts/{pub_key}", "GET"))
-                list_of_assets = json_res['assets']
-                info_for_etf_asset_id = [asset for asset in list_of_assets if asset['asset-id'] == asset_id]
-                print(info_for_etf_asset_id[0]['amount'])
+                pub_key = credentials_store(credentials_file_path).address(name_for_acct)
+                # https://testnet.algoexplorerapi.io/v2/accounts/{pubkey}, unless the cached holding is still current
+                holding = holding_of(pub_key, algod_url, indexer_url, fresh=args.fresh)
+                print(holding['amount'])
             else:
                 print("Use provided name and retrieve info for that account")
 
@@ -1,5 +1,10 @@
+import re
 import setuptools
-from pos_etf.main import __algoetf_version__
+
+# read the version without importing pos_etf.main (and with it the CLI's dependencies).
+__algoetf_version__ = re.search(
+    r"^__algoetf_version__ = ['\"]([^'\"]+)['\"]", open("pos_etf/main.py").read(), re.M
+).group(1)
 
 long_description = open("README.md").read()
 
@@ -32,6 +37,7 @@ setuptools.setup(
         "idna==2.10",
         "msgpack==1.0.2",
         "multidict==5.1.0",
+        "numpy==1.21.1",
         "prompt-toolkit==1.0.14",
         "py-algorand-sdk==1.6.0",
         "pycodestyle==2.6.0",
@@ -0,0 +1,23 @@
+import pytest
+from algosdk import account, mnemonic
+from algosdk.v2client import algod
+
+from pos_etf.cli.loadtest.driver import _free_port, _start_simulator
+from pos_etf.cli.loadtest.simulator import Simulator
+from pos_etf.cli.utils.constants import asset_id
+
+
+@pytest.fixture(scope="session")
+def client():
+    """an algod client of a simulated network of the configured ETF asset producing a block every 0.2 seconds."""
+    base_url = _start_simulator(Simulator(asset_id, block_time=0.2, latency=0.01, jitter=0), _free_port())
+    return algod.AlgodClient("", base_url, headers={'User-Agent': 'DanM'})
+
+
+@pytest.fixture
+def new_account():
+    """generate a new account, returning its address and passphrase."""
+    def generate():
+        private_key, address = account.generate_account()
+        return address, mnemonic.from_private_key(private_key)
+    return generate
@@ -0,0 +1,59 @@
+import json
+
+from pos_etf.cli.utils.assets import AssetCache
+from pos_etf.cli.utils.jsonfile import JsonFile
+
+METADATA = {"decimals": 0, "unitname": "Pos"}
+
+
+def test_get_requests_each_asset_once(client, tmp_path):
+    path = str(tmp_path / "assets.json")
+    cache = AssetCache(path)
+
+    assert cache.get(1, client) == cache.get(1, client) == METADATA
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+    # another process reads the entry from the file.
+    other = AssetCache(path)
+    assert other.get(1, client) == METADATA and other.stats() == {"hits": 1, "misses": 0}
+
+
+def test_concurrent_caches_keep_each_others_entries(client, tmp_path):
+    path = str(tmp_path / "assets.json")
+    first, second = AssetCache(path), AssetCache(path)
+    # both caches load the file before either adds an entry.
+    first.invalidate(99, client)
+    second.invalidate(99, client)
+
+    first.get(1, client)
+    second.get(2, client)
+
+    assert set(JsonFile(path).read()) == {AssetCache.key(client, 1), AssetCache.key(client, 2)}
+
+    # invalidating removes entries from the file too, including ones only another cache added.
+    first.invalidate(2)
+    assert set(JsonFile(path).read()) == {AssetCache.key(client, 1)}
+    first.invalidate()
+    assert JsonFile(path).read() == {}
+
+
+def test_json_file_reads_missing_or_garbled_files_as_empty(tmp_path):
+    path = tmp_path / "cache.json"
+    json_file = JsonFile(str(path))
+
+    assert json_file.read() == {}
+    path.write_text("{not json")
+    assert json_file.read() == {}
+
+    assert json_file.update(lambda on_disk: {**on_disk, "a": 1})
+    assert json_file.update(lambda on_disk: {**on_disk, "b": 2})
+    assert json.loads(path.read_text()) == {"a": 1, "b": 2}
+    # no temporary file is left behind.
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache.json", "cache.json.lock"]
+
+
+def test_json_file_without_path_is_disabled():
+    json_file = JsonFile(None)
+
+    assert not json_file.write({"a": 1}) and not json_file.update(dict)
+    assert json_file.read() == {}
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from pos_etf.cli.backtest import SECONDS_IN_ONE_DAY, Backtest
+from pos_etf.cli.snapshots import SnapshotStore
+
+DAY = SECONDS_IN_ONE_DAY
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.bin"), coins=("a", "b"))
+    # NAV 10, 20, 30; equal proportions 1, 2, 4.
+    store.append_many(np.array([0.0, DAY, 2 * DAY]), {
+        "price": np.array([[1.0, 1.0], [2.0, 2.0], [3.0, 5.0]]),
+        "marketCap": np.array([[10.0, 10.0], [20.0, 20.0], [30.0, 30.0]]),
+        "circulatingSupply": np.ones((3, 2))
+    })
+    yield store
+    store.close()
+
+
+def test_prices_evaluate_every_snapshot(store):
+    prices = Backtest(store).prices()
+
+    np.testing.assert_array_equal(prices["timestamps"], [0, DAY, 2 * DAY])
+    np.testing.assert_allclose(prices["net_asset_value"], [10, 20, 30])
+    np.testing.assert_allclose(prices["equal_proportions"], [1, 2, 4])
+
+
+def test_replay_prices_trades_at_the_latest_snapshot(store):
+    report = Backtest(store).replay(np.array([100.0, DAY + 100.0]), np.array([2.0, -1.0]))
+
+    np.testing.assert_array_equal(report.period_start, [0, DAY, 2 * DAY])
+    np.testing.assert_allclose(report.values["net_asset_value"], [20, 20, 30])
+    np.testing.assert_allclose(report.net_flows["net_asset_value"], [20, -20, 0])
+    np.testing.assert_allclose(report.turnover["net_asset_value"], [20, 20, 0])
+    np.testing.assert_allclose(report.returns["net_asset_value"], [0, 1, 0.5])
+    np.testing.assert_allclose(report.tracking_difference["equal_proportions"], [0, 0, 0.5])
+
+    summary = report.summary()["net_asset_value"]
+    assert summary["end_value"] == 30 and summary["turnover"] == 40 and summary["net_flows"] == 0
+
+
+def test_replay_of_an_empty_range(store):
+    report = Backtest(store).replay(np.array([1.0]), np.array([1.0]), start=10 * DAY)
+
+    assert len(report.period_start) == 0 and report.summary() == {}
+
+
+def test_benchmark_must_be_replayed(store):
+    with pytest.raises(ValueError):
+        Backtest(store, benchmark="price_weighted")
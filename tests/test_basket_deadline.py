@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from pos_etf.cli.error import StaleBasketError
+from pos_etf.cli.utils import cache
+from pos_etf.cli.utils.cache import PriceCache
+from pos_etf.cli.weights.equal_proportions import EqualProportions
+
+STATS = ("price",)
+
+
+class FakeClock(object):
+    """`time.time`, moved forward by `offset` seconds."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self):
+        return time.time() + self.offset
+
+
+class FakeFetcher(object):
+    """answers every coin with a price of 1, after `delays[coin]` seconds, unless the coin is `failing`."""
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or dict()
+        self.failing = set(failing)
+        self.requests = list()
+
+    async def fetch_statistics(self, url):
+        coin = url.rsplit("/", 1)[-1]
+        self.requests.append(coin)
+        await asyncio.sleep(self.delays.get(coin, 0))
+        if coin in self.failing:
+            raise aiohttp.ClientConnectionError()
+        return {"price": 1.0}
+
+
+class FakeStore(object):
+    """a snapshot store that only counts what it records."""
+
+    def __init__(self):
+        self.recorded = list()
+
+    def append_snapshot(self, snapshot):
+        self.recorded.append(snapshot)
+        return len(self.recorded) - 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def etf_with(fetcher, price_cache=None, store=None):
+    price_cache = price_cache or PriceCache(path=None, ttl=30, max_staleness=300)
+    return EqualProportions("https://coins.test/", price_cache=price_cache, coin_fetcher=fetcher, snapshot_store=store)
+
+
+def warm(price_cache, coins):
+    for coin in coins:
+        price_cache.store(PriceCache.key(coin, STATS), {"price": 0.5})
+
+
+def test_without_deadline_waits_for_every_coin(clock):
+    store = FakeStore()
+    etf = etf_with(FakeFetcher(delays={"solana": 0.2}), store=store)
+
+    snapshot = asyncio.run(etf.get_basket(STATS, deadline=0))
+
+    assert snapshot.coins == etf.distinct_coins
+    assert snapshot.freshness["deadline"] is None
+    assert snapshot.freshness["stale"] == {} and snapshot.freshness["stale_weight"] == 0
+    assert snapshot.snapshot_id == etf.last_snapshot_id == 0 and len(store.recorded) == 1
+
+
+def test_deadline_fills_late_coins_in(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    warm(price_cache, ["solana"])
+    clock.offset = 60
+    store = FakeStore()
+    etf = etf_with(FakeFetcher(delays={"solana": 5}), price_cache, store)
+
+    start = time.monotonic()
+    snapshot = asyncio.run(etf.get_basket(STATS, deadline=0.1, max_stale_weight=0.1))
+
+    assert time.monotonic() - start < 1
+    assert snapshot.freshness["filled"] == ["solana"]
+    assert list(snapshot.freshness["stale"]) == ["solana"] and snapshot.freshness["stale"]["solana"] >= 60
+    assert snapshot.freshness["stale_weight"] == 0.1
+    assert snapshot.coin("solana")["price"] == 0.5
+    # a basket with filled-in coins is not recorded.
+    assert snapshot.snapshot_id is None and etf.last_snapshot_id is None and store.recorded == []
+
+
+def test_deadline_waits_for_coins_without_recent_statistics(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    warm(price_cache, ["solana"])
+    clock.offset = 120
+    etf = etf_with(FakeFetcher(delays={"solana": 0.3}), price_cache)
+
+    snapshot = asyncio.run(etf.get_basket(STATS, deadline=0.1, max_fill_age=60))
+
+    assert snapshot.freshness["filled"] == []
+    assert snapshot.coin("solana")["price"] == 1.0
+
+
+def test_refuses_when_stale_coins_weigh_too_much(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    late = ["solana", "tezos", "dash"]
+    warm(price_cache, late)
+    clock.offset = 60
+    etf = etf_with(FakeFetcher(delays=dict.fromkeys(late, 5)), price_cache)
+
+    with pytest.raises(StaleBasketError, match="30.0% of the basket"):
+        asyncio.run(etf.get_basket(STATS, deadline=0.1, max_stale_weight=0.1))
+
+    snapshot = asyncio.run(etf.get_basket(STATS, deadline=0.1, max_stale_weight=0.5))
+    assert snapshot.freshness["filled"] == sorted(late)
+    assert snapshot.freshness["stale_weight"] == 0.3
+
+
+def test_stale_cache_hits_count_as_stale(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    warm(price_cache, ["cardano", "cosmos"])
+    clock.offset = 100
+    etf = etf_with(FakeFetcher(failing=["cardano", "cosmos"]), price_cache, FakeStore())
+
+    with pytest.raises(StaleBasketError, match="cardano \\(100.0s old\\)"):
+        asyncio.run(etf.get_basket(STATS, deadline=0, max_stale_weight=0.1))
+
+    snapshot = asyncio.run(etf.get_basket(STATS, deadline=0, max_stale_weight=0.2))
+    assert snapshot.freshness["filled"] == []
+    assert snapshot.freshness["stale"] == {"cardano": 100.0, "cosmos": 100.0}
+    assert snapshot.freshness["stale_weight"] == 0.2
+    assert snapshot.freshness["ages"]["algorand"] == 0.0
+    assert snapshot.snapshot_id is None
@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import pytest
+
+from pos_etf.cli.utils import cache
+from pos_etf.cli.utils.cache import PriceCache
+
+
+class FakeClock(object):
+    """`time.time`, moved forward by `offset` seconds."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self):
+        return time.time() + self.offset
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def fetcher(*results):
+    """a fetch that answers `results` in turn (raising any exception among them) and counts its calls."""
+    results = list(results)
+
+    async def fetch():
+        fetch.calls += 1
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    fetch.calls = 0
+    return fetch
+
+
+def test_key_ignores_stat_order():
+    assert PriceCache.key("algorand", ("price", "marketCap")) == PriceCache.key("algorand", ("marketCap", "price", "price"))
+    assert PriceCache.key("algorand") == "algorand:*"
+
+
+def test_fresh_entries_are_served_until_the_ttl(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    fetch = fetcher({"price": 1}, {"price": 2})
+
+    assert asyncio.run(price_cache.get_or_fetch("algorand:price", fetch)) == {"price": 1}
+    clock.offset = 29
+    assert asyncio.run(price_cache.get_or_fetch("algorand:price", fetch)) == {"price": 1}
+    assert fetch.calls == 1 and price_cache.hits == 1 and price_cache.misses == 1
+
+
+def test_stale_entries_are_refreshed_before_use(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    fetch = fetcher({"price": 1}, {"price": 2})
+
+    asyncio.run(price_cache.get_or_fetch("algorand:price", fetch))
+    clock.offset = 31
+    assert asyncio.run(price_cache.get_or_fetch("algorand:price", fetch)) == {"price": 2}
+    assert price_cache.age("algorand:price") < 1
+
+
+def test_stale_entries_are_served_when_the_refresh_fails(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    fetch = fetcher({"price": 1}, ConnectionError(), ConnectionError())
+
+    asyncio.run(price_cache.get_or_fetch("algorand:price", fetch))
+    clock.offset = 31
+    assert asyncio.run(price_cache.get_or_fetch("algorand:price", fetch)) == {"price": 1}
+    assert price_cache.stale_hits == 1
+
+    # past `max_staleness` the entry is a miss, and the error is not hidden.
+    clock.offset = 301
+    with pytest.raises(ConnectionError):
+        asyncio.run(price_cache.get_or_fetch("algorand:price", fetch))
+
+
+def test_background_refresh_serves_stale_entries_while_revalidating(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300, background_refresh=True)
+    fetch = fetcher({"price": 1}, {"price": 2})
+
+    async def run():
+        await price_cache.get_or_fetch("algorand:price", fetch)
+        clock.offset = 31
+
+        stale = await price_cache.get_or_fetch("algorand:price", fetch)
+        # a second lookup joins the refresh already in flight.
+        await price_cache.get_or_fetch("algorand:price", fetch)
+        await price_cache.drain()
+
+        return stale, await price_cache.get_or_fetch("algorand:price", fetch)
+
+    stale, refreshed = asyncio.run(run())
+
+    assert stale == {"price": 1} and refreshed == {"price": 2}
+    assert fetch.calls == 2
+    assert price_cache.stats()["stale_hits"] == 2 and price_cache.refreshes == 1 and price_cache.hits == 1
+
+
+def test_last_known_good_respects_max_age(clock):
+    price_cache = PriceCache(path=None, ttl=30, max_staleness=300)
+    price_cache.store(PriceCache.key("algorand", ("price", "marketCap")), {"price": 1, "marketCap": 5})
+    clock.offset = 100
+
+    statistics, age = price_cache.last_known_good("algorand", ("price",))
+    assert statistics == {"price": 1} and age >= 100
+    assert price_cache.last_known_good("algorand", ("price",), max_age=60) == (None, None)
+    assert price_cache.last_known_good("algorand", ("volume",)) == (None, None)
+
+
+def test_persist_merges_with_other_processes(tmp_path, clock):
+    path = str(tmp_path / "price_cache.json")
+    first, second = PriceCache(path=path), PriceCache(path=path)
+
+    first.store("algorand:price", {"price": 1})
+    second.store("cardano:price", {"price": 2})
+    clock.offset = 5
+    second.store("algorand:price", {"price": 3})
+    first.persist()
+    second.persist()
+
+    # an older entry does not replace a newer one, whichever process persists last.
+    clock.offset = 0
+    first.store("algorand:price", {"price": 4})
+    first.persist()
+
+    reloaded = PriceCache(path=path)
+    assert reloaded.lookup("cardano:price")[0] == {"price": 2}
+    assert reloaded.lookup("algorand:price")[0] == {"price": 3}
+
+
+def test_invalidate_drops_entries_from_the_file(tmp_path):
+    path = str(tmp_path / "price_cache.json")
+    price_cache = PriceCache(path=path)
+    price_cache.store("algorand:price", {"price": 1})
+    price_cache.store("cardano:price", {"price": 2})
+    price_cache.persist()
+
+    price_cache.invalidate("algorand:price")
+    assert PriceCache(path=path).lookup("algorand:price")[0] is None
+    assert PriceCache(path=path).lookup("cardano:price")[0] == {"price": 2}
+
+    price_cache.invalidate()
+    assert PriceCache(path=path).lookup("cardano:price")[0] is None
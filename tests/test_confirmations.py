@@ -0,0 +1,82 @@
+import asyncio
+
+import aiohttp
+import pytest
+from algosdk.transaction import PaymentTxn
+
+from pos_etf.cli.utils import add_network_params, sign
+from pos_etf.cli.utils.confirmations import ConfirmationTracker
+
+
+def submit_payments(client, new_account, count):
+    """sign and submit `count` payments, returning their ids."""
+    (sender, passphrase), (receiver, _) = new_account(), new_account()
+    payments = [PaymentTxn(**add_network_params(client, {"sender": sender, "receiver": receiver, "amt": amount})) for amount in range(1, count + 1)]
+
+    signed_transactions, transaction_ids = sign([(payment, passphrase) for payment in payments])
+    for signed_transaction in signed_transactions:
+        client.send_transaction(signed_transaction)
+    return transaction_ids
+
+
+def test_waits_for_many_transactions_per_round(client, new_account):
+    transaction_ids = submit_payments(client, new_account, 20)
+    tracker = ConfirmationTracker(client)
+
+    infos = asyncio.run(tracker.wait(transaction_ids + ["UNKNOWN"]))
+
+    assert [info["tx"] for info in infos[:-1]] == transaction_ids
+    # algod does not know the last id, as in `wait_for_confirmation`.
+    assert infos[-1] is None
+    # the transactions confirm within a block or two of each other, and every round is waited for once, not once per transaction.
+    assert tracker.rounds <= 3 and tracker.stats()["pending"] == 0
+
+
+def resolve(tracker, results, rounds):
+    """settle one tracked transaction with the check result of each round, returning its future."""
+    async def run():
+        future = tracker.track("TX")
+        tracker._poller.cancel()
+        for current_round, result in zip(rounds, results):
+            tracker._resolve("TX", current_round, result)
+        return future
+    return asyncio.run(run())
+
+
+def test_transient_check_errors_are_retried(client):
+    tracker = ConfirmationTracker(client, timeout=10)
+
+    future = resolve(tracker, [aiohttp.ClientConnectionError(), asyncio.TimeoutError(), {"confirmed-round": 3}], rounds=[1, 2, 3])
+
+    assert future.result() == {"confirmed-round": 3, "tx": "TX"}
+
+
+def test_errors_fail_at_the_deadline(client):
+    tracker = ConfirmationTracker(client, timeout=2)
+
+    future = resolve(tracker, [aiohttp.ClientConnectionError(), aiohttp.ClientConnectionError()], rounds=[1, 3])
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        future.result()
+    assert tracker.stats()["pending"] == 0
+
+
+def test_pending_transactions_fail_at_the_deadline(client):
+    tracker = ConfirmationTracker(client, timeout=2)
+
+    future = resolve(tracker, [{"confirmed-round": 0, "pool-error": ""}] * 2, rounds=[1, 3])
+
+    with pytest.raises(Exception, match="timeout value = : 2"):
+        future.result()
+
+
+def test_pool_errors_and_client_errors_fail_at_once(client):
+    tracker = ConfirmationTracker(client)
+
+    future = resolve(tracker, [{"confirmed-round": 0, "pool-error": "overspend"}], rounds=[1])
+    with pytest.raises(Exception, match="pool error: overspend"):
+        future.result()
+
+    future = resolve(tracker, [aiohttp.ClientResponseError(None, (), status=400)], rounds=[1])
+    with pytest.raises(aiohttp.ClientResponseError):
+        future.result()
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from pos_etf.cli.error import InvalidAccountNameError
+from pos_etf.cli.utils import clean_acct_names
+from pos_etf.cli.utils.credentials import CredentialsStore, credentials_store
+
+CREDENTIALS = """[alice]
+addr = ALICE
+pk = alice passphrase
+
+[bob]
+addr = BOB
+pk = bob passphrase
+[alice]
+addr = SHADOWED
+pk = shadowed
+"""
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / ".pos_etf"
+    path.write_text(CREDENTIALS)
+    return str(path)
+
+
+def test_parse_indexes_every_account_in_file_order(path):
+    store = CredentialsStore(path)
+
+    assert store.names() == ["alice", "bob"]
+    # the first entry wins.
+    assert store.get("alice") == ("ALICE", "alice passphrase")
+    assert store.address("bob") == "BOB" and store.passphrase("bob") == "bob passphrase"
+    assert "bob" in store and "carol" not in store
+    assert clean_acct_names(path) == ["alice", "bob"]
+
+
+def test_unknown_accounts_raise(path):
+    with pytest.raises(InvalidAccountNameError, match="carol"):
+        CredentialsStore(path).get("carol")
+
+
+def test_truncated_account_parses_as_empty():
+    assert CredentialsStore.parse(["[carol]\n", "addr = CAROL\n"]) == {"carol": ("CAROL", "")}
+
+
+def test_store_reparses_only_when_the_file_changes(path, monkeypatch):
+    store = CredentialsStore(path)
+    parses = []
+    parse = CredentialsStore.parse
+    monkeypatch.setattr(CredentialsStore, "parse", staticmethod(lambda lines: parses.append(None) or parse(lines)))
+
+    store.names()
+    store.get("alice")
+    assert len(parses) == 1
+
+    with open(path, "a") as f:
+        f.write("[carol]\naddr = CAROL\npk = carol passphrase\n")
+    assert "carol" in store and len(parses) == 2
+
+    os.remove(path)
+    assert store.names() == []
+
+
+def test_stores_are_shared_per_file(path):
+    assert credentials_store(path) is credentials_store(os.path.join(os.path.dirname(path), ".", ".pos_etf"))
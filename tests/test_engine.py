@@ -0,0 +1,57 @@
+import numpy as np
+
+from pos_etf.cli.weights import engine
+from pos_etf.cli.weights.equal_proportions import EqualProportions
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+from pos_etf.cli.weights.price_weighted import PriceWeighted
+
+PRICES = np.array([[1.0, 2.0, 5.0], [2.0, 2.0, 4.0]])
+MARKET_CAPS = np.array([[10.0, 20.0, 70.0], [30.0, 30.0, 40.0]])
+SUPPLIES = np.array([[5.0, 10.0, 5.0], [5.0, 5.0, 10.0]])
+
+
+def test_net_asset_value():
+    np.testing.assert_allclose(engine.net_asset_value(MARKET_CAPS, SUPPLIES), [100 / 20, 100 / 20])
+    assert engine.net_asset_value([10.0, 30.0], [2.0, 2.0]) == 10.0
+
+
+def test_equal_proportions():
+    np.testing.assert_allclose(engine.equal_proportions(PRICES), [8 / 3, 8 / 3])
+    np.testing.assert_allclose(engine.equal_proportions(PRICES, percentage=0.5), [4.0, 4.0])
+
+
+def test_price_weighted_matches_the_scalar_formula():
+    for prices in PRICES:
+        expected = sum(price * price / prices.sum() for price in prices)
+        assert np.isclose(engine.price_weighted(prices), expected)
+
+
+def test_batches_match_single_snapshots():
+    batch = engine.price_weighted(PRICES)
+
+    np.testing.assert_allclose(batch, [engine.price_weighted(prices) for prices in PRICES])
+
+
+def test_weights_sum_to_one():
+    for weights in (engine.equal_weights(PRICES), engine.price_weights(PRICES), engine.market_cap_weights(MARKET_CAPS)):
+        assert weights.shape == PRICES.shape
+        np.testing.assert_allclose(weights.sum(axis=-1), 1.0)
+
+    np.testing.assert_allclose(engine.market_cap_weights(MARKET_CAPS)[0], [0.1, 0.2, 0.7])
+    np.testing.assert_array_equal(engine.price_weights(np.zeros(3)), 0.0)
+
+
+def test_strategies_evaluate_columns():
+    columns = {"price": PRICES, "marketCap": MARKET_CAPS, "circulatingSupply": SUPPLIES}
+
+    np.testing.assert_allclose(NetAssetValue.evaluate(columns), [5.0, 5.0])
+    np.testing.assert_allclose(PriceWeighted.evaluate(columns), engine.price_weighted(PRICES))
+    # equal proportions rounds every coin's share to three decimals.
+    np.testing.assert_allclose(EqualProportions.evaluate(columns), 0.333 * PRICES.sum(axis=-1))
+
+
+def test_equal_proportions_prices_the_distinct_coins():
+    etf = EqualProportions("https://coins.test/")
+    columns = {"price": np.ones(len(etf.distinct_coins))}
+
+    assert np.isclose(EqualProportions.evaluate(columns), EqualProportions.weights(columns).sum())
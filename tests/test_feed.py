@@ -0,0 +1,78 @@
+import asyncio
+import os
+import stat
+import time
+
+import pytest
+
+from pos_etf.cli.feed import PriceFeed, request_quote
+from pos_etf.cli.utils import constants
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, "snapshot_path", "")
+    return PriceFeed("https://coins.test/", socket_path=str(tmp_path / "feed.sock"))
+
+
+def serve(handler, socket_path, *requests):
+    """serve `handler` on `socket_path` and run each of `requests` (blocking callables) against it."""
+    async def run():
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        async with server:
+            loop = asyncio.get_running_loop()
+            return [await loop.run_in_executor(None, request) for request in requests]
+    return asyncio.run(run())
+
+
+def test_request_quote_returns_the_latest_quote(feed):
+    feed.quote = {"nav": 1.5, "timestamp": time.time(), "snapshot_id": 3}
+
+    quote, = serve(feed._handle, feed.socket_path, lambda: request_quote(feed.socket_path))
+
+    assert quote == feed.quote
+
+
+def test_old_quotes_are_ignored(feed):
+    feed.quote = {"nav": 1.5, "timestamp": time.time() - 120}
+
+    quote, = serve(feed._handle, feed.socket_path, lambda: request_quote(feed.socket_path, max_age=60))
+
+    assert quote is None
+
+
+def test_garbled_replies_are_ignored(tmp_path):
+    socket_path = str(tmp_path / "garbled.sock")
+
+    async def garbled(reader, writer):
+        await reader.readline()
+        writer.write(b"not json\n")
+        await writer.drain()
+        writer.close()
+
+    assert serve(garbled, socket_path, lambda: request_quote(socket_path)) == [None]
+
+
+def test_no_feed_means_no_quote(tmp_path):
+    assert request_quote(str(tmp_path / "missing.sock")) is None
+
+
+def test_the_socket_is_owner_only(feed, monkeypatch):
+    async def refresh():
+        feed.quote = {"nav": 1.5, "timestamp": time.time()}
+
+    monkeypatch.setattr(feed, "refresh", refresh)
+    modes = []
+
+    async def check():
+        mode = os.stat(feed.socket_path).st_mode
+        modes.append(stat.S_IMODE(mode))
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(feed, "_refresh_forever", check)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(feed.run())
+
+    assert modes == [0o600]
+    assert not os.path.exists(feed.socket_path)
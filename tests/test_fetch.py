@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from pos_etf.cli.utils.fetch import SingleFlight
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+
+
+def test_concurrent_calls_share_one_flight():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return {"price": 1}
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("algorand", fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"price": 1}] * 5
+    assert len(calls) == 1
+    assert single_flight.stats() == {"calls": 1, "coalesced": 4}
+
+
+def test_different_keys_and_later_calls_fly_separately():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        return 1
+
+    async def run():
+        await asyncio.gather(single_flight.do("algorand", fetch), single_flight.do("cardano", fetch))
+        await single_flight.do("algorand", fetch)
+
+    asyncio.run(run())
+    assert single_flight.stats() == {"calls": 3, "coalesced": 0}
+
+
+def test_errors_reach_every_waiter():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("down")
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("algorand", fetch) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(run()))
+    assert single_flight.calls == 1
+
+
+def test_a_cancelled_waiter_does_not_cancel_the_flight():
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def run():
+        first = asyncio.ensure_future(single_flight.do("algorand", fetch))
+        second = asyncio.ensure_future(single_flight.do("algorand", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 1
+
+
+def test_basket_slugs_are_deduplicated():
+    coins = NetAssetValue("https://coins.test/").distinct_coins
+
+    assert coins.count("cosmos") == 1
+    assert len(coins) == len(set(NetAssetValue.coins_tuple))
@@ -0,0 +1,20 @@
+from algosdk.transaction import AssetTransferTxn, PaymentTxn
+
+from pos_etf.cli.utils import add_network_params, sign_and_send_group
+
+ASSET_ID = 1 # the ETF asset of the simulated network
+
+
+def test_group_legs_are_confirmed_in_one_round(client, new_account):
+    (customer, customer_passphrase), (pool, pool_passphrase) = new_account(), new_account()
+
+    payment = PaymentTxn(**add_network_params(client, {"sender": customer, "receiver": pool, "amt": 1000}))
+    transfer = AssetTransferTxn(**add_network_params(client, {"sender": pool, "receiver": customer, "amt": 5, "index": ASSET_ID}))
+
+    infos = sign_and_send_group([(payment, customer_passphrase), (transfer, pool_passphrase)], client)
+
+    assert len(infos) == 2
+    assert infos[0]["confirmed-round"] > 0
+    assert infos[0]["confirmed-round"] == infos[1]["confirmed-round"]
+    # both legs carry the same group id.
+    assert payment.group is not None and payment.group == transfer.group
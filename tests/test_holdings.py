@@ -0,0 +1,71 @@
+import asyncio
+
+from pos_etf.cli.utils.constants import asset_id
+from pos_etf.cli.utils.holdings import HoldingsCache
+from pos_etf.cli.utils.jsonfile import JsonFile
+from pos_etf.cli.view import HoldingsView
+
+URL = "http://algod.test"
+
+
+def test_checked_round_stops_at_the_indexer():
+    assert HoldingsCache.checked_round(20, None, 10) == 20
+    assert HoldingsCache.checked_round(20, {"current-round": 15, "transactions": []}, 10) == 15
+    assert HoldingsCache.checked_round(20, {"transactions": []}, 10) == 10
+
+
+def test_touch_only_moves_entries_forward():
+    cache = HoldingsCache(None)
+    cache.store(URL, "ALICE", 5, 10)
+
+    cache.touch(URL, "ALICE", 8)
+    assert cache.lookup(URL, "ALICE") == {"amount": 5, "round": 10}
+    cache.touch(URL, "ALICE", 12)
+    assert cache.lookup(URL, "ALICE")["round"] == 12
+
+
+def test_algo_balances_are_not_served_from_old_files(tmp_path):
+    path = str(tmp_path / "holdings.json")
+    JsonFile(path).write({HoldingsCache.key(URL, "ALICE"): {"amount": 5, "algos": 7, "round": 10}})
+
+    assert HoldingsCache(path).lookup(URL, "ALICE") == {"amount": 5, "round": 10}
+
+
+def test_persist_keeps_the_later_round_per_account(tmp_path):
+    path = str(tmp_path / "holdings.json")
+    first, second = HoldingsCache(path), HoldingsCache(path)
+
+    first.store(URL, "ALICE", 5, 10)
+    first.store(URL, "BOB", 1, 30)
+    second.store(URL, "ALICE", 6, 20)
+    second.store(URL, "BOB", 2, 25)
+    second.persist()
+    first.persist()
+
+    assert JsonFile(path).read() == {
+        HoldingsCache.key(URL, "ALICE"): {"amount": 6, "round": 20},
+        HoldingsCache.key(URL, "BOB"): {"amount": 1, "round": 30}
+    }
+
+    first.invalidate(URL, "BOB")
+    assert list(JsonFile(path).read()) == [HoldingsCache.key(URL, "ALICE")]
+    first.invalidate()
+    assert JsonFile(path).read() == {}
+
+
+def test_view_serves_unchanged_accounts_from_the_cache(client, new_account, tmp_path):
+    cache = HoldingsCache(str(tmp_path / "holdings.json"))
+    view = HoldingsView(client.algod_address, asset_id=asset_id, indexer_url=client.algod_address, holdings_cache=cache)
+    accounts = {"alice": new_account()[0], "bob": new_account()[0]}
+
+    read = asyncio.run(view.fetch_all(accounts))
+    cached = asyncio.run(view.fetch_all(accounts))
+
+    assert not any(holding["cached"] for holding in read) and all(holding["cached"] for holding in cached)
+    assert [holding["amount"] for holding in cached] == [holding["amount"] for holding in read]
+    # the Algo balance changes with rewards, so it is only known when the account is read.
+    assert read[0]["algos"] == 10 ** 12 and cached[0]["algos"] is None
+    assert cache.stats() == {"hits": 2, "misses": 2}
+
+    fresh = asyncio.run(view.fetch_all(accounts, fresh=True))
+    assert not any(holding["cached"] for holding in fresh)
@@ -0,0 +1,30 @@
+import pytest
+
+import pos_etf.cli.utils as utils
+from pos_etf.cli.loadtest.importtime import SCENARIOS, measure, parse_importtime
+
+STDERR = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        900 | pos_etf.main
+random warning
+"""
+
+
+def test_parse_importtime():
+    assert parse_importtime(STDERR) == [("  _io", 120, 120), ("pos_etf.main", 300, 900)]
+
+
+@pytest.mark.parametrize("command", SCENARIOS)
+def test_commands_do_not_load_deferred_modules(command):
+    # only what is loaded is checked here; the time budget is left to `python -m pos_etf.cli.loadtest.importtime`.
+    result = measure(SCENARIOS[command], runs=1)
+
+    assert result["deferred_loaded"] == []
+
+
+def test_lazy_attributes_resolve_on_use():
+    from pos_etf.cli.utils.assets import asset_cache
+
+    assert utils.asset_cache is asset_cache
+    with pytest.raises(AttributeError, match="no attribute 'missing'"):
+        utils.missing
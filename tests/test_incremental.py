@@ -0,0 +1,46 @@
+import math
+import random
+
+from pos_etf.cli.weights import engine
+from pos_etf.cli.weights.incremental import IncrementalNav
+
+COIN_DATA = {
+    "algorand": {"marketCap": 100.0, "circulatingSupply": 10.0},
+    "cardano": {"marketCap": 300.0, "circulatingSupply": 30.0},
+}
+
+
+def test_starts_from_structured_statistics():
+    nav = IncrementalNav(COIN_DATA)
+
+    assert len(nav) == 2 and nav.value == 10.0 and nav.nav == 10.0
+
+
+def test_updates_match_a_full_recomputation():
+    rng = random.Random(7)
+    nav = IncrementalNav(COIN_DATA, recompute_every=50)
+    market_caps = {coin: stats["marketCap"] for coin, stats in COIN_DATA.items()}
+    supplies = {coin: stats["circulatingSupply"] for coin, stats in COIN_DATA.items()}
+
+    for _ in range(1000):
+        coin = rng.choice(["algorand", "cardano", "tezos"])
+        market_caps[coin] = rng.uniform(1, 1e9)
+        supplies[coin] = supplies.get(coin, rng.uniform(1, 1e6))
+        nav.update(coin, market_caps[coin], supplies[coin])
+
+    coins = sorted(market_caps)
+    expected = engine.net_asset_value([market_caps[coin] for coin in coins], [supplies[coin] for coin in coins])
+    assert math.isclose(nav.value, expected, rel_tol=1e-9)
+
+
+def test_partial_updates_and_removal():
+    nav = IncrementalNav(COIN_DATA)
+
+    assert nav.update("algorand", market_cap=500.0) == 800.0 / 40.0
+    assert nav.update("cardano", circulating_supply=10.0) == 800.0 / 20.0
+    assert nav.remove("cardano") == 50.0
+    assert len(nav) == 1
+
+
+def test_an_empty_basket_has_no_nav():
+    assert math.isnan(IncrementalNav().value)
@@ -0,0 +1,31 @@
+import math
+import subprocess
+import sys
+
+from pos_etf.cli.loadtest.driver import summarize
+
+
+def test_summarize():
+    summary = summarize([0.1, 0.2, 0.3, 0.4], ["ValueError: bad"], 2.0)
+
+    assert summary["trades"] == 4 and summary["errors"] == 1
+    assert summary["first_error"] == "ValueError: bad"
+    assert math.isclose(summary["p50"], 0.25) and summary["trades_per_second"] == 2.0
+
+
+def test_summarize_without_trades():
+    summary = summarize([], [], 0.0)
+
+    assert math.isnan(summary["p95"]) and summary["trades_per_second"] == 0.0
+
+
+def test_concurrent_trades_against_the_simulator():
+    # the CLI reads its configuration at import time, so the driver runs in its own process.
+    result = subprocess.run(
+        [sys.executable, "-m", "pos_etf.cli.loadtest.driver", "--trades", "30", "--concurrency", "6", "--block-time", "0.2", "--latency", "0.01", "--jitter", "0"],
+        capture_output=True, text=True, timeout=120
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "trades: 30 (0 errors)" in result.stdout
+    assert "price cache:" in result.stdout
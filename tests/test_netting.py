@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+from pos_etf.cli.orders.netting import NettedOrders, allocate, batches, cross
+from pos_etf.cli.utils.confirmations import ConfirmationTracker
+from pos_etf.cli.utils.session import session_pool
+
+QUOTE = {"nav": 10.0, "algorand_price": 2.0}
+
+
+def collect(orders, **kwargs):
+    """run `batches` over `orders` and return every batch with the time it was closed at."""
+    async def run():
+        start = time.monotonic()
+        return [(batch, time.monotonic() - start) async for batch in batches(orders, **kwargs)]
+    return asyncio.run(run())
+
+
+def test_cross_matches_buyers_with_sellers():
+    fills = cross({"a": 5, "b": -3, "c": -4, "d": 1})
+
+    assert fills == [("b", "a", 3), ("c", "a", 2), ("c", "d", 1), ("c", None, 1)]
+
+
+def test_cross_nets_every_position():
+    positions = {"a": 7, "b": -2, "c": 0, "d": -9, "e": 3}
+    net = dict.fromkeys(positions, 0)
+
+    for seller, buyer, amount in cross(positions):
+        assert amount > 0
+        if seller is not None:
+            net[seller] -= amount
+        if buyer is not None:
+            net[buyer] += amount
+
+    assert net == positions
+
+
+def test_cross_settles_one_sided_batches_against_the_pool():
+    assert cross({"a": 2, "b": 3}) == [(None, "a", 2), (None, "b", 3)]
+    assert cross({"a": -2}) == [("a", None, 2)]
+    assert cross({"a": 0}) == []
+
+
+def test_batches_are_cut_by_max_orders():
+    orders = [{"id": i} for i in range(7)]
+
+    result = collect(iter(orders), interval=10, max_orders=3)
+
+    assert [batch for batch, _ in result] == [orders[0:3], orders[3:6], orders[6:7]]
+
+
+def test_batches_close_on_a_timer_without_another_order():
+    def slow_orders():
+        yield {"id": 0}
+        time.sleep(0.5)
+        yield {"id": 1}
+
+    result = collect(slow_orders(), interval=0.1, max_orders=10)
+
+    assert [batch for batch, _ in result] == [[{"id": 0}], [{"id": 1}]]
+    # the first batch closed after `interval`, not when the next order arrived.
+    assert result[0][1] < 0.4
+
+
+def test_batches_forward_reader_errors():
+    def broken_orders():
+        yield {"id": 0}
+        raise ValueError("bad order")
+
+    with pytest.raises(ValueError, match="bad order"):
+        collect(broken_orders(), interval=0.1, max_orders=10)
+
+
+def test_allocate_fills_the_net_side_in_order():
+    orders = [("buy", 3), ("sell", 2), ("buy", 4)]
+
+    assert allocate(orders, 5) == [3, 2, 4]
+    # the sell is netted against the buys, which are filled first by it and then by the fills.
+    assert allocate(orders, 3) == [3, 2, 2]
+    assert allocate(orders, 0) == [2, 2, 0]
+    assert allocate([("sell", 2), ("buy", 2)], 0) == [2, 2]
+
+
+def settle_batch(netted_orders, batch):
+    async def run():
+        async with session_pool.session() as session:
+            return await netted_orders.settle_batch(session, ConfirmationTracker(netted_orders.client), batch, QUOTE, 0)
+    return asyncio.run(run())
+
+
+def test_settle_batch_reports_what_settled_each_order(client, new_account):
+    # mallory's passphrase is not a valid mnemonic, so every fill mallory is part of fails.
+    credentials = {"alice": new_account(), "bob": new_account(), "mallory": (new_account()[0], "not a passphrase")}
+    netted_orders = NettedOrders(client, credentials, new_account()[1])
+    batch = [
+        {"id": 0, "side": "buy", "account": "alice", "amount": 1},
+        {"id": 1, "side": "sell", "account": "bob", "amount": 3},
+        {"id": 2, "side": "buy", "account": "alice", "amount": 4},
+        {"id": 3, "side": "sell", "account": "mallory", "amount": 2},
+        {"id": 4, "side": "sell", "account": "alice", "amount": 1},
+        {"id": 5, "side": "buy", "account": "carol", "amount": 1}
+    ]
+
+    results, fills = settle_batch(netted_orders, batch)
+
+    assert [(fill["seller"], fill["buyer"], fill["amount"], bool(fill["error"])) for fill in fills] == [("bob", "alice", 3, False), ("mallory", "alice", 1, True), ("mallory", None, 1, True)]
+    assert all(fill["submitted"] and fill["round"] for fill in fills if not fill["error"])
+
+    settled = {result["id"]: (result["net"], result["settled"], result["unsettled"], len(result["settlements"])) for result in results}
+    # alice nets +4: her sell is netted away and fills her first buy, the bob fill settles 3 more tokens.
+    assert settled[0] == (4, 1, 0, 2) and settled[4] == (4, 1, 0, 0)
+    assert settled[2] == (4, 3, 1, 2)
+    assert settled[1] == (-3, 3, 0, 1)
+    assert settled[3] == (-2, 0, 2, 2)
+
+    errors = {result["id"]: result["error"] for result in results}
+    assert errors[0] is None and errors[1] is None and errors[4] is None
+    assert errors[2].startswith("partially settled (3 of 4 tokens)")
+    assert errors[3].startswith("settlement failed (0 of 2 tokens)")
+    assert "does not exist" in errors[5]
@@ -0,0 +1,64 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from pos_etf.cli.error import InvalidOrderError
+from pos_etf.cli.orders import BulkOrders, default_output_path, read_orders
+
+QUOTE = {"nav": 10.0, "algorand_price": 2.0}
+
+
+@pytest.fixture
+def bulk_orders(client, new_account):
+    _, pool_passphrase = new_account()
+    credentials = {"alice": new_account(), "bob": new_account()}
+    return BulkOrders(client, credentials, pool_passphrase, window=4)
+
+
+def test_read_orders_from_json_lines_and_csv(tmp_path):
+    json_path = tmp_path / "orders.jsonl"
+    json_path.write_text('{"side": "buy", "account": "alice", "amount": 3}\n\n{"id": "x", "side": "sell", "account": "bob", "amount": 1}\n')
+    csv_path = tmp_path / "orders.csv"
+    csv_path.write_text("side,account,amount,id\nbuy,alice,3,\nsell,bob,1,x\n")
+
+    expected = [
+        {"id": 1, "side": "buy", "account": "alice", "amount": 3},
+        {"id": "x", "side": "sell", "account": "bob", "amount": 1}
+    ]
+    assert list(read_orders(str(json_path))) == expected
+    # csv fields are read as strings.
+    assert list(read_orders(str(csv_path))) == [dict(order, amount=str(order["amount"])) for order in expected]
+
+    assert default_output_path(str(csv_path)) == str(tmp_path / "orders.results.jsonl")
+
+
+@pytest.mark.parametrize("order, message", [
+    ({"side": "hold", "account": "alice", "amount": 1}, "Invalid side"),
+    ({"side": "buy", "account": "carol", "amount": 1}, "does not exist"),
+    ({"side": "buy", "account": "alice", "amount": "1.5"}, "whole number"),
+    ({"side": "buy", "account": "alice", "amount": 0}, "must be positive")
+])
+def test_validate_rejects_bad_orders(bulk_orders, order, message):
+    with pytest.raises(InvalidOrderError, match=message):
+        bulk_orders.validate(order)
+
+
+def test_identical_orders_get_distinct_transactions(bulk_orders):
+    orders = [{"id": i, "side": "buy", "account": "alice", "amount": 2} for i in range(6)]
+    orders.append({"id": 6, "side": "sell", "account": "carol", "amount": 1})
+    output = io.StringIO()
+
+    counts = asyncio.run(bulk_orders.run(iter(orders), QUOTE, output))
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert counts == {"executed": 6, "failed": 1}
+    # results are written in file order.
+    assert [result["id"] for result in results] == list(range(7))
+    assert "does not exist" in results[-1]["error"] and not results[-1]["submitted"]
+
+    executed = results[:-1]
+    assert all(result["submitted"] and result["round"] for result in executed)
+    txids = [result[field] for result in executed for field in ("txid", "exchange_txid")]
+    assert len(set(txids)) == len(txids)
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pos_etf.cli.utils import params
+from pos_etf.cli.utils.params import ParamsCache
+
+
+class FakeClock(object):
+    """`time.monotonic`, moved forward by `offset` seconds."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def monotonic(self):
+        return time.monotonic() + self.offset
+
+
+class FakeClient(object):
+    """a v1-style client suggesting params at `round`, after `delay` seconds."""
+
+    algod_address = "http://algod.test"
+
+    def __init__(self, round=10, delay=0.0):
+        self.round = round
+        self.delay = delay
+        self.requests = 0
+        self.threads = set()
+
+    def suggested_params(self):
+        self.requests += 1
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return {"lastRound": self.round}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(params, "time", clock)
+    return clock
+
+
+def test_get_reuses_params_until_the_ttl(clock):
+    cache, client = ParamsCache(ttl=5), FakeClient()
+
+    assert cache.get(client) == cache.get(client) == {"lastRound": 10}
+    assert client.requests == 1
+
+    clock.offset = 5
+    cache.get(client)
+    assert client.requests == 2
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+
+def test_a_later_round_invalidates_params(clock):
+    cache, client = ParamsCache(ttl=60), FakeClient()
+    cache.get(client)
+
+    cache.observe_round(client, 10)
+    cache.observe_round(client, None)
+    cache.get(client)
+    assert client.requests == 1
+
+    client.round = 11
+    cache.observe_round(client, 11)
+    assert cache.get(client) == {"lastRound": 11}
+    assert client.requests == 2
+
+
+def test_prefetch_requests_off_the_loop_once(clock):
+    cache, client = ParamsCache(ttl=60), FakeClient(delay=0.2)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.01)
+
+    async def prefetch_concurrently():
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.gather(*(cache.prefetch(client) for _ in range(10)))
+        ticker.cancel()
+
+    asyncio.run(prefetch_concurrently())
+
+    assert client.requests == 1 and threading.get_ident() not in client.threads
+    # the loop kept running while the params were requested.
+    assert len(ticks) > 5
+    assert cache.get(client) == {"lastRound": 10} and client.requests == 1
+
+    # a fresh entry is not requested again.
+    asyncio.run(cache.prefetch(client))
+    assert client.requests == 1
@@ -0,0 +1,110 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from pos_etf.cli.rebalance import Rebalancer
+from pos_etf.cli.weights.engine import rebalance
+from pos_etf.cli.weights.equal_proportions import EqualProportions
+
+PRICES = np.array([1.0, 2.0, 4.0, 10.0])
+WEIGHTS = np.full(4, 0.25)
+
+
+def weights_after(holdings, trades, prices=PRICES):
+    values = (holdings + trades) * prices
+    return values / values.sum(axis=-1, keepdims=True)
+
+
+def test_rebalance_reaches_the_target_weights():
+    holdings = np.array([100.0, 10.0, 30.0, 2.0])
+
+    trades = rebalance(holdings, PRICES, WEIGHTS)
+
+    np.testing.assert_allclose(weights_after(holdings, trades), WEIGHTS)
+    assert abs(trades @ PRICES) < 1e-9
+
+
+def test_rebalance_is_self_financing_through_the_funding_coin():
+    holdings = np.array([100.0, 10.0, 30.0, 2.0])
+
+    trades = rebalance(holdings, PRICES, WEIGHTS, tolerance=0.05, funding_index=0)
+
+    # the funding coin absorbs the net of the other trades, so the portfolio value is unchanged.
+    assert abs(trades @ PRICES) < 1e-9
+    assert np.isclose(trades[0], -(trades[1:] @ PRICES[1:]) / PRICES[0])
+
+
+def test_rebalance_skips_coins_within_tolerance():
+    # weights 0.26, 0.24, 0.30, 0.20
+    holdings = np.array([26.0, 12.0, 7.5, 2.0])
+
+    trades = rebalance(holdings, PRICES, WEIGHTS, tolerance=0.02)
+
+    assert trades[0] == 0 and trades[1] == 0
+    assert trades[2] < 0 and trades[3] > 0
+    np.testing.assert_allclose(weights_after(holdings, trades)[2:], WEIGHTS[2:])
+
+
+def test_rebalance_skips_trades_below_min_trade_value():
+    # trade values: -1, +1, -5, +5
+    holdings = np.array([26.0, 12.0, 7.5, 2.0])
+
+    trades = rebalance(holdings, PRICES, WEIGHTS, min_trade_value=5)
+
+    np.testing.assert_array_equal(trades[:2], 0)
+    np.testing.assert_allclose(trades[2:] * PRICES[2:], [-5.0, 5.0])
+
+
+def test_rebalance_is_vectorized_over_portfolios():
+    holdings = np.array([[100.0, 10.0, 30.0, 2.0], [25.0, 12.5, 6.25, 2.5]])
+
+    trades = rebalance(holdings, PRICES, WEIGHTS, funding_index=3)
+
+    np.testing.assert_allclose(weights_after(holdings, trades), np.broadcast_to(WEIGHTS, holdings.shape))
+    np.testing.assert_allclose(trades[1], 0, atol=1e-12)
+
+
+def test_rebalance_never_trades_unpriced_coins():
+    holdings = np.array([100.0, 10.0, 30.0, 2.0])
+    prices = np.array([1.0, 0.0, 4.0, 10.0])
+
+    trades = rebalance(holdings, prices, WEIGHTS)
+
+    assert trades[1] == 0 and np.isfinite(trades).all()
+
+
+def test_rebalancer_plans_sales_before_purchases():
+    rebalancer = Rebalancer(EqualProportions, tolerance=0.0, min_trade_value=0.0, funding_coin="algorand")
+    coins = ["algorand", "cardano", "solana", "tezos"]
+    portfolios, holdings = Rebalancer.holdings_matrix({"pool": {"algorand": 100.0, "cardano": 10.0, "solana": 30.0, "tezos": 2.0}}, coins)
+
+    plan = rebalancer.plan(portfolios, coins, holdings, {"price": PRICES})
+    trades = list(plan.trades())
+
+    assert [(trade["coin"], trade["side"]) for trade in trades] == [("solana", "sell"), ("cardano", "buy"), ("tezos", "buy")]
+    assert all(trade["funded_with"] == "algorand" and trade["units"] > 0 for trade in trades)
+
+    summary = plan.summary()["pool"]
+    assert summary["value"] == 260.0 and summary["trades"] == 3
+    # the funding coin receives what the trades net to.
+    assert np.isclose(summary["funding_flow"], -sum(trade["value"] if trade["side"] == "buy" else -trade["value"] for trade in trades))
+
+    output = io.StringIO()
+    assert plan.write(output) == 3
+    assert [json.loads(line) for line in output.getvalue().splitlines()] == trades
+
+
+def test_holdings_matrix_rejects_coins_outside_the_basket():
+    portfolios, matrix = Rebalancer.holdings_matrix({"a": {"solana": 2.0}, "b": {}}, ["algorand", "solana"])
+    assert portfolios == ["a", "b"]
+    np.testing.assert_array_equal(matrix, [[0.0, 2.0], [0.0, 0.0]])
+
+    with pytest.raises(ValueError, match="dogecoin, which is not in the basket"):
+        Rebalancer.holdings_matrix({"a": {"dogecoin": 1.0}}, ["algorand"])
+
+
+def test_plan_requires_the_funding_coin_in_the_basket():
+    with pytest.raises(ValueError, match="funding coin algorand"):
+        Rebalancer(EqualProportions).plan(["pool"], ["solana"], np.ones((1, 1)), {"price": np.ones(1)})
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from pos_etf.cli.snapshots import BasketSnapshot
+from pos_etf.cli.weights.equal_proportions import EqualProportions
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+from pos_etf.cli.weights.price_weighted import PriceWeighted
+from pos_etf.cli.weights.registry import StrategyRegistry, strategy_registry
+
+COINS = ("algorand", "cardano", "solana")
+
+
+def snapshot_of(prices, snapshot_id=None):
+    return BasketSnapshot(COINS, ("price",), np.array([prices], dtype=np.float64), snapshot_id=snapshot_id)
+
+
+@pytest.fixture
+def registry():
+    return StrategyRegistry({"equal_proportions": EqualProportions, "price_weighted": PriceWeighted}, max_snapshots=2)
+
+
+def test_results_are_memoized_by_snapshot_content(registry):
+    results = registry.evaluate(snapshot_of([1.0, 2.0, 4.0], snapshot_id=0))
+
+    assert list(results) == ["equal_proportions", "price_weighted"]
+    assert registry.stats() == {"snapshots": 1, "evaluations": 2}
+
+    # the same data under another store id is the same snapshot.
+    assert registry.evaluate(snapshot_of([1.0, 2.0, 4.0], snapshot_id=7)) == results
+    assert registry.evaluate(snapshot_of([1.0, 2.0, 4.0]), ["price_weighted"]) == {"price_weighted": results["price_weighted"]}
+    assert registry.evaluations == 2
+
+    registry.evaluate(snapshot_of([1.0, 2.0, 5.0]), ["equal_proportions"])
+    assert registry.stats() == {"snapshots": 2, "evaluations": 3}
+
+
+def test_least_recently_evaluated_snapshots_are_dropped(registry):
+    first, second, third = (snapshot_of([1.0, 2.0, price]) for price in (3.0, 4.0, 5.0))
+
+    registry.evaluate(first)
+    registry.evaluate(second)
+    registry.evaluate(first)
+    registry.evaluate(third)
+    assert registry.stats() == {"snapshots": 2, "evaluations": 6}
+
+    registry.evaluate(first)
+    assert registry.evaluations == 6
+    registry.evaluate(second)
+    assert registry.evaluations == 8
+
+
+def test_evaluate_checks_names_and_statistics(registry):
+    registry.register("net_asset_value", NetAssetValue)
+
+    with pytest.raises(KeyError, match="No strategy is registered as dow_jones"):
+        registry.evaluate(snapshot_of([1.0, 2.0, 4.0]), ["dow_jones"])
+    with pytest.raises(ValueError, match="Strategy net_asset_value needs"):
+        registry.evaluate(snapshot_of([1.0, 2.0, 4.0]), ["net_asset_value"])
+
+
+def test_register_validates_strategies(registry):
+    assert registry.register("equal_proportions", EqualProportions) is EqualProportions
+
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register("equal_proportions", PriceWeighted)
+    with pytest.raises(ValueError, match="must declare"):
+        registry.register("empty", object)
+
+
+def test_stats_to_extract_is_the_union_in_declaration_order():
+    stats = strategy_registry.stats_to_extract(extra=("price",))
+
+    assert stats == tuple(dict.fromkeys(NetAssetValue.stats_to_extract + ("price",)))
+    assert strategy_registry.stats_to_extract(["equal_proportions"]) == ("price",)
+    assert set(strategy_registry) == {"net_asset_value", "equal_proportions", "price_weighted"}
@@ -0,0 +1,230 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from pos_etf.cli.error import CircuitOpenError
+from pos_etf.cli.utils.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ResiliencePolicy, is_retryable
+
+
+class FakeClock(object):
+    """a monotonic clock that only moves when told to."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def policy_with(clock, failure_threshold=2, **kwargs):
+    """a policy without backoff or hedging whose breakers run on `clock`."""
+    kwargs.setdefault("retries", 0)
+    kwargs.setdefault("hedge", False)
+    return ResiliencePolicy(backoff_base=0.0, breaker_factory=lambda: CircuitBreaker(failure_threshold, reset_timeout=10, clock=clock), **kwargs)
+
+
+def failing(error):
+    async def request():
+        raise error
+    return request
+
+
+async def succeeding():
+    return "ok"
+
+
+def test_is_retryable():
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(aiohttp.ClientConnectionError())
+    assert is_retryable(aiohttp.ClientResponseError(None, (), status=503))
+    assert is_retryable(aiohttp.ClientResponseError(None, (), status=429))
+    assert not is_retryable(aiohttp.ClientResponseError(None, (), status=404))
+    assert not is_retryable(ValueError())
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now = 9.9
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # only one trial at a time.
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0 and breaker.allow()
+
+
+def test_breaker_failed_trial_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now = 19
+    assert not breaker.allow()
+    clock.now = 20
+    assert breaker.allow()
+
+
+def test_breaker_release_lets_another_trial_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow() and not breaker.allow()
+
+    breaker.release()
+    assert breaker.state == HALF_OPEN and breaker.allow()
+
+
+def test_call_retries_retryable_errors():
+    attempts = []
+
+    async def flaky():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise aiohttp.ClientConnectionError()
+        return "ok"
+
+    policy = policy_with(FakeClock(), failure_threshold=5, retries=2)
+    assert asyncio.run(policy.call("host", flaky)) == "ok"
+    assert len(attempts) == 3 and policy.retries_made == 2
+    assert policy.breaker("host").state == CLOSED
+
+
+def test_call_gives_up_after_retries():
+    policy = policy_with(FakeClock(), retries=1)
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(policy.call("host", failing(aiohttp.ClientConnectionError())))
+    assert policy.retries_made == 1
+
+
+def test_call_does_not_retry_or_count_client_errors():
+    policy = policy_with(FakeClock(), retries=2)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(policy.call("host", failing(aiohttp.ClientResponseError(None, (), status=404))))
+    assert policy.retries_made == 0
+    assert policy.breaker("host").failures == 0
+
+
+def test_only_client_errors_close_a_half_open_circuit():
+    clock = FakeClock()
+    policy = policy_with(clock)
+
+    for _ in range(2):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            asyncio.run(policy.call("host", failing(aiohttp.ClientConnectionError())))
+    clock.now = 10
+
+    # a body that cannot be parsed says nothing about the host, so the trial is only released.
+    with pytest.raises(ValueError):
+        asyncio.run(policy.call("host", failing(ValueError("not JSON"))))
+    assert policy.breaker("host").state == HALF_OPEN and policy.breaker("host").allow()
+    policy.breaker("host").release()
+
+    # a 404 is an answer, so the host is up.
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(policy.call("host", failing(aiohttp.ClientResponseError(None, (), status=404))))
+    assert policy.breaker("host").state == CLOSED
+
+
+def test_call_times_out_slow_attempts():
+    async def slow():
+        await asyncio.sleep(1)
+
+    policy = policy_with(FakeClock(), timeout=0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(policy.call("host", slow))
+    assert policy.timeouts == 1
+
+
+def test_call_rejects_while_open_and_recovers():
+    clock = FakeClock()
+    policy = policy_with(clock)
+    error = failing(aiohttp.ClientConnectionError())
+
+    for _ in range(2):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            asyncio.run(policy.call("host", error))
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy.call("host", succeeding))
+    assert policy.rejected == 1
+
+    # other hosts have their own circuit.
+    assert asyncio.run(policy.call("other", succeeding)) == "ok"
+
+    clock.now = 10
+    assert asyncio.run(policy.call("host", succeeding)) == "ok"
+    assert policy.stats()["circuits"] == {"host": CLOSED, "other": CLOSED}
+
+
+def test_cancelled_trial_does_not_wedge_the_circuit():
+    clock = FakeClock()
+    policy = policy_with(clock)
+    error = failing(aiohttp.ClientConnectionError())
+
+    for _ in range(2):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            asyncio.run(policy.call("host", error))
+    clock.now = 10
+
+    async def cancelled_trial():
+        async def hang():
+            await asyncio.sleep(60)
+
+        task = asyncio.ensure_future(policy.call("host", hang))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_trial())
+    assert policy.breaker("host").state == HALF_OPEN
+
+    assert asyncio.run(policy.call("host", succeeding)) == "ok"
+    assert policy.breaker("host").state == CLOSED
+
+
+def test_call_hedges_slow_attempts():
+    policy = policy_with(FakeClock(), hedge=True, min_samples=5)
+    for _ in range(5):
+        policy.latencies("host").record(0.01)
+
+    attempts = []
+
+    async def first_slow():
+        attempts.append(None)
+        await asyncio.sleep(1 if len(attempts) == 1 else 0)
+        return len(attempts)
+
+    assert asyncio.run(policy.call("host", first_slow)) == 2
+    assert policy.hedges == 1 and policy.hedge_wins == 1
+
+
+def test_backoff_is_bounded():
+    policy = ResiliencePolicy(backoff_base=0.1, backoff_max=0.3)
+
+    for retry in range(6):
+        assert 0 <= policy.backoff(retry) <= min(0.3, 0.1 * 2 ** retry)
@@ -0,0 +1,22 @@
+import asyncio
+
+from pos_etf.cli.utils.session import SessionPool
+
+
+def test_nested_contexts_share_one_session_per_loop():
+    pool = SessionPool(limit_per_host=3)
+
+    async def run():
+        async with pool.session() as outer:
+            async with pool.session() as inner:
+                assert inner is outer
+            assert not outer.closed
+            assert outer.connector.limit_per_host == 3
+        return outer
+
+    session = asyncio.run(run())
+
+    # the last context to exit closes the session.
+    assert session.closed and pool._sessions == {}
+    assert asyncio.run(run()) is not session
+
@@ -0,0 +1,165 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from pos_etf.cli import snapshots
+from pos_etf.cli.error import SnapshotStoreError
+from pos_etf.cli.snapshots import BasketSnapshot, SnapshotStore, default_snapshot_store
+from pos_etf.cli.utils import constants
+from pos_etf.cli.utils.cache import PriceCache
+from pos_etf.cli.weights.net_asset_value import NetAssetValue
+
+COINS = ("algorand", "cardano")
+STATS = ("price", "marketCap")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.bin"), coins=COINS, stats=STATS, initial_capacity=2)
+    yield store
+    store.close()
+
+
+def test_rows_round_trip(store):
+    first = store.append(100.0, {"algorand": {"price": 1.5, "marketCap": 10}, "cardano": {"price": 0.5}})
+    second = store.append(200.0, {"cardano": {"price": 0.6, "marketCap": 20}, "unknown": {"price": 9}})
+
+    assert (first, second) == (0, 1) and len(store) == 2
+    timestamp, coin_data = store.row(0)
+    assert timestamp == 100.0
+    assert coin_data["algorand"] == {"price": 1.5, "marketCap": 10.0}
+    assert np.isnan(coin_data["cardano"]["marketCap"])
+    np.testing.assert_array_equal(store.column("price"), [[1.5, 0.5], [np.nan, 0.6]])
+
+    with pytest.raises(SnapshotStoreError):
+        store.row(2)
+
+
+def test_appends_grow_the_file_and_reach_other_readers(store):
+    reader = SnapshotStore.open(store.path)
+
+    timestamps = np.arange(5, dtype=np.float64)
+    store.append_many(timestamps, {"price": np.arange(10, dtype=np.float64).reshape(5, 2)})
+
+    reader.refresh()
+    assert len(reader) == 5
+    np.testing.assert_array_equal(reader.timestamps, timestamps)
+    np.testing.assert_array_equal(reader.column("price")[4], [8, 9])
+    assert np.isnan(reader.column("marketCap")).all()
+    reader.close()
+
+
+def test_between_selects_a_time_range(store):
+    store.append_many(np.array([1.0, 2.0, 3.0, 4.0]), {"price": np.ones((4, 2))})
+
+    timestamps, columns = store.between(2.0, 4.0)
+
+    np.testing.assert_array_equal(timestamps, [2.0, 3.0])
+    assert columns["price"].shape == (2, 2)
+
+
+def test_timestamps_must_not_decrease(store):
+    store.append(10.0, {})
+
+    with pytest.raises(SnapshotStoreError):
+        store.append(5.0, {})
+
+
+def test_read_only_stores_refuse_appends(store):
+    reader = SnapshotStore.open(store.path)
+
+    with pytest.raises(SnapshotStoreError):
+        reader.append(1.0, {})
+    reader.close()
+
+
+def test_layout_mismatch_is_refused(store):
+    with pytest.raises(SnapshotStoreError, match="do not match"):
+        SnapshotStore(store.path, coins=("algorand",), stats=STATS)
+
+    with pytest.raises(SnapshotStoreError, match="does not exist"):
+        SnapshotStore.open(store.path + ".missing")
+
+
+def test_default_store_is_opened_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, "snapshot_path", str(tmp_path / "snapshots.bin"))
+    monkeypatch.setattr(snapshots, "_default_stores", dict())
+
+    store = default_snapshot_store(COINS)
+    assert store is not None and default_snapshot_store(list(COINS)) is store
+
+
+def test_default_store_with_another_layout_is_skipped(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "snapshots.bin")
+    SnapshotStore(path, coins=COINS).close()
+    monkeypatch.setattr(constants, "snapshot_path", path)
+    monkeypatch.setattr(snapshots, "_default_stores", dict())
+
+    assert default_snapshot_store(("algorand",)) is None
+    assert default_snapshot_store(("algorand",)) is None
+    assert capsys.readouterr().err.count("Not recording snapshots") == 1
+
+
+def test_default_store_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(constants, "snapshot_path", "")
+
+    assert default_snapshot_store(COINS) is None
+
+
+def test_a_failing_store_does_not_fail_the_quote(capsys):
+    class BrokenStore(object):
+        def append_snapshot(self, snapshot):
+            raise SnapshotStoreError("disk full")
+
+    etf = NetAssetValue("https://coins.test/", snapshot_store=BrokenStore())
+    snapshot = BasketSnapshot.parse(COINS, [{"price": 1}, {"price": 2}], ("price",))
+
+    assert etf.record(snapshot) is None
+    assert etf.snapshot_store is None
+    assert "disk full" in capsys.readouterr().err
+
+
+def test_basket_snapshot_parse_and_views():
+    snapshot = BasketSnapshot.parse(COINS, [{"price": 1.5, "marketCap": 10}, {"price": None}], STATS, timestamp=5.0)
+
+    assert snapshot.values.shape == (2, 2) and snapshot.timestamp == 5.0
+    np.testing.assert_array_equal(snapshot.columns["price"], [1.5, np.nan])
+    assert snapshot.coin("algorand") == {"price": 1.5, "marketCap": 10.0}
+    assert np.isnan(snapshot.to_coin_data()["cardano"]["marketCap"])
+    # the columns are views of the snapshot's values.
+    assert np.shares_memory(snapshot.columns["price"], snapshot.values)
+
+
+def test_basket_snapshot_key_is_a_digest_of_the_data():
+    first = BasketSnapshot.parse(COINS, [{"price": 1}, {"price": 2}], ("price",), snapshot_id=0)
+
+    assert first.key == BasketSnapshot.parse(COINS, [{"price": 1}, {"price": 2}], ("price",), snapshot_id=9).key
+    assert first.key != BasketSnapshot.parse(COINS, [{"price": 1}, {"price": 3}], ("price",)).key
+    assert first.key != BasketSnapshot.parse(COINS[::-1], [{"price": 1}, {"price": 2}], ("price",)).key
+
+
+def test_basket_snapshot_from_store(store):
+    snapshot = BasketSnapshot.parse(COINS, [{"price": 1.5, "marketCap": 10}, {"price": 0.5, "marketCap": 20}], STATS)
+    snapshot_id = store.append_snapshot(snapshot)
+
+    recorded = BasketSnapshot.from_store(store, snapshot_id)
+    assert recorded.key == snapshot.key and recorded.snapshot_id == snapshot_id
+    # the store stamps the snapshot with the time it was recorded.
+    assert recorded.timestamp == store.timestamps[snapshot_id] >= snapshot.timestamp
+
+    with pytest.raises(SnapshotStoreError, match="does not exist"):
+        BasketSnapshot.from_store(store, 1)
+
+
+def test_get_coins_does_not_record(store):
+    class FakeFetcher(object):
+        async def fetch_statistics(self, url):
+            return {"price": 1.0, "marketCap": 2.0}
+
+    etf = NetAssetValue("https://coins.test/", price_cache=PriceCache(path=None), coin_fetcher=FakeFetcher(), snapshot_store=store)
+
+    asyncio.run(etf.get_coins(STATS))
+
+    # only fresh baskets of `get_basket` are recorded.
+    assert len(store) == 0 and etf.last_snapshot_id is None
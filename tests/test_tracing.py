@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from pos_etf.cli.utils.tracing import Tracer
+
+
+@pytest.fixture
+def traced(tmp_path):
+    """a tracer writing to a file, and a function returning the spans written so far."""
+    sink = tmp_path / "trace.jsonl"
+    tracer = Tracer(str(sink))
+
+    def spans():
+        return [json.loads(line) for line in sink.read_text().splitlines()]
+
+    yield tracer, spans
+    tracer.configure(None)
+
+
+def test_nested_spans_share_a_trace(traced):
+    tracer, spans = traced
+
+    with tracer.span("outer", side="buy"):
+        with tracer.span("inner"):
+            pass
+
+    inner, outer = spans()
+    assert (inner["name"], outer["name"]) == ("inner", "outer")
+    assert inner["trace_id"] == outer["trace_id"] and inner["parent_id"] == outer["span_id"]
+    assert outer["parent_id"] is None and outer["side"] == "buy" and outer["outcome"] == "ok"
+
+
+def test_failed_spans_record_the_error(traced):
+    tracer, spans = traced
+
+    with pytest.raises(ValueError):
+        with tracer.span("failing"):
+            raise ValueError("bad quote")
+
+    span, = spans()
+    assert span["outcome"] == "error" and span["error"] == "ValueError: bad quote"
+
+
+def test_traced_functions_and_coroutines(traced):
+    tracer, spans = traced
+
+    @tracer.traced("fetch")
+    async def fetch():
+        return 1
+
+    @tracer.traced()
+    def price():
+        return asyncio.run(fetch())
+
+    assert price() == 1
+    fetch_span, price_span = spans()
+    assert fetch_span["name"] == "fetch" and price_span["name"].endswith("price")
+    assert fetch_span["parent_id"] == price_span["span_id"]
+
+
+def test_disabled_tracer_writes_nothing(tmp_path):
+    tracer = Tracer(None)
+
+    @tracer.traced()
+    def price():
+        return 1
+
+    with tracer.span("quote"):
+        assert price() == 1
+    assert not tracer.enabled and list(tmp_path.iterdir()) == []
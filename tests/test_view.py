@@ -0,0 +1,57 @@
+import asyncio
+
+from pos_etf.cli.loadtest.driver import _free_port
+from pos_etf.cli.utils.constants import asset_id
+from pos_etf.cli.view import HoldingsView, etf_holding, holding_of
+
+
+def view_of(client, **kwargs):
+    return HoldingsView(client.algod_address, asset_id=asset_id, indexer_url=client.algod_address, **kwargs)
+
+
+def test_etf_holding():
+    account_info = {"assets": [{"asset-id": 7, "amount": 3}, {"asset-id": 1, "amount": 25}]}
+
+    assert etf_holding(account_info, 1) == 25
+    assert etf_holding(account_info, 2) == 0
+    assert etf_holding({"assets": None}, 1) == 0
+
+
+def test_fetch_all_reads_every_account(client, new_account):
+    accounts = {f"account{i}": new_account()[0] for i in range(20)}
+
+    holdings = asyncio.run(view_of(client, holdings_cache=None).fetch_all(accounts))
+
+    assert [holding["name"] for holding in holdings] == list(accounts)
+    assert all(holding["amount"] == 1000 and holding["algos"] == 10 ** 12 and holding["round"] for holding in holdings)
+    assert not any(holding["error"] or holding["cached"] for holding in holdings)
+
+
+def test_fetch_all_records_errors_per_account(new_account):
+    view = HoldingsView(f"http://127.0.0.1:{_free_port()}", holdings_cache=None)
+
+    holdings = asyncio.run(view.fetch_all({"alice": new_account()[0]}))
+
+    assert holdings[0]["amount"] is None and holdings[0]["error"]
+
+
+def test_holding_of_reads_one_account(client, new_account):
+    holding = holding_of(new_account()[0], client.algod_address, client.algod_address, cache=None)
+
+    assert holding["amount"] == 1000 and not holding["cached"]
+
+
+def test_format_totals_the_holdings():
+    holdings = [
+        {"name": "alice", "address": "ALICE", "amount": 150, "error": None, "cached": True},
+        {"name": "bob", "address": "BOB", "amount": 50, "error": None},
+        {"name": "carol", "address": "CAROL", "amount": None, "error": "ClientConnectionError: refused"}
+    ]
+
+    table = HoldingsView.format(holdings, nav_in_usd=2.5, decimals=2, unit="Pos").splitlines()
+
+    assert table[0].split() == ["ACCOUNT", "ADDRESS", "HOLDINGS", "(Pos)", "USD", "VALUE"]
+    assert table[2].split() == ["alice", "ALICE", "1.50", "3.75"]
+    assert table[4].split() == ["carol", "CAROL", "-", "-", "ClientConnectionError:", "refused"]
+    assert table[6].split() == ["TOTAL", "(2", "accounts)", "2.00", "5.00", "1", "failed"]
+    assert table[7] == "NAV: 2.5 USD (1 accounts unchanged since they were cached)"